@@ -0,0 +1,177 @@
+"""Deterministic synthetic corpus: ``__NEXT_DATA__`` detail pages and popup records.
+
+Festas mirror what the live site serves: a ref'd ``Festa`` entity and head image in
+``__APOLLO_CACHE__``, content images, links, pricing and unrelated ``Poi`` entities,
+with titles in every locale. Records are built from those festas with the crawler's
+own ``extract_festa`` + ``merge_localized``, then tagged the way ``finalize_record``
+does (classification, image meta), so index and page builders see realistic input.
+The same ``--seed`` always yields the same corpus.
+
+    python benchmarks/corpus.py --records 100000 --out /tmp/corpus
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.crawl_popups import _compute_image_meta, merge_localized
+from scripts.rules import load_rules
+from scripts.storage import dump_json
+from scripts.triple_client import extract_festa, triple_detail_url
+
+LANGS = ["zh-cn", "en", "ja", "ko"]
+CATEGORIES = ["POP-UP", "POP UP", "POPUP_EVENT", "EXHIBITION", "FESTIVAL", "PERFORMANCE", "EXPERIENCE"]
+CITIES = ["Seoul", "Busan", "Incheon", "Daegu", "Jeju"]
+BRANDS = ["Gentle Monster", "Tamburins", "Nudake", "Musinsa", "Line Friends", "Kakao", "Ader Error", "Stand Oil"]
+KINDS = {
+    "ko": ["팝업스토어", "전시", "페스티벌", "체험"],
+    "en": ["Pop-up Store", "Exhibition", "Festival", "Experience"],
+    "ja": ["ポップアップストア", "展示", "フェスティバル", "体験"],
+    "zh-cn": ["快闪店", "展览", "节日", "体验"],
+}
+PRICE_DESC = ["무료", "10,000원", "Free entry", "성인 15,000원 / 어린이 8,000원", None]
+
+
+def festa_id(i: int, seed: int = 0) -> str:
+    return str(uuid.UUID(int=(seed << 96) | i, version=4))
+
+
+def festa_node(i: int, lang: str, seed: int = 0) -> Dict[str, Any]:
+    """Apollo ``Festa`` entity for one (ID, locale); images and geo are shared across locales."""
+    rnd = random.Random(seed * 1_000_003 + i)
+    fid = festa_id(i, seed)
+    start = date(2023, 1, 1) + timedelta(days=rnd.randrange(0, 4 * 365))
+    end = start + timedelta(days=rnd.choice([3, 7, 14, 30, 60, 365]))
+    kind = rnd.randrange(len(KINDS["en"]))
+    brand = rnd.choice(BRANDS)
+    contents = [
+        {"image": [{"sizes": {v: {"url": f"https://media.example/{fid}/c{n}_{v}.jpg"} for v in ("full", "small_square")}}]}
+        for n in range(rnd.randrange(0, 9))
+    ]
+    desc = rnd.choice(PRICE_DESC)
+    return {
+        "__typename": "Festa",
+        "resourceId": fid,
+        "title": f"{brand} {KINDS[lang][kind]} #{i}",
+        "category": rnd.choice(CATEGORIES),
+        "duration": {"start": start.isoformat(), "end": end.isoformat()},
+        "address": {"city": rnd.choice(CITIES), "street": f"Seongsu-dong {rnd.randrange(1, 400)}-gil {rnd.randrange(1, 99)}"},
+        "geolocation": {"coordinates": [126.8 + rnd.random() * 0.4, 37.4 + rnd.random() * 0.3]},
+        "headImage": {"__ref": f"Image:{fid}"},
+        "contents": contents,
+        "links": [{"href": f"https://brand.example/{i}", "label": "More"}] * rnd.randrange(0, 3),
+        "pricing": {"type": "FREE" if desc in (None, "무료", "Free entry") else "PAID", "description": desc},
+    }
+
+
+def next_data_page(i: int, lang: str, seed: int = 0, *, pois: int = 40, filler_kb: int = 0) -> str:
+    """Detail page HTML with the festa, its head image, ``pois`` unrelated entities and ``filler_kb`` of markup."""
+    festa = festa_node(i, lang, seed)
+    fid = festa["resourceId"]
+    cache: Dict[str, Any] = {
+        "ROOT_QUERY": {"__typename": "Query", f'getFesta({{"id":"{fid}"}})': {"__ref": f"Festa:{fid}"}},
+        f"Image:{fid}": {
+            "__typename": "Image",
+            "sizes": {v: {"url": f"https://media.example/{fid}/head_{v}.jpg"} for v in ("full", "small_square")},
+        },
+        f"Festa:{fid}": festa,
+    }
+    for n in range(pois):
+        cache[f"Poi:{i}-{n}"] = {
+            "__typename": "Poi",
+            "id": f"{i}-{n}",
+            "names": {"ko": f"장소 {n}", "en": f"Place {n}", "ja": f"場所 {n}"},
+            "images": [{"sizes": {"large": {"url": f"https://media.example/poi/{n}.jpg"}}}],
+        }
+    nd = {"props": {"pageProps": {"__APOLLO_CACHE__": cache, "lang": lang}}, "page": "/[lang]/festas/[id]"}
+    nav = "".join(f'<a href="/{lang}/festas?page={n}">{n}</a>' for n in range(30))
+    filler = "".join(f'<div class="c{n}"><p>Lorem ipsum dolor sit amet</p></div>' for n in range(filler_kb * 1024 // 50))
+    return (
+        f'<html lang="{lang}"><head><title>{festa["title"]}</title></head><body><nav>{nav}</nav>{filler}'
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(nd, ensure_ascii=False)}</script></body></html>'
+    )
+
+
+def localized_festas(i: int, seed: int = 0, langs: List[str] = LANGS) -> List[Tuple[str, Dict[str, Any]]]:
+    """``(lang, extracted festa)`` per locale, as ``fetch_festa_by_lang`` would return them."""
+    out = []
+    for lang in langs:
+        fid = festa_id(i, seed)
+        node = festa_node(i, lang, seed)
+        apollo = {
+            "ROOT_QUERY": {"getFesta": node},
+            f"Image:{fid}": {"sizes": {v: {"url": f"https://media.example/{fid}/head_{v}.jpg"} for v in ("full", "small_square")}},
+        }
+        festa = extract_festa(apollo) or {}
+        festa["_sourceUrl"] = triple_detail_url(lang, fid)
+        out.append((lang, festa))
+    return out
+
+
+def record(i: int, seed: int = 0, rules: Any = None) -> Dict[str, Any]:
+    """A saved-record-shaped dict for festa ``i`` (merged locales, classification, image meta)."""
+    rules = rules or load_rules()
+    merged: Dict[str, Any] = {}
+    for lang, festa in localized_festas(i, seed):
+        merge_localized(merged, festa, lang)
+    dur = merged.get("duration") or {}
+    titles = [t["title"] for t in (merged.get("translations") or {}).values() if t.get("title")]
+    is_popup, detection = rules.classify(
+        category=merged.get("category"),
+        titles=titles,
+        start=date.fromisoformat(dur["start"]),
+        end=date.fromisoformat(dur["end"]),
+    )
+    merged["isPopup"] = is_popup
+    merged["meta"] = {"fetchedAt": f"{dur['start']}T00:00:00", "images": _compute_image_meta(merged.get("images") or [])}
+    if any(detection.values()):
+        merged["meta"]["detection"] = detection
+    return merged
+
+
+def records(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rules = load_rules()
+    for i in range(n):
+        yield record(i, seed, rules)
+
+
+def write_corpus(out_dir: str, n: int, seed: int = 0, *, pages: int = 0) -> Dict[str, Any]:
+    """Write ``n`` records to ``out_dir/popups`` and the first ``pages`` festas' pages to ``out_dir/pages``."""
+    rec_dir = os.path.join(out_dir, "popups")
+    os.makedirs(rec_dir, exist_ok=True)
+    for rec in records(n, seed):
+        dump_json(os.path.join(rec_dir, f"{rec['id']}.json"), rec)
+    if pages:
+        page_dir = os.path.join(out_dir, "pages")
+        os.makedirs(page_dir, exist_ok=True)
+        for i in range(min(pages, n)):
+            for lang in LANGS:
+                with open(os.path.join(page_dir, f"{festa_id(i, seed)}.{lang}.html"), "w", encoding="utf-8") as f:
+                    f.write(next_data_page(i, lang, seed))
+    return {"records": n, "pages": min(pages, n) * len(LANGS), "dir": out_dir}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate a synthetic festa corpus")
+    ap.add_argument("--records", type=int, default=1000)
+    ap.add_argument("--pages", type=int, default=0, help="Also write detail pages (all locales) for the first N festas")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, required=True)
+    args = ap.parse_args()
+    print(json.dumps(write_corpus(args.out, args.records, args.seed, pages=args.pages), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
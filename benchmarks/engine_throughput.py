@@ -0,0 +1,112 @@
+"""Compare thread vs asyncio crawl engines against the local mock origin.
+
+Starts ``benchmarks/mock_origin.py`` in a child process with fixed latency, then runs
+``crawl_popups.main`` once per engine/concurrency against it (``--sitemap-url`` /
+``--detail-base``) in a temp working directory, so ``data/`` in the repo is untouched.
+Requests and bytes per festa come from the mock's ``/__stats``.
+
+    python benchmarks/engine_throughput.py --ids 400 --latency 0.05 --concurrency 8,64,256
+    python benchmarks/engine_throughput.py --ids 400 --concurrency 8 --page-kb 64 --graphql
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_origin import MockConfig, fetch_stats, start
+from scripts import crawl_popups
+
+
+def run_once(engine: str, workers: int, langs: List[str], fast: bool, source: str, base: str) -> Dict[str, Any]:
+    fetch_stats(base, reset=True)
+    peak_threads = threading.active_count()
+    stop = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        crawl_popups.main(
+            None,
+            fast,
+            workers,
+            0.0,
+            langs,
+            engine=engine,
+            full=True,
+            source=source,
+            graphql_endpoint=f"{base}/graphql",
+            sitemap_url=f"{base}/sitemap-index.xml",
+            detail_base=base,
+        )
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    sampler.join()
+    report = json.loads(Path("data/crawl_report.json").read_text(encoding="utf-8"))
+    traffic = fetch_stats(base)
+    saved = report["saved"] or 1
+    return {
+        "engine": engine,
+        "source": source,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "saved": report["saved"],
+        "idsPerSec": round(report["saved"] / elapsed, 1) if elapsed else None,
+        "peakThreads": peak_threads,
+        "requestsPerFesta": round(traffic["requests"] / saved, 3),
+        "bytesPerFesta": round(traffic["bytes"] / saved),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Thread vs asyncio engine throughput against a local stub")
+    ap.add_argument("--ids", type=int, default=400)
+    ap.add_argument("--latency", type=float, default=0.05, help="Per-request server latency in seconds")
+    ap.add_argument("--concurrency", type=str, default="8,64,256")
+    ap.add_argument("--langs", type=str, default="zh-cn,en")
+    ap.add_argument("--fast", action="store_true")
+    ap.add_argument("--page-kb", type=int, default=0, help="Pad detail pages with this much markup")
+    ap.add_argument("--graphql", action="store_true", help="Also run the thread engine with --source graphql")
+    args = ap.parse_args()
+
+    langs = [x for x in args.langs.split(",") if x]
+    proc, base = start(MockConfig(ids=args.ids, langs=langs, latency=f"fixed:{args.latency}", page_kb=args.page_kb))
+    runs = [("thread", "html"), ("async", "html")] + ([("thread", "graphql")] if args.graphql else [])
+    results: List[Dict[str, Any]] = []
+    cwd = os.getcwd()
+    try:
+        for workers in [int(x) for x in args.concurrency.split(",") if x]:
+            for engine, source in runs:
+                with tempfile.TemporaryDirectory() as tmp:
+                    os.chdir(tmp)
+                    try:
+                        results.append(run_once(engine, workers, langs, args.fast, source, base))
+                    finally:
+                        os.chdir(cwd)
+    finally:
+        proc.terminate()
+    print(json.dumps({"ids": args.ids, "latency": args.latency, "langs": langs, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
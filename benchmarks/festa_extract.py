@@ -0,0 +1,106 @@
+"""Lazy Apollo extraction vs decoding the whole ``__NEXT_DATA__`` payload.
+
+Full path: ``scan_next_data`` + ``get_apollo_state`` + ``extract_festa``. Lazy path:
+``parse_festa_html``, which for payloads over ``LAZY_APOLLO_MIN_CHARS`` decodes only
+``ROOT_QUERY`` and the entities reached through ``__ref``. Pages carry a ref'd Festa/head image plus
+unrelated Apollo entities and a translation bundle in page props. Both paths must
+return identical output; time is per page, peak is ``tracemalloc``'s high-water mark.
+
+    python benchmarks/festa_extract.py --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.triple_client import extract_festa, get_apollo_state, parse_festa_html, scan_next_data
+
+
+def _page(entities: int, bundle_keys: int) -> str:
+    fid = "00000000-0000-0000-0000-000000000000"
+    cache: Dict[str, Any] = {"ROOT_QUERY": {"__typename": "Query", f'getFesta({{"id":"{fid}"}})': {"__ref": f"Festa:{fid}"}}}
+    for i in range(entities):
+        cache[f"Poi:{i}"] = {
+            "__typename": "Poi",
+            "id": str(i),
+            "names": {"ko": f"장소 {i}", "en": f"Place {i}", "ja": f"場所 {i}"},
+            "images": [{"sizes": {"large": {"url": f"https://img.example/{i}.jpg"}}}],
+        }
+    cache["Image:head"] = {"__typename": "Image", "sizes": {"full": {"url": "https://img.example/head.jpg"}}}
+    cache[f"Festa:{fid}"] = {
+        "__typename": "Festa",
+        "resourceId": fid,
+        "title": "Brand POP-UP",
+        "category": "POP-UP",
+        "duration": {"start": "2025-01-01", "end": "2025-01-31"},
+        "address": {"city": "Seoul", "street": "Road"},
+        "geolocation": {"coordinates": [127.0, 37.0]},
+        "headImage": {"__ref": "Image:head"},
+        "contents": [{"image": [{"sizes": {"large": {"url": f"https://img.example/c{i}.jpg"}}}]} for i in range(8)],
+        "links": [{"href": "https://example.com", "label": "More"}],
+    }
+    bundle = {f"common.key.{i}": f"번역 문자열 {i} \"quoted\"" for i in range(bundle_keys)}
+    nd = {"props": {"pageProps": {"i18n": bundle, "__APOLLO_CACHE__": cache}}, "page": "/festas/[id]"}
+    return f'<html><body><script id="__NEXT_DATA__" type="application/json">{json.dumps(nd, ensure_ascii=False)}</script></body></html>'
+
+
+def full_path(html: str) -> Any:
+    return extract_festa(get_apollo_state(scan_next_data(html) or {}) or {})
+
+
+def lazy_path(html: str) -> Any:
+    festa = parse_festa_html(html, "")
+    if festa:
+        festa.pop("_sourceUrl", None)
+    return festa
+
+
+def _measure(fn: Callable[[str], Any], html: str, repeat: int) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    elapsed = (time.perf_counter() - t0) / repeat
+    tracemalloc.start()
+    fn(html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Lazy Apollo extraction vs full payload decode")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for name, entities, bundle in (("small", 10, 50), ("100kb", 300, 1000), ("1mb", 3000, 10000), ("5mb", 15000, 50000)):
+        html = _page(entities, bundle)
+        if full_path(html) != lazy_path(html):
+            raise SystemExit(f"{name}: lazy and full extraction disagree")
+        repeat = max(1, args.repeat if len(html) < 1_000_000 else args.repeat // 5)
+        full_s, full_peak = _measure(full_path, html, repeat)
+        lazy_s, lazy_peak = _measure(lazy_path, html, repeat)
+        results.append({
+            "case": name,
+            "bytes": len(html.encode()),
+            "fullMs": round(full_s * 1000, 3),
+            "lazyMs": round(lazy_s * 1000, 3),
+            "speedup": round(full_s / lazy_s, 1) if lazy_s else None,
+            "fullPeakKb": round(full_peak / 1024, 1),
+            "lazyPeakKb": round(lazy_peak / 1024, 1),
+        })
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,350 @@
+"""Local stand-in for the triple.global sitemaps and Interpark Global detail pages.
+
+Serves a sitemap index, ``sitemap-festa-detail-urls-N.xml`` files and
+``/{lang}/festas/{id}`` pages generated by ``benchmarks/corpus.py``, plus the batched
+``POST /graphql`` used by ``--source graphql``. Faults are opt-in and, except for
+bursts and latency, deterministic per (id, locale) for a given ``--seed``:
+
+- ``--latency``: ``fixed:S``, ``uniform:A,B``, ``exp:MEAN`` or ``lognormal:MU,SIGMA``
+- ``--burst-every``/``--burst-for``: windows where every request gets ``--burst-status``
+  (429 or 503) with ``Retry-After: --retry-after``
+- ``--missing-locale-rate``: share of (id, locale) pages answered with 404
+- ``--slow-body-rate``/``--slow-body-kbps``: bodies trickled out after the headers
+- ``--malformed-rate``: pages whose ``__NEXT_DATA__`` JSON is cut in half
+
+Sitemaps and pages carry an ETag and answer ``If-None-Match`` with 304.
+``GET /__stats`` returns request/status/byte counts and per-second arrivals
+(``?reset=1`` clears them); these requests are not counted.
+
+    python benchmarks/mock_origin.py --ids 2000 --port 8765 --latency uniform:0.02,0.2 --burst-every 30 --burst-for 3
+    python scripts/crawl_popups.py --sitemap-url http://127.0.0.1:8765/sitemap-index.xml --detail-base http://127.0.0.1:8765
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import LANGS, festa_id, festa_node, next_data_page
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec (seconds); see the module docstring for the forms."""
+    kind, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()] if args else []
+    if kind == "fixed" and len(vals) == 1:
+        return lambda rnd: vals[0]
+    if kind == "uniform" and len(vals) == 2:
+        return lambda rnd: rnd.uniform(vals[0], vals[1])
+    if kind == "exp" and len(vals) == 1:
+        return lambda rnd: rnd.expovariate(1.0 / vals[0]) if vals[0] > 0 else 0.0
+    if kind == "lognormal" and len(vals) == 2:
+        return lambda rnd: rnd.lognormvariate(vals[0], vals[1])
+    raise ValueError(f"bad latency spec: {spec!r}")
+
+
+@dataclass
+class MockConfig:
+    ids: int = 400
+    seed: int = 0
+    langs: List[str] = field(default_factory=lambda: list(LANGS))
+    per_sitemap: int = 5000
+    latency: str = "fixed:0"
+    page_kb: int = 0
+    pois: int = 40
+    burst_every: float = 0.0
+    burst_for: float = 0.0
+    burst_status: int = 429
+    retry_after: int = 1
+    missing_locale_rate: float = 0.0
+    slow_body_rate: float = 0.0
+    slow_body_kbps: float = 64.0
+    malformed_rate: float = 0.0
+
+
+class MockOrigin:
+    """Content, fault decisions and traffic counters for one server instance."""
+
+    def __init__(self, conf: MockConfig) -> None:
+        self.conf = conf
+        self.ids = [festa_id(i, conf.seed) for i in range(conf.ids)]
+        self.index_of = {fid: i for i, fid in enumerate(self.ids)}
+        self._latency = parse_latency(conf.latency)
+        self._rnd = random.Random(conf.seed)
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.reset()
+        self.page = lru_cache(maxsize=8192)(self._page)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._t0 = time.monotonic()
+            self.requests = 0
+            self.bytes = 0
+            self.status: Counter = Counter()
+            self.kinds: Counter = Counter()
+            self.per_second: Counter = Counter()
+
+    def record(self, kind: str, status: int, nbytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.status[str(status)] += 1
+            self.kinds[kind] += 1
+            self.per_second[int(time.monotonic() - self._t0)] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            span = max(self.per_second) + 1 if self.per_second else 0
+            return {
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "status": dict(self.status),
+                "kinds": dict(self.kinds),
+                "perSecond": [self.per_second.get(s, 0) for s in range(span)],
+            }
+
+    def delay(self) -> float:
+        with self._lock:
+            return max(0.0, self._latency(self._rnd))
+
+    def in_burst(self) -> bool:
+        c = self.conf
+        return c.burst_every > 0 and (time.monotonic() - self.started) % c.burst_every < c.burst_for
+
+    def hit(self, kind: str, fid: str, lang: str, rate: float) -> bool:
+        """Deterministic per (fault, id, locale) coin flip with probability ``rate``."""
+        if rate <= 0:
+            return False
+        return zlib.crc32(f"{self.conf.seed}:{kind}:{fid}:{lang}".encode()) / 2**32 < rate
+
+    def _page(self, i: int, lang: str) -> bytes:
+        html = next_data_page(i, lang, self.conf.seed, pois=self.conf.pois, filler_kb=self.conf.page_kb)
+        if self.hit("malformed", self.ids[i], lang, self.conf.malformed_rate):
+            start = html.index("__NEXT_DATA__")
+            end = html.rindex("</script>")
+            html = html[: start + (end - start) // 2] + html[end:]
+        return html.encode()
+
+    def sitemap_index(self, base: str) -> bytes:
+        n = math.ceil(len(self.ids) / self.conf.per_sitemap) if self.ids else 0
+        items = "".join(
+            f"<sitemap><loc>{base}/sitemap-festa-detail-urls-{k}.xml</loc><lastmod>2025-01-01</lastmod></sitemap>" for k in range(n)
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex>{items}</sitemapindex>'.encode()
+
+    def sitemap(self, base: str, k: int) -> Optional[bytes]:
+        chunk = self.ids[k * self.conf.per_sitemap : (k + 1) * self.conf.per_sitemap]
+        if not chunk:
+            return None
+        urls = []
+        for fid in chunk:
+            lastmod = festa_node(self.index_of[fid], self.conf.langs[0], self.conf.seed)["duration"]["start"]
+            urls.extend(f"<url><loc>{base}/{lang}/festas/{fid}</loc><lastmod>{lastmod}</lastmod></url>" for lang in self.conf.langs)
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset>{"".join(urls)}</urlset>'.encode()
+
+    def graphql(self, body: Dict[str, Any]) -> bytes:
+        variables = body.get("variables") or {}
+        data: Dict[str, Any] = {}
+        n = 0
+        while f"id{n}" in variables:
+            fid, lang = variables[f"id{n}"], variables.get(f"lang{n}")
+            i = self.index_of.get(fid)
+            if i is None or lang not in self.conf.langs or self.hit("missing", fid, lang, self.conf.missing_locale_rate):
+                data[f"f{n}"] = None
+            else:
+                node = festa_node(i, lang, self.conf.seed)
+                node["headImage"] = {"sizes": {v: {"url": f"https://media.example/{fid}/head_{v}.jpg"} for v in ("full", "small_square")}}
+                data[f"f{n}"] = node
+            n += 1
+        return json.dumps({"data": data}, ensure_ascii=False).encode()
+
+
+def make_handler(origin: MockOrigin) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real origins
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _base(self) -> str:
+            host = self.headers.get("Host") or f"127.0.0.1:{self.server.server_port}"  # type: ignore[attr-defined]
+            return f"http://{host}"
+
+        def _reply(self, kind: str, status: int, body: bytes = b"", ctype: str = "text/plain", *, etag: bool = False, slow: bool = False) -> None:
+            headers: List[Tuple[str, str]] = []
+            if status == 200 and etag:
+                tag = f'"{zlib.crc32(body):08x}"'
+                headers.append(("ETag", tag))
+                if self.headers.get("If-None-Match") == tag:
+                    status, body = 304, b""
+            if status in (429, 503):
+                headers.append(("Retry-After", str(origin.conf.retry_after)))
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            if slow and body:
+                chunk = 1024
+                pause = chunk / (origin.conf.slow_body_kbps * 1024)
+                for off in range(0, len(body), chunk):
+                    self.wfile.write(body[off : off + chunk])
+                    self.wfile.flush()
+                    time.sleep(pause)
+            else:
+                self.wfile.write(body)
+            origin.record(kind, status, len(body))
+
+        def _stats(self) -> None:
+            if parse_qs(urlsplit(self.path).query).get("reset"):
+                origin.reset()
+            body = json.dumps(origin.stats()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self) -> None:
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(origin.delay())
+            if self.path != "/graphql":
+                self._reply("other", 404)
+            elif origin.in_burst():
+                self._reply("graphql", origin.conf.burst_status)
+            else:
+                self._reply("graphql", 200, origin.graphql(json.loads(raw or b"{}")), "application/json")
+
+        def do_GET(self) -> None:
+            path = urlsplit(self.path).path
+            if path == "/__stats":
+                self._stats()
+                return
+            time.sleep(origin.delay())
+            parts = path.strip("/").split("/")
+            kind = "detail" if len(parts) == 3 and parts[1] == "festas" else "sitemap" if path.endswith(".xml") else "other"
+            if origin.in_burst():
+                self._reply(kind, origin.conf.burst_status)
+                return
+            if path == "/sitemap-index.xml":
+                self._reply(kind, 200, origin.sitemap_index(self._base()), "application/xml", etag=True)
+            elif path.startswith("/sitemap-festa-detail-urls-") and path.endswith(".xml"):
+                try:
+                    body = origin.sitemap(self._base(), int(path[len("/sitemap-festa-detail-urls-") : -4]))
+                except ValueError:
+                    body = None
+                self._reply(kind, 200 if body else 404, body or b"", "application/xml", etag=True)
+            elif kind == "detail":
+                lang, fid = parts[0], parts[2]
+                i = origin.index_of.get(fid)
+                if i is None or lang not in origin.conf.langs or origin.hit("missing", fid, lang, origin.conf.missing_locale_rate):
+                    self._reply(kind, 404)
+                    return
+                slow = origin.hit("slow", fid, lang, origin.conf.slow_body_rate)
+                self._reply(kind, 200, origin.page(i, lang), "text/html; charset=utf-8", etag=True, slow=slow)
+            else:
+                self._reply(kind, 404)
+
+    return Handler
+
+
+def serve(conf: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Bound (not yet serving) server; call ``serve_forever`` on it."""
+    ThreadingHTTPServer.request_queue_size = 1024
+    srv = ThreadingHTTPServer((host, port), make_handler(MockOrigin(conf)))
+    srv.daemon_threads = True
+    return srv
+
+
+def _run(conf: MockConfig, port_q: "multiprocessing.Queue[int]") -> None:
+    srv = serve(conf)
+    port_q.put(srv.server_port)
+    srv.serve_forever()
+
+
+def start(conf: MockConfig) -> Tuple[multiprocessing.Process, str]:
+    """Run the mock in a child process (so its threads do not skew the crawler's numbers)."""
+    port_q: "multiprocessing.Queue[int]" = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_run, args=(conf, port_q), daemon=True)
+    proc.start()
+    return proc, f"http://127.0.0.1:{port_q.get(timeout=30)}"
+
+
+def fetch_stats(base: str, reset: bool = False) -> Dict[str, Any]:
+    with urlopen(f"{base}/__stats{'?reset=1' if reset else ''}", timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Mock triple.global / Interpark Global origin")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--ids", type=int, default=400)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--langs", type=str, default=",".join(LANGS), help="Locales that have pages")
+    ap.add_argument("--per-sitemap", type=int, default=5000, help="URLs per festa sitemap file")
+    ap.add_argument("--latency", type=str, default="fixed:0")
+    ap.add_argument("--page-kb", type=int, default=0, help="Pad detail pages with this much markup")
+    ap.add_argument("--burst-every", type=float, default=0.0, help="Seconds between error bursts (0 = none)")
+    ap.add_argument("--burst-for", type=float, default=0.0, help="Length of each burst in seconds")
+    ap.add_argument("--burst-status", type=int, choices=[429, 503], default=429)
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with burst responses")
+    ap.add_argument("--missing-locale-rate", type=float, default=0.0)
+    ap.add_argument("--slow-body-rate", type=float, default=0.0)
+    ap.add_argument("--slow-body-kbps", type=float, default=64.0)
+    ap.add_argument("--malformed-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        ap.error(str(e))
+    conf = MockConfig(
+        ids=args.ids,
+        seed=args.seed,
+        langs=[x.strip() for x in args.langs.split(",") if x.strip()],
+        per_sitemap=max(1, args.per_sitemap),
+        latency=args.latency,
+        page_kb=args.page_kb,
+        burst_every=args.burst_every,
+        burst_for=args.burst_for,
+        burst_status=args.burst_status,
+        retry_after=args.retry_after,
+        missing_locale_rate=args.missing_locale_rate,
+        slow_body_rate=args.slow_body_rate,
+        slow_body_kbps=args.slow_body_kbps,
+        malformed_rate=args.malformed_rate,
+    )
+    srv = serve(conf, args.host, args.port)
+    base = f"http://{args.host}:{srv.server_port}"
+    print(f"Mock origin on {base} ({conf.ids} festas)")
+    print(f"  --sitemap-url {base}/sitemap-index.xml --detail-base {base}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+"""Byte-level ``__NEXT_DATA__`` scan vs the BeautifulSoup path.
+
+Cases are the two fixture shapes from ``tests/test_triple_parser.py`` (legacy
+``apolloState`` and ``__APOLLO_CACHE__``) plus synthetic detail pages padded with
+markup, inline scripts and unrelated Apollo entities. Every case first checks both
+paths decode the same document.
+
+    python benchmarks/next_data_extract.py --repeat 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.triple_client import parse_next_data_soup, scan_next_data
+
+
+def _festa(fid: str) -> Dict[str, Any]:
+    return {
+        "__typename": "Festa",
+        "resourceId": fid,
+        "title": "Brand POP-UP",
+        "category": "POP-UP",
+        "duration": {"start": "2025-01-01", "end": "2025-01-31"},
+        "address": {"city": "Seoul", "street": "Road"},
+        "geolocation": {"coordinates": [127.0, 37.0]},
+        "links": [{"href": "https://example.com", "label": "More"}],
+    }
+
+
+def _page(next_data: Dict[str, Any], *, filler_kb: int = 0, scripts: int = 0) -> str:
+    body = "".join(
+        f'<div class="c{i}"><p>Lorem ipsum dolor sit amet {i}</p><a href="/x/{i}">link</a></div>'
+        for i in range(filler_kb * 1024 // 80)
+    )
+    inline = "".join(f"<script>window.__x{i} = {{\"k\": {i}}};</script>" for i in range(scripts))
+    nd = json.dumps(next_data, ensure_ascii=False)
+    return f'<html><head>{inline}</head><body>{body}<script id="__NEXT_DATA__" type="application/json">{nd}</script></body></html>'
+
+
+def _apollo_cache(entities: int) -> Dict[str, Any]:
+    cache: Dict[str, Any] = {"ROOT_QUERY": {"getFesta": _festa("00000000-0000-0000-0000-000000000000")}}
+    for i in range(entities):
+        cache[f"Poi:{i}"] = {
+            "__typename": "Poi",
+            "id": str(i),
+            "names": {"ko": f"장소 {i}", "en": f"Place {i}", "ja": f"場所 {i}"},
+            "images": [{"sizes": {"large": {"url": f"https://img.example/{i}.jpg"}}}],
+        }
+    return cache
+
+
+def cases() -> List[Tuple[str, str]]:
+    fixture_legacy = {"props": {"pageProps": {"apolloState": {"ROOT_QUERY": {"getFesta": _festa("0" * 36)}}}}}
+    fixture_cache = {"props": {"pageProps": {"__APOLLO_CACHE__": {"ROOT_QUERY": {"getFesta": _festa("1" * 36)}}}}}
+    return [
+        ("fixture-legacy", _page(fixture_legacy)),
+        ("fixture-apollo-cache", _page(fixture_cache)),
+        ("synthetic-100kb", _page({"props": {"pageProps": {"__APOLLO_CACHE__": _apollo_cache(200)}}}, filler_kb=60, scripts=20)),
+        ("synthetic-1mb", _page({"props": {"pageProps": {"__APOLLO_CACHE__": _apollo_cache(2000)}}}, filler_kb=600, scripts=60)),
+    ]
+
+
+def _time(fn: Callable[[str], Any], html: str, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="__NEXT_DATA__ scan vs BeautifulSoup")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    results = []
+    for name, html in cases():
+        if scan_next_data(html) != parse_next_data_soup(html):
+            raise SystemExit(f"{name}: scan and soup paths disagree")
+        repeat = max(1, args.repeat if len(html) < 200_000 else args.repeat // 5)
+        soup = _time(parse_next_data_soup, html, repeat)
+        scan = _time(scan_next_data, html, repeat)
+        results.append({
+            "case": name,
+            "bytes": len(html.encode()),
+            "soupMs": round(soup * 1000, 3),
+            "scanMs": round(scan * 1000, 3),
+            "speedup": round(soup / scan, 1) if scan else None,
+        })
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
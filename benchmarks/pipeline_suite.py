@@ -0,0 +1,201 @@
+"""Per-stage time and peak memory of the crawl/build pipeline at growing corpus sizes.
+
+For each ``--scales`` entry a synthetic corpus (``benchmarks/corpus.py``) is generated
+in a temp dir and every stage runs over it: page-level stages (``parse_next_data``,
+``extract_festa``) over the first ``--sample`` festas x 4 locales, record-level stages
+(``merge_localized``, ``PopupRules.classify``, ``validate_record``,
+``build_pages.render_page``) and the storage/build stages (``save_record_json`` cold and
+unchanged, ``upsert_records_sqlite``, ``build_index``) over the whole corpus. Each stage
+is timed once plain and once under ``tracemalloc`` for its peak. The output is one JSON
+document, tagged with the commit, so runs on different commits can be diffed.
+
+    python benchmarks/pipeline_suite.py --scales 1000,10000,100000 --out bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import LANGS, localized_festas, next_data_page, records
+from scripts import storage
+from scripts.build_index import build_index
+from scripts.build_pages import SITE_ORIGIN, render_page
+from scripts.crawl_popups import merge_localized
+from scripts.rules import load_rules
+from scripts.triple_client import extract_festa, get_apollo_state, parse_next_data
+from scripts.validators import validate_record
+
+STAGES = [
+    "parse_next_data",
+    "extract_festa",
+    "merge_localized",
+    "classify",
+    "validate_record",
+    "save_record_json",
+    "save_record_json_unchanged",
+    "upsert_records_sqlite",
+    "build_index",
+    "render_page",
+]
+
+
+def _measure(fn: Callable[[], Any], items: int, memory: bool) -> Dict[str, Any]:
+    gc.collect()
+    t0 = time.perf_counter()
+    fn()
+    secs = time.perf_counter() - t0
+    out: Dict[str, Any] = {
+        "items": items,
+        "seconds": round(secs, 4),
+        "perItemUs": round(secs / items * 1e6, 2) if items else None,
+        "itemsPerSec": round(items / secs, 1) if secs else None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        out["peakKb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return out
+
+
+def _each(fn: Callable[[Any], Any], items: List[Any]) -> Callable[[], None]:
+    """Apply ``fn`` to every item without keeping results alive (peaks stay per item)."""
+
+    def run() -> None:
+        for item in items:
+            fn(item)
+
+    return run
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(n: int, sample: int, seed: int, memory: bool, stages: List[str]) -> Dict[str, Any]:
+    rules = load_rules()
+    pages = [next_data_page(i, lang, seed) for i in range(min(sample, n)) for lang in LANGS]
+    next_datas = [parse_next_data(p) for p in pages]
+    localized = [localized_festas(i, seed) for i in range(n)]
+    recs = list(records(n, seed))
+    cls_inputs = [
+        (
+            r.get("category"),
+            [t["title"] for t in r["translations"].values() if t.get("title")],
+            date.fromisoformat(r["duration"]["start"]),
+            date.fromisoformat(r["duration"]["end"]),
+        )
+        for r in recs
+    ]
+
+    def merge_all() -> None:
+        for locs in localized:
+            merged: Dict[str, Any] = {}
+            for lang, festa in locs:
+                merge_localized(merged, festa, lang)
+
+    def save_all() -> None:
+        # ``manifest`` is created once inside the temp dir, as the record writer does per run
+        for r in recs:
+            storage.save_record_json(r, manifest)
+
+    def build() -> None:
+        build_index(Path(storage.DATA_DIR), Path("data") / "index.json", 5 * 1024 * 1024, "none")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            manifest = storage.ContentManifest()
+            plans: Dict[str, Any] = {
+                "parse_next_data": (_each(parse_next_data, pages), len(pages)),
+                "extract_festa": (_each(lambda nd: extract_festa(get_apollo_state(nd) or {}), next_datas), len(pages)),
+                "merge_localized": (merge_all, n),
+                "classify": (
+                    _each(lambda a: rules.classify(category=a[0], titles=a[1], start=a[2], end=a[3]), cls_inputs),
+                    n,
+                ),
+                "validate_record": (_each(validate_record, recs), n),
+                "save_record_json": (save_all, n),
+                "save_record_json_unchanged": (save_all, n),
+                "upsert_records_sqlite": (lambda: storage.upsert_records_sqlite(recs), n),
+                "build_index": (build, n),
+                "render_page": (_each(lambda r: render_page(r, SITE_ORIGIN), recs), n),
+            }
+            results = []
+            for name in stages:
+                if name == "save_record_json":
+                    # Cold write: the memory pass must not hit the unchanged shortcut
+                    results.append({"stage": name, **_measure(save_all, n, False)})
+                    if memory:
+                        for p in Path(storage.DATA_DIR).glob("*.json"):
+                            p.unlink()
+                        results[-1].update({k: v for k, v in _measure(save_all, n, True).items() if k == "peakKb"})
+                    continue
+                fn, items = plans[name]
+                results.append({"stage": name, **_measure(fn, items, memory)})
+        finally:
+            os.chdir(cwd)
+    return {"records": n, "pages": len(pages), "stages": results}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pipeline stage benchmarks on a synthetic corpus")
+    ap.add_argument("--scales", type=str, default="1000,10000", help="Comma-separated record counts")
+    ap.add_argument("--sample", type=int, default=1000, help="Festas whose pages feed the page-level stages")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--stages", type=str, default=",".join(STAGES), help="Comma-separated subset of stages")
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (halves runtime)")
+    ap.add_argument("--out", type=str, default=None, help="Also write the JSON result to this file")
+    args = ap.parse_args()
+
+    requested = {s.strip() for s in args.stages.split(",") if s.strip()}
+    unknown = sorted(requested - set(STAGES))
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(unknown)}")
+    # Always run in pipeline order; later stages read what earlier ones wrote
+    stages = [s for s in STAGES if s in requested]
+    if "save_record_json_unchanged" in stages and "save_record_json" not in stages:
+        ap.error("save_record_json_unchanged needs save_record_json to run first")
+    if "build_index" in stages and "save_record_json" not in stages:
+        ap.error("build_index reads the records written by save_record_json")
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "scales": [
+            run_scale(int(s), args.sample, args.seed, not args.no_memory, stages)
+            for s in args.scales.split(",")
+            if s.strip()
+        ],
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
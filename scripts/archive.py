@@ -0,0 +1,187 @@
+"""Record/replay archive of HTTP responses for offline, repeatable crawl runs.
+
+Layout of an archive directory::
+
+    index.jsonl        one line per recorded request (the last line for a key wins)
+    blobs/ab/<sha256>  zlib-compressed response bodies, content-addressed
+
+Requests are keyed by method, URL, ``accept-language`` and (for POST) a hash of the
+JSON body. Conditional headers are stripped while recording so the archive always
+holds full bodies, and ignored on replay. ``RecordingSession``/``ReplaySession`` wrap
+the ``get``/``post`` calls ``triple_client.fetch`` makes, so retries, the limiter and
+the breaker behave exactly as they do live.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+INDEX_NAME = "index.jsonl"
+# Bodies are stored decoded; these would describe the wire form instead
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+_CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+
+def request_key(method: str, url: str, headers: Optional[Dict[str, str]] = None, json_body: Any = None) -> str:
+    lang = ""
+    for k, v in (headers or {}).items():
+        if k.lower() == "accept-language":
+            lang = v
+    key = f"{method.upper()} {url} {lang}"
+    if json_body is not None:
+        key += " " + hashlib.sha1(orjson.dumps(json_body, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return key
+
+
+class ResponseArchive:
+    """Content-addressed response store; the index is held in memory."""
+
+    def __init__(self, path: str, *, writable: bool = False) -> None:
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"responses": 0, "hits": 0, "misses": 0, "blobsWritten": 0, "bytesWritten": 0}
+        if writable:
+            os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        index_path = os.path.join(path, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        entry = orjson.loads(line)
+                        self._index[entry["key"]] = entry
+        elif not writable:
+            raise FileNotFoundError(f"no response archive at {path}")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def put(self, key: str, method: str, url: str, resp: requests.Response) -> None:
+        body = resp.content or b""
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._blob_path(digest)
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "url": url,
+            "status": resp.status_code,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS},
+            "body": digest,
+            "size": len(body),
+        }
+        with self._lock:
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                packed = zlib.compress(body, 6)
+                tmp = f"{blob}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(packed)
+                os.replace(tmp, blob)
+                self._stats["blobsWritten"] += 1
+                self._stats["bytesWritten"] += len(packed)
+            with open(os.path.join(self.path, INDEX_NAME), "ab") as f:
+                f.write(orjson.dumps(entry) + b"\n")
+            self._index[key] = entry
+            self._stats["responses"] += 1
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        with self._lock:
+            entry = self._index.get(key)
+            self._stats["hits" if entry else "misses"] += 1
+        if entry is None:
+            return None
+        with open(self._blob_path(entry["body"]), "rb") as f:
+            return entry, zlib.decompress(f.read())
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "mode": "record" if self.writable else "replay", "entries": len(self._index), **self._stats}
+
+
+def _strip_conditional(headers: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if not headers:
+        return headers
+    return {k: v for k, v in headers.items() if k.lower() not in _CONDITIONAL_HEADERS}
+
+
+class RecordingSession:
+    """Sends every request through ``session`` and archives the response."""
+
+    def __init__(self, session: requests.Session, archive: ResponseArchive) -> None:
+        self.session = session
+        self.archive = archive
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs["headers"] = _strip_conditional(kwargs.get("headers"))
+        resp = self.session.request(method, url, **kwargs)
+        self.archive.put(request_key(method, url, kwargs.get("headers"), kwargs.get("json")), method, url, resp)
+        return resp
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+class ReplaySession:
+    """Answers requests from an archive; unknown requests get a 404 marked ``X-Archive-Miss``."""
+
+    def __init__(self, archive: ResponseArchive, latency: float = 0.0) -> None:
+        self.archive = archive
+        self.latency = latency
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        hit = self.archive.get(request_key(method, url, kwargs.get("headers"), kwargs.get("json")))
+        resp = requests.Response()
+        resp.url = url
+        resp.request = requests.Request(method.upper(), url).prepare()
+        if hit is None:
+            resp.status_code = 404
+            resp.reason = "Not Archived"
+            resp.headers = CaseInsensitiveDict({"X-Archive-Miss": "1"})
+            resp._content = b""
+            return resp
+        entry, body = hit
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = body
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        return resp
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def archive_session(
+    session: requests.Session,
+    *,
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    latency: float = 0.0,
+) -> Tuple[Any, Optional[ResponseArchive]]:
+    """``(session to use, archive)`` for ``--record``/``--replay`` (passthrough when neither)."""
+    if record and replay:
+        raise ValueError("--record and --replay are mutually exclusive")
+    if record:
+        archive = ResponseArchive(record, writable=True)
+        return RecordingSession(session, archive), archive
+    if replay:
+        archive = ResponseArchive(replay)
+        return ReplaySession(archive, latency), archive
+    return session, None
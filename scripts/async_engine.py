@@ -0,0 +1,460 @@
+"""asyncio crawl engine (``crawl_popups.py --engine async``).
+
+Runs discovery and per-locale detail fetches as asyncio tasks on a single event loop,
+so in-flight requests cost a coroutine instead of an OS thread. Page parsing and
+record building run on worker threads (``asyncio.to_thread``) so the CPU work does
+not stall the loop. Records go
+to the caller's ``RecordWriter``; a festa keeps its worker slot until the writer has
+accepted it, so storage that falls behind slows the fetches.
+Retry/backoff, Retry-After and limiter feedback mirror ``triple_client.fetch``; the
+limiters in ``scripts.ratelimit`` are shared with the threaded engine.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+import aiohttp
+from tqdm import tqdm
+
+from scripts.crawl_popups import (
+    LocaleResult,
+    LocaleStats,
+    Pair,
+    build_record,
+    dead_letter,
+    fast_choice,
+    is_festa_sitemap,
+    new_counts,
+    new_discovery,
+    plan_ids,
+    requeue_failures,
+)
+from scripts.http_cache import HttpCache
+from scripts.metrics import Metrics, timed
+from scripts.planner import Quarantine, load_quarantine_conf
+from scripts.ratelimit import Limiter, host_of, parse_retry_after
+from scripts.retry import CircuitBreaker, DeadlineExceeded, RetryPolicy
+from scripts.transport import ConnectionStats
+from scripts.writer import RecordWriter
+from scripts.triple_client import (
+    SITEMAP_INDEX_URL,
+    SitemapEntry,
+    _lang_headers,
+    festa_from_response,
+    load_requeue_policy,
+    load_retry_policy,
+    sitemap_from_response,
+    triple_detail_url,
+)
+
+
+@dataclass
+class AsyncResponse:
+    """Fully-read response; quacks like ``requests.Response`` for ``HttpCache`` and the
+    parsers. The body stays bytes: ``parse_festa_bytes`` scans UTF-8 pages without decoding."""
+
+    url: str
+    status_code: int
+    headers: Mapping[str, str]
+    content: bytes = b""
+    encoding: Optional[str] = None
+
+
+async def fetch_async(
+    session: aiohttp.ClientSession,
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    limiter: Optional[Limiter] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> AsyncResponse:
+    policy = policy or load_retry_policy()
+    started = time.monotonic()
+    if metrics is not None:
+        metrics = metrics.labeled(host=host_of(url))
+
+    last_exc: Optional[Exception] = None
+    for i in range(1, policy.attempts + 1):
+        remaining = policy.remaining(started)
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline {policy.deadline}s exceeded for url: {url}") from last_exc
+        if breaker is not None:
+            breaker.before(url)
+        if limiter is not None:
+            with timed(metrics, "limiter_wait"):
+                await limiter.acquire_async(url)
+        connect, read = policy.timeout(policy.remaining(started))
+        sent_at = time.monotonic()
+        try:
+            async with session.get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+            ) as resp:
+                status = resp.status
+                if metrics is not None:
+                    metrics.observe("ttfb", time.monotonic() - sent_at, status=status)
+                ra = None
+                if status in (429, 503):
+                    ra = parse_retry_after(resp.headers.get("Retry-After"))
+                if limiter is not None:
+                    limiter.observe(
+                        url,
+                        status=status,
+                        elapsed=time.monotonic() - sent_at,
+                        retry_after=min(ra, policy.max_wait) if ra is not None else None,
+                    )
+                if breaker is not None:
+                    if status >= 500:
+                        breaker.record_failure(url)
+                    else:
+                        breaker.record_success(url)
+                # Respect Retry-After on throttling/server busy
+                if ra is not None:
+                    if limiter is None:
+                        await asyncio.sleep(max(0.0, min(ra, policy.max_wait, policy.remaining(started))))
+                    continue
+                if status < 400:
+                    with timed(metrics, "download", status=status):
+                        content = await resp.read()
+                    return AsyncResponse(
+                        url=url,
+                        status_code=status,
+                        headers=resp.headers.copy(),
+                        content=content,
+                        encoding=resp.get_encoding(),  # declared charset, else detected from the body
+                    )
+                try:
+                    resp.raise_for_status()
+                except aiohttp.ClientResponseError as e:
+                    last_exc = e
+                if not policy.is_retryable_status(status):
+                    raise last_exc
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if isinstance(e, aiohttp.ClientResponseError):
+                raise
+            last_exc = e
+            if metrics is not None:
+                metrics.observe("ttfb", time.monotonic() - sent_at, status=type(e).__name__)
+            if breaker is not None:
+                breaker.record_failure(url)
+            if limiter is not None and isinstance(e, asyncio.TimeoutError):
+                limiter.observe(url, timeout=True)
+        if i >= policy.attempts:
+            break
+        await asyncio.sleep(max(0.0, min(policy.backoff(i), policy.remaining(started))))
+    if last_exc is None:
+        # Every attempt was answered with Retry-After; surface it like requests would
+        last_exc = RuntimeError(f"retry budget exhausted by Retry-After for url: {url}")
+    raise last_exc
+
+
+async def fetch_festa_by_lang_async(
+    session: aiohttp.ClientSession,
+    festa_id: str,
+    lang: str,
+    limiter: Optional[Limiter] = None,
+    cache: Optional[HttpCache] = None,
+    *,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Optional[Dict[str, Any]]:
+    url = triple_detail_url(lang, festa_id)
+    hdrs = _lang_headers(lang)
+    if cache is not None:
+        hdrs = {**hdrs, **cache.get_conditional_headers(url, require_extraction=True)}
+    if metrics is not None:
+        metrics = metrics.labeled(lang=lang)
+    resp = await fetch_async(session, url, headers=hdrs, limiter=limiter, breaker=breaker, metrics=metrics)
+    # HTML parsing, extraction and classification are CPU work; keep them off the event loop
+    return await asyncio.to_thread(festa_from_response, url, resp, cache, metrics)
+
+
+async def fetch_sitemap_async(
+    session: aiohttp.ClientSession,
+    url: str,
+    limiter: Optional[Limiter] = None,
+    cache: Optional[HttpCache] = None,
+    *,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[List[SitemapEntry], bool]:
+    hdrs = cache.get_conditional_headers(url, require_extraction=True) if cache is not None else None
+    resp = await fetch_async(session, url, headers=hdrs or None, limiter=limiter, breaker=breaker, metrics=metrics)
+    # Parsing a large sitemap is CPU work; keep it off the event loop
+    return await asyncio.to_thread(sitemap_from_response, url, resp, cache)
+
+
+async def load_sitemap_festa_entries_async(
+    session: aiohttp.ClientSession,
+    limiter: Optional[Limiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    cache: Optional[HttpCache] = None,
+    index_url: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[List[SitemapEntry], Dict[str, Any]]:
+    t0 = time.monotonic()
+    stats = new_discovery()
+    index, _ = await fetch_sitemap_async(
+        session, index_url or SITEMAP_INDEX_URL, limiter, cache, breaker=breaker, metrics=metrics
+    )
+    all_sitemaps = [loc for loc, _ in index if is_festa_sitemap(loc)]
+    stats["sitemaps"] = len(all_sitemaps)
+
+    async def one(sm: str) -> Optional[Tuple[List[SitemapEntry], bool]]:
+        try:
+            return await fetch_sitemap_async(session, sm, limiter, cache, breaker=breaker, metrics=metrics)
+        except Exception:
+            return None
+
+    entries: List[SitemapEntry] = []
+    # gather keeps sitemap order so ID order matches the threaded engine
+    for res in await asyncio.gather(*(one(sm) for sm in all_sitemaps)):
+        if res is None:
+            stats["failed"] += 1
+            continue
+        part, not_modified = res
+        stats["notModified"] += int(not_modified)
+        entries.extend(part)
+    stats["urls"] = len(entries)
+    stats["seconds"] = round(time.monotonic() - t0, 3)
+    return entries, stats
+
+
+async def fetch_locales_async(
+    fetch_lang: Callable[[str], Awaitable[LocaleResult]],
+    langs: List[str],
+    fast: bool,
+    hedge_delay: float,
+    stats: Optional[LocaleStats] = None,
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], bool]:
+    """Task-based twin of ``crawl_popups.fetch_locales``; losing hedges are really cancelled."""
+    stats = stats or LocaleStats()
+    if not fast:
+        stats.add("launched", len(langs))
+        results = await asyncio.gather(*(fetch_lang(lang) for lang in langs))
+        return [(lang, festa) for lang, (festa, _) in zip(langs, results) if festa], any(err for _, err in results)
+
+    outcome: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending: Dict["asyncio.Task[LocaleResult]", str] = {}
+    launched = 0
+    had_error = False
+
+    def launch(hedge: bool = False) -> None:
+        nonlocal launched
+        pending[asyncio.create_task(fetch_lang(langs[launched]))] = langs[launched]
+        launched += 1
+        stats.add("launched")
+        if hedge:
+            stats.add("hedged")
+
+    while True:
+        decided, chosen = fast_choice(langs, outcome)
+        if decided:
+            break
+        if not pending:
+            launch()
+            continue
+        more = launched < len(langs)
+        done, _ = await asyncio.wait(
+            list(pending), timeout=hedge_delay if more else None, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            launch(hedge=True)
+            continue
+        for task in done:
+            festa, err = task.result()
+            outcome[pending.pop(task)] = festa
+            had_error = had_error or err
+            if not festa and launched < len(langs):
+                launch()
+    for task in pending:
+        task.cancel()
+    stats.add("discarded", len(pending) + sum(1 for lang, f in outcome.items() if f and lang != chosen))
+    return ([(chosen, outcome[chosen])] if chosen else []), had_error  # type: ignore[list-item]
+
+
+def build_async_session(
+    workers: int, *, stats: Optional[ConnectionStats] = None, per_host: Optional[int] = None
+) -> aiohttp.ClientSession:
+    """aiohttp counterpart of ``transport.build_session``, feeding the same stats."""
+    trace = aiohttp.TraceConfig()
+    if stats is not None:
+
+        async def on_request_start(session: Any, ctx: Any, params: Any) -> None:
+            ctx.host = params.url.host
+            stats.on_checkout(ctx.host)
+
+        async def on_create_start(session: Any, ctx: Any, params: Any) -> None:
+            ctx.connect_t0 = time.perf_counter()
+
+        async def on_create_end(session: Any, ctx: Any, params: Any) -> None:
+            stats.on_connect(ctx.host, time.perf_counter() - ctx.connect_t0)
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_start.append(on_create_start)
+        trace.on_connection_create_end.append(on_create_end)
+    connector = aiohttp.TCPConnector(
+        limit=max(1, workers), limit_per_host=max(1, per_host or workers), keepalive_timeout=30
+    )
+    return aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+
+
+async def _crawl(
+    limit: Optional[int],
+    fast: bool,
+    workers: int,
+    limiter: Optional[Limiter],
+    langs: List[str],
+    stats: Optional[ConnectionStats] = None,
+    per_host: Optional[int] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    full: bool = False,
+    *,
+    hedge_delay: float = 0.5,
+    index_url: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    writer: Optional[RecordWriter] = None,
+) -> Dict[str, Any]:
+    writer = writer or RecordWriter(metrics=metrics)
+    cache = HttpCache()
+    errors: List[Dict[str, Any]] = []
+    locale_stats = LocaleStats()
+
+    # Each in-flight festa may have every locale requested at once
+    async with build_async_session(workers * len(langs), stats=stats, per_host=per_host) as session:
+        entries, discovery = await load_sitemap_festa_entries_async(
+            session, limiter, breaker, cache, index_url, metrics
+        )
+        ordered_ids, plan_summary = plan_ids(entries, limit, cache, langs, full)
+        sem = asyncio.Semaphore(max(1, workers))
+        quarantine = Quarantine(cache, load_quarantine_conf())
+
+        failed: Dict[Pair, BaseException] = {}
+        # Every locale each ID got in the main pass, for merging recovered ones
+        fetched_by: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        def build_and_put(fid: str, fetched: List[Tuple[str, Dict[str, Any]]], had_error: bool) -> str:
+            # Runs on a worker thread: record building is CPU work and put() may block
+            status, merged = build_record(fetched, had_error, metrics)
+            writer.put(fid, status, merged)
+            return status
+
+        async def process_one(fid: str) -> str:
+            async def fetch_lang(lang: str) -> LocaleResult:
+                held, festa = quarantine.held(triple_detail_url(lang, fid))
+                if held:
+                    return festa, False
+                try:
+                    return await fetch_festa_by_lang_async(
+                        session, fid, lang, limiter, cache, breaker=breaker, metrics=metrics
+                    ), False
+                except Exception as e:
+                    errors.append({"id": fid, "lang": lang, "error": repr(e)})
+                    failed[(fid, lang)] = e
+                    return None, True
+
+            async with sem:
+                fetched, had_error = await fetch_locales_async(fetch_lang, langs, fast, hedge_delay, locale_stats)
+                fetched_by[fid] = dict(fetched)
+                return await asyncio.to_thread(build_and_put, fid, fetched, had_error)
+
+        counts = new_counts()
+        tasks = {asyncio.create_task(process_one(fid)): fid for fid in ordered_ids}
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Fetch festas"):
+            counts[await task] += 1
+        statuses = {fid: task.result() for task, fid in tasks.items()}
+
+        # Retry queue: only the failed (id, locale) pairs, merged into what each ID already has,
+        # as in the threaded engine. With --fast an ID that got any locale is complete.
+        if fast:
+            failed = {pair: e for pair, e in failed.items() if statuses.get(pair[0]) == "failed"}
+        loop = asyncio.get_running_loop()
+
+        async def fetch_pairs_async(pairs: List[Pair]) -> Dict[Pair, Any]:
+            results = await asyncio.gather(
+                *(
+                    fetch_festa_by_lang_async(session, fid, lang, limiter, cache, breaker=breaker, metrics=metrics)
+                    for fid, lang in pairs
+                ),
+                return_exceptions=True,
+            )
+            return dict(zip(pairs, results))
+
+        def fetch_pairs(pairs: List[Pair]) -> Dict[Pair, Any]:
+            return asyncio.run_coroutine_threadsafe(fetch_pairs_async(pairs), loop).result()
+
+        # requeue_failures sleeps between rounds; it runs on a thread and fetches on the loop
+        recovered, dead, rounds = await asyncio.to_thread(
+            requeue_failures, failed, fetch_pairs, load_requeue_policy(), breaker=breaker
+        )
+        for fid in sorted({fid for fid, _ in recovered}):
+            by_lang = {**fetched_by.get(fid, {}), **{lang: f for (rid, lang), f in recovered.items() if rid == fid and f}}
+            fetched = []
+            for lang in langs:
+                if by_lang.get(lang):
+                    fetched.append((lang, by_lang[lang]))
+                    if fast:
+                        break
+            status = await asyncio.to_thread(build_and_put, fid, fetched, any((fid, lang) in dead for lang in langs))
+            counts[statuses[fid]] -= 1
+            counts[status] += 1
+        dead_letters = dead_letter(dead, cache)
+        if recovered:
+            print(f"Retry recovered {len(recovered)} locale(s) across {len({fid for fid, _ in recovered})} festa(s)")
+
+    cache.close()
+    return {
+        "errors": errors,
+        "counts": counts,
+        "retry": {
+            "queued": len(failed),
+            "recovered": len(recovered),
+            "rounds": rounds,
+            "deadLettered": len(dead_letters),
+            "deadLetters": dead_letters,
+        },
+        "discovery": discovery,
+        "plan": plan_summary,
+        "locales": locale_stats.report(),
+        "httpCache": cache.report(),
+        "quarantine": quarantine.report(),
+    }
+
+
+def crawl(
+    limit: Optional[int],
+    fast: bool,
+    workers: int,
+    limiter: Optional[Limiter],
+    langs: List[str],
+    stats: Optional[ConnectionStats] = None,
+    per_host: Optional[int] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    full: bool = False,
+    *,
+    hedge_delay: float = 0.5,
+    index_url: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    writer: Optional[RecordWriter] = None,
+) -> Dict[str, Any]:
+    return asyncio.run(
+        _crawl(
+            limit,
+            fast,
+            workers,
+            limiter,
+            langs,
+            stats,
+            per_host,
+            breaker,
+            full,
+            hedge_delay=hedge_delay,
+            index_url=index_url,
+            metrics=metrics,
+            writer=writer,
+        )
+    )
@@ -1,10 +1,17 @@
 from __future__ import annotations
 import argparse
 import json
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.storage import load_changed_ids
 
 
 TITLE_ORDER = ["ko", "en", "ja", "zh-cn"]
@@ -175,18 +182,93 @@ def shard_monthly(entries: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any
     return buckets
 
 
+def _shard_name(month: str) -> str:
+    return f"index-{month}.json" if month != "unknown" else "index-unknown.json"
+
+
+def load_previous_index(output: Path) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]]:
+    """Entries and monthly shards of the last build at ``output``, or None when unusable."""
+    try:
+        manifest = json.loads((output.parent / "index-manifest.json").read_text(encoding="utf-8"))
+        shards: Dict[str, List[Dict[str, Any]]] = {}
+        if manifest.get("mode") == "monthly":
+            entries: List[Dict[str, Any]] = []
+            for m in manifest.get("months") or []:
+                shards[m] = json.loads((output.parent / _shard_name(m)).read_text(encoding="utf-8"))
+                entries.extend(shards[m])
+        else:
+            entries = json.loads(output.read_text(encoding="utf-8"))
+    except (OSError, ValueError, AttributeError):
+        return None
+    if not isinstance(entries, list) or len(entries) != manifest.get("total"):
+        return None
+    return entries, shards
+
+
+def _load_entry(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        rec = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    ent = record_to_index_entry(rec)
+    return ent.to_dict() if ent is not None else None
+
+
+def update_entries(input_dir: Path, previous: List[Dict[str, Any]], changed: Set[str]) -> Tuple[List[Dict[str, Any]], int]:
+    """Entries for ``input_dir`` reusing ``previous``: only IDs in ``changed`` or new files are read.
+
+    Returns ``(entries, records_read)``; entries come out in the same order as a full build.
+    Files whose ID is gone from ``input_dir`` drop out.
+    """
+    by_name = {f"{e.get('id')}.json": e for e in previous}
+    entries: List[Dict[str, Any]] = []
+    read = 0
+    for p in sorted(input_dir.glob("*.json")):
+        prev = by_name.get(p.name)
+        if prev is None or p.stem in changed:
+            read += 1
+            ent = _load_entry(p)
+            if ent is not None:
+                entries.append(ent)
+        else:
+            entries.append(prev)
+    return entries, read
+
+
+def _write_shards(
+    entries: List[Dict[str, Any]], out_dir: Path, previous: Dict[str, List[Dict[str, Any]]]
+) -> List[str]:
+    buckets = shard_monthly(entries)
+    months = sorted(buckets.keys())
+    for m in months:
+        if previous.get(m) != buckets[m]:
+            write_json(out_dir / _shard_name(m), buckets[m])
+    return months
+
+
 def build_index(
     input_dir: Path,
     output: Path,
     max_bytes: int,
     shard: str,
+    changed: Optional[Set[str]] = None,
 ) -> Tuple[str, Dict[str, Any]]:
-    entries: List[Dict[str, Any]] = []
-    for rec in load_records(input_dir):
-        ent = record_to_index_entry(rec)
-        if ent is None:
-            continue
-        entries.append(ent.to_dict())
+    """Build the index; with ``changed`` (IDs from ``data/changed_ids.json``) the previous
+    build at ``output`` is reused and only those records are read, falling back to a full
+    build when there is no usable previous build. Unchanged monthly shards are not rewritten.
+    """
+    previous = load_previous_index(output) if changed is not None else None
+    prev_shards: Dict[str, List[Dict[str, Any]]] = {}
+    if previous is not None:
+        entries, _ = update_entries(input_dir, previous[0], changed or set())
+        prev_shards = previous[1]
+    else:
+        entries = []
+        for rec in load_records(input_dir):
+            ent = record_to_index_entry(rec)
+            if ent is None:
+                continue
+            entries.append(ent.to_dict())
 
     manifest: Dict[str, Any] = {
         "generatedAt": datetime.utcnow().isoformat(),
@@ -196,12 +278,7 @@ def build_index(
     }
 
     if shard == "monthly":
-        buckets = shard_monthly(entries)
-        months = sorted(buckets.keys())
-        out_dir = output.parent
-        for m in months:
-            fname = f"index-{m}.json" if m != "unknown" else "index-unknown.json"
-            write_json(out_dir / fname, buckets[m])
+        months = _write_shards(entries, output.parent, prev_shards)
         manifest.update({"mode": "monthly", "months": months})
         # Also write a thin top-level index.json with empty array to keep paths stable
         write_json(output, [])
@@ -211,12 +288,7 @@ def build_index(
     size = write_json(output, entries)
     if size > max_bytes:
         # Fallback to monthly sharding automatically
-        buckets = shard_monthly(entries)
-        months = sorted(buckets.keys())
-        out_dir = output.parent
-        for m in months:
-            fname = f"index-{m}.json" if m != "unknown" else "index-unknown.json"
-            write_json(out_dir / fname, buckets[m])
+        months = _write_shards(entries, output.parent, prev_shards)
         manifest.update({
             "mode": "monthly",
             "months": months,
@@ -256,8 +328,21 @@ def main() -> int:
         default="none",
         help="Force sharding strategy (none=auto)",
     )
+    parser.add_argument(
+        "--changed",
+        type=str,
+        default=None,
+        help="Changed-IDs file from the crawl (data/changed_ids.json): re-read only those records",
+    )
     args = parser.parse_args()
 
+    changed: Optional[Set[str]] = None
+    if args.changed:
+        try:
+            changed = load_changed_ids(args.changed)
+        except (OSError, ValueError):
+            print(f"No changed-IDs file at {args.changed}; building from every record")
+
     input_dir = Path(args.input_dir)
     output = Path(args.output)
     shard_mode = args.shard
@@ -269,6 +354,7 @@ def main() -> int:
         output=output,
         max_bytes=int(args.max_bytes),
         shard="monthly" if shard_mode == "monthly" else "single",
+        changed=changed,
     )
 
     manifest_path = output.parent / "index-manifest.json"
@@ -3,13 +3,22 @@ import argparse
 import html
 import json
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Tuple
+import re
+import sys
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
 import datetime as dt
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.storage import load_changed_ids
+
 
 TITLE_ORDER = ["ko", "en", "ja", "zh-cn"]
 ADSENSE_PUB = "ca-pub-5716436301710258"
 SITE_ORIGIN = "https://popup.deluxo.co.kr"
+_SITEMAP_URL = re.compile(r"<loc>(.*?)</loc>\s*<lastmod>(.*?)</lastmod>")
 
 
 def _pick_title(rec: Dict[str, Any]) -> Optional[str]:
@@ -67,6 +76,15 @@ def load_records(input_dir: Path) -> Iterable[Tuple[Dict[str, Any], Path]]:
             continue
 
 
+def read_sitemap_lastmods(path: Path) -> Dict[str, str]:
+    """``loc -> lastmod`` of a sitemap written by this script; empty when there is none."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    return {html.unescape(loc): html.unescape(lm) for loc, lm in _SITEMAP_URL.findall(text)}
+
+
 def escape(s: Optional[str]) -> str:
     return html.escape(s or "")
 
@@ -242,12 +260,29 @@ def main() -> int:
     ap.add_argument("--site-origin", type=str, default=SITE_ORIGIN, help="Site origin for canonical URLs and sitemap locs")
     ap.add_argument("--sitemap-out", type=str, default=None, help="Path to write sitemap.xml (optional)")
     ap.add_argument("--robots-out", type=str, default=None, help="Path to write robots.txt (optional)")
+    ap.add_argument(
+        "--changed",
+        type=str,
+        default=None,
+        help="Changed-IDs file from the crawl (data/changed_ids.json): re-render only those pages",
+    )
     args = ap.parse_args()
 
     src = Path(args.input_dir)
     out = Path(args.out_dir)
     out.mkdir(parents=True, exist_ok=True)
 
+    changed: Optional[Set[str]] = None
+    if args.changed:
+        try:
+            changed = load_changed_ids(args.changed)
+        except (OSError, ValueError):
+            print(f"No changed-IDs file at {args.changed}; rendering every page")
+    # Sitemap entries of unchanged pages are carried over from the previous sitemap
+    prev_lastmod: Dict[str, str] = {}
+    if changed is not None and args.sitemap_out:
+        prev_lastmod = read_sitemap_lastmods(Path(args.sitemap_out))
+
     # Collect for pages and optional sitemap
     total = 0
     url_items: list[tuple[str, str]] = []  # (loc, lastmod)
@@ -267,7 +302,24 @@ def main() -> int:
         ts = dt.datetime.fromtimestamp(src_path.stat().st_mtime, tz=dt.timezone.utc)
         return ts.isoformat().replace('+00:00', 'Z')
 
-    for rec, src_path in load_records(src):
+    def records() -> Iterable[Tuple[Dict[str, Any], Path]]:
+        if changed is None:
+            yield from load_records(src)
+            return
+        for p in sorted(src.glob("*.json")):
+            loc = f"{args.site_origin}/p/{p.stem}.html"
+            if p.stem not in changed and (out / f"{p.stem}.html").exists():
+                if not args.sitemap_out:
+                    continue
+                if loc in prev_lastmod:
+                    url_items.append((loc, prev_lastmod[loc]))
+                    continue
+            try:
+                yield json.loads(p.read_text(encoding="utf-8")), p
+            except Exception:
+                continue
+
+    for rec, src_path in records():
         rid = rec.get("id")
         if not rid:
             continue
@@ -1,14 +1,17 @@
 from __future__ import annotations
+import os
 import sys
 import time
-from datetime import datetime, date
+from datetime import datetime
 import argparse
+import signal
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 import json
 
+import orjson
 import requests
 from tqdm import tqdm
 
@@ -17,59 +20,90 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from scripts.triple_client import (
+    DETAIL_BASE_URL,
     SITEMAP_INDEX_URL,
+    SitemapEntry,
     extract_id_from_url,
-    fetch,
+    fetch_detail,
     fetch_festa_by_lang,
-    parse_sitemap_index,
-    parse_sitemap_urls,
+    fetch_festas_graphql,
+    fetch_sitemap,
+    load_graphql_conf,
+    load_requeue_policy,
+    load_retry_policy,
+    festa_from_response,
+    parse_festa_bytes,
+    set_detail_base,
+    triple_detail_url,
 )
-from scripts.storage import save_record_json, upsert_records_sqlite
-from scripts.rules import PopupRules, load_rules
+from scripts.storage import DATA_DIR, ContentManifest, content_hash, dump_json, upsert_records_sqlite
+from scripts.rules import load_rules
 from scripts.http_cache import HttpCache
 from scripts.validators import validate_record
+from scripts.ratelimit import Limiter, make_limiter
+from scripts.transport import ConnectionStats, build_session
+from scripts.retry import CircuitBreaker, RequeuePolicy, is_permanent, reached_origin
+from scripts.planner import SKIP, Quarantine, load_planner_conf, load_quarantine_conf, plan, plan_report
+from scripts.archive import archive_session
+from scripts.metrics import Metrics, timed
+from scripts.journal import CrawlJournal
+from scripts.pipeline import Stage, StagedPipeline, load_pipeline_conf, process_pool, run_with_metrics
+from scripts.writer import RecordWriter, load_writer_conf
 
 
 # Preferred locales to fetch (ko often missing; include zh-CN)
 LANGS = ["zh-cn", "en", "ja", "ko"]
 
 
-class RateLimiter:
-    def __init__(self, qps: float) -> None:
-        self.interval = 1.0 / qps if qps and qps > 0 else 0.0
-        self._lock = threading.Lock()
-        self._next_at = 0.0
+def is_festa_sitemap(url: str) -> bool:
+    return "sitemap-festa-detail-urls-" in url
 
-    def acquire(self) -> None:
-        if self.interval <= 0:
-            return
-        with self._lock:
-            now = time.monotonic()
-            sleep_for = self._next_at - now
-            if sleep_for > 0:
-                # Reserve slot first to reduce thundering herd
-                self._next_at += self.interval
-            else:
-                self._next_at = now + self.interval
-        if sleep_for > 0:
-            time.sleep(sleep_for)
-
-
-def load_sitemap_festa_urls(session: requests.Session, limiter: Optional[RateLimiter] = None) -> List[str]:
-    if limiter:
-        limiter.acquire()
-    idx = fetch(session, SITEMAP_INDEX_URL).text
-    all_sitemaps = [u for u in parse_sitemap_index(idx) if "sitemap-festa-detail-urls-" in u]
-    urls: List[str] = []
-    for sm in tqdm(all_sitemaps, desc="Fetch sitemaps"):
+
+def new_discovery() -> Dict[str, Any]:
+    return {"sitemaps": 0, "notModified": 0, "failed": 0, "urls": 0, "seconds": 0.0}
+
+
+def load_sitemap_festa_entries(
+    session: requests.Session,
+    limiter: Optional[Limiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    cache: Optional[HttpCache] = None,
+    *,
+    workers: int = 8,
+    index_url: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[List[SitemapEntry], Dict[str, Any]]:
+    """``(loc, lastmod)`` for every festa detail URL, plus a discovery summary.
+
+    Sitemap files are fetched concurrently (paced by ``limiter``) with conditional
+    GETs; a 304 reuses the entry list stored in ``cache`` by the previous run.
+    ``index_url`` overrides the live sitemap index (``--sitemap-url``).
+    """
+    t0 = time.monotonic()
+    stats = new_discovery()
+    index, _ = fetch_sitemap(session, index_url or SITEMAP_INDEX_URL, limiter, cache, breaker=breaker, metrics=metrics)
+    all_sitemaps = [loc for loc, _ in index if is_festa_sitemap(loc)]
+    stats["sitemaps"] = len(all_sitemaps)
+
+    def one(sm: str) -> Optional[Tuple[List[SitemapEntry], bool]]:
         try:
-            if limiter:
-                limiter.acquire()
-            xml = fetch(session, sm).text
-            urls.extend(parse_sitemap_urls(xml))
+            return fetch_sitemap(session, sm, limiter, cache, breaker=breaker, metrics=metrics)
         except Exception:
-            continue
-    return urls
+            return None
+
+    entries: List[SitemapEntry] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(all_sitemaps) or 1))) as ex:
+        # map keeps sitemap order so ID order is stable across runs
+        for res in tqdm(ex.map(one, all_sitemaps), total=len(all_sitemaps), desc="Fetch sitemaps"):
+            if res is None:
+                stats["failed"] += 1
+                continue
+            part, not_modified = res
+            stats["notModified"] += int(not_modified)
+            entries.extend(part)
+    stats["urls"] = len(entries)
+    stats["seconds"] = round(time.monotonic() - t0, 3)
+    return entries, stats
 
 
 def _non_empty(val: Any) -> bool:
@@ -137,12 +171,7 @@ def merge_localized(base: Dict[str, Any], festa: Dict[str, Any], lang: str) -> D
     return base
 
 
-def main(limit: Optional[int], fast: bool, workers: int, qps: float, langs: List[str]) -> int:
-    session = requests.Session()
-    limiter = RateLimiter(qps) if qps and qps > 0 else None
-    cache = HttpCache()
-
-    festa_urls = load_sitemap_festa_urls(session, limiter)
+def collect_festa_ids(festa_urls: List[str], limit: Optional[int]) -> List[str]:
     festa_ids: List[str] = []
     for u in festa_urls:
         fid = extract_id_from_url(u)
@@ -158,108 +187,362 @@ def main(limit: Optional[int], fast: bool, workers: int, qps: float, langs: List
 
     if limit:
         ordered_ids = ordered_ids[:limit]
+    return ordered_ids
 
-    errors: List[Dict[str, Any]] = []
-    err_lock = threading.Lock()
 
-    def process_one(fid: str) -> Optional[Dict[str, Any]]:
-        sess = requests.Session()
-        merged: Dict[str, Any] = {}
-        any_lang_ok = False
-        for lang in langs:
-            try:
-                festa = fetch_festa_by_lang(sess, fid, lang, limiter.acquire if limiter else None, cache)
-                if festa:
-                    any_lang_ok = True
-                    merged = merge_localized(merged, festa, lang)
-                    if fast:
-                        break
-            except Exception as e:
-                with err_lock:
-                    errors.append({"id": fid, "lang": lang, "error": repr(e)})
-                continue
-        if not any_lang_ok:
-            return None
-        merged.setdefault("meta", {})["fetchedAt"] = datetime.utcnow().isoformat()
-        # Classification (non-blocking): tag popup detection by category|keyword|duration
-        rules = load_rules()
-        titles: List[str] = []
-        tr = merged.get("translations") or {}
-        if isinstance(tr, dict):
-            for loc, vals in tr.items():
-                if isinstance(vals, dict):
-                    t = vals.get("title")
-                    if t:
-                        titles.append(str(t))
-        dur = merged.get("duration") or {}
-        start = _parse_date(dur.get("start")) if isinstance(dur, dict) else None
-        end = _parse_date(dur.get("end")) if isinstance(dur, dict) else None
-        is_popup, det_details = rules.classify(
-            category=merged.get("category"), titles=titles, start=start, end=end
-        )
-        merged["isPopup"] = is_popup
-        if any(det_details.values()):
-            merged.setdefault("meta", {})["detection"] = det_details
-        # Image selection meta
-        imgs = merged.get("images") or []
-        if isinstance(imgs, list):
-            merged.setdefault("meta", {})["images"] = _compute_image_meta(imgs)
-        # Pricing normalization from description texts
-        price_texts: List[str] = []
-        pr = merged.get("pricing") or {}
-        if isinstance(pr, dict) and pr.get("description"):
-            price_texts.append(str(pr.get("description")))
-        if isinstance(tr, dict):
-            for loc, vals in tr.items():
-                if isinstance(vals, dict) and vals.get("priceDesc"):
-                    price_texts.append(str(vals.get("priceDesc")))
-        norm = _normalize_pricing_from_texts(price_texts)
-        if norm:
-            merged.setdefault("pricing", {})["normalized"] = norm
-        # Validation (non-blocking): attach errors/warnings
+def finalize_record(merged: Dict[str, Any], metrics: Optional[Metrics] = None) -> Dict[str, Any]:
+    """Attach fetchedAt, classification, image/pricing meta and validation to a merged record."""
+    merged.setdefault("meta", {})["fetchedAt"] = datetime.utcnow().isoformat()
+    return derive_fields(merged, metrics)
+
+
+def derive_fields(
+    merged: Dict[str, Any],
+    metrics: Optional[Metrics] = None,
+    detection: Optional[Tuple[bool, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """The fields computed from fetched content (not fetched themselves); see ``clear_derived``.
+
+    ``detection`` is the record's ``classify_record`` result when the caller already
+    classified a batch with ``classify_many``.
+    """
+    # Classification (non-blocking): tag popup detection by category|keyword|duration
+    with timed(metrics, "classify"):
+        is_popup, det_details = detection or load_rules().classify_record(merged)
+    merged["isPopup"] = is_popup
+    if any(det_details.values()):
+        merged.setdefault("meta", {})["detection"] = det_details
+    # Image selection meta
+    imgs = merged.get("images") or []
+    if isinstance(imgs, list):
+        merged.setdefault("meta", {})["images"] = _compute_image_meta(imgs)
+    # Pricing normalization from description texts
+    price_texts: List[str] = []
+    tr = merged.get("translations") or {}
+    pr = merged.get("pricing") or {}
+    if isinstance(pr, dict) and pr.get("description"):
+        price_texts.append(str(pr.get("description")))
+    if isinstance(tr, dict):
+        for loc, vals in tr.items():
+            if isinstance(vals, dict) and vals.get("priceDesc"):
+                price_texts.append(str(vals.get("priceDesc")))
+    norm = _normalize_pricing_from_texts(price_texts)
+    if norm:
+        merged.setdefault("pricing", {})["normalized"] = norm
+    # Validation (non-blocking): attach errors/warnings
+    with timed(metrics, "validate"):
         errs, warns = validate_record(merged)
-        if errs or warns:
-            merged.setdefault("meta", {}).setdefault("validation", {})["errors"] = errs
-            merged.setdefault("meta", {}).setdefault("validation", {})["warnings"] = warns
-        save_record_json(merged)
-        return merged
-
-    records: List[Dict[str, Any]] = []
-    saved = 0
-    skipped = 0
-
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        for res in tqdm(ex.map(process_one, ordered_ids), total=len(ordered_ids), desc="Fetch festas"):
-            if res:
-                records.append(res)
-                saved += 1
+    if errs or warns:
+        merged.setdefault("meta", {}).setdefault("validation", {})["errors"] = errs
+        merged.setdefault("meta", {}).setdefault("validation", {})["warnings"] = warns
+    return merged
+
+
+def clear_derived(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove what ``derive_fields`` adds, so deriving again starts from fetched content only."""
+    record.pop("isPopup", None)
+    meta = record.get("meta")
+    if isinstance(meta, dict):
+        for key in ("detection", "images", "validation"):
+            meta.pop(key, None)
+    pricing = record.get("pricing")
+    if isinstance(pricing, dict):
+        pricing.pop("normalized", None)
+    return record
+
+
+def _rederive_chunk(paths: List[str]) -> Dict[str, Any]:
+    """Re-derive stored records; changed ones are rewritten (``fetchedAt`` kept)."""
+    out: Dict[str, Any] = {"records": 0, "popups": 0, "changed": [], "errors": []}
+    loaded: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                stored = orjson.loads(f.read())
+            loaded.append((path, stored, clear_derived(orjson.loads(orjson.dumps(stored)))))
+        except Exception as e:
+            out["errors"].append({"path": path, "error": repr(e)})
+    # One classification pass for the chunk; a bad record falls back to one at a time below
+    try:
+        detections: List[Any] = load_rules().classify_many(fresh for _, _, fresh in loaded)
+    except Exception:
+        detections = [None] * len(loaded)
+    for (path, stored, fresh), detection in zip(loaded, detections):
+        try:
+            record = derive_fields(fresh, detection=detection)
+            changed = record != stored
+            if changed:
+                dump_json(path, record)
+        except Exception as e:
+            out["errors"].append({"path": path, "error": repr(e)})
+            continue
+        out["records"] += 1
+        out["popups"] += bool(record.get("isPopup"))
+        if changed:
+            out["changed"].append(record)
+    return out
+
+
+def reclassify(
+    records_dir: str = DATA_DIR, workers: Optional[int] = None, chunk_size: int = 256, flush_every: int = 1000
+) -> Dict[str, Any]:
+    """Re-run classification, image/pricing meta and validation over every stored record.
+
+    Files are streamed from ``records_dir`` in chunks to a process pool (inline when
+    ``workers`` is 1). Only records whose derived fields changed are rewritten, and
+    their SQLite rows are refreshed in batches; their IDs and content hashes go to the
+    ``ContentManifest`` (``data/changed_ids.json``). No network access.
+    """
+    started = time.monotonic()
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    def chunks() -> Iterator[List[str]]:
+        chunk: List[str] = []
+        with os.scandir(records_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    chunk.append(entry.path)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+        if chunk:
+            yield chunk
+
+    summary: Dict[str, Any] = {"records": 0, "changed": 0, "popups": 0, "errors": []}
+    pending: List[Dict[str, Any]] = []
+    manifest = ContentManifest()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = pool.map(_rederive_chunk, chunks()) if pool else map(_rederive_chunk, chunks())
+        for part in results:
+            summary["records"] += part["records"]
+            summary["popups"] += part["popups"]
+            summary["changed"] += len(part["changed"])
+            summary["errors"].extend(part["errors"])
+            pending.extend(part["changed"])
+            for record in part["changed"]:
+                manifest.set(record["id"], content_hash(record), changed=True)
+            if len(pending) >= flush_every:
+                upsert_records_sqlite(pending)
+                pending.clear()
+    finally:
+        if pool:
+            pool.shutdown()
+    if pending:
+        upsert_records_sqlite(pending)
+    manifest.save()
+    summary["seconds"] = round(time.monotonic() - started, 2)
+    summary["workers"] = workers
+    return summary
+
+
+def plan_ids(
+    entries: List[SitemapEntry],
+    limit: Optional[int],
+    cache: HttpCache,
+    langs: List[str],
+    full: bool = False,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """IDs to crawl this run (``limit`` applies to the work set) and the plan report."""
+    ids = collect_festa_ids([loc for loc, _ in entries], None)
+    decisions = plan(ids, entries, cache, langs, full=full, conf=load_planner_conf())
+    work = [d.id for d in decisions if d.action != SKIP]
+    if limit:
+        work = work[:limit]
+    report = plan_report(decisions, work)
+    if not report["checkHistory"] and report["reasons"].get("unchecked"):
+        print(f"No check history in the HTTP cache: {report['reasons']['unchecked']} stored ID(s) planned as unchecked")
+    return work, report
+
+
+# (festa or None, whether the attempt raised)
+LocaleResult = Tuple[Optional[Dict[str, Any]], bool]
+
+
+class RawPage(NamedTuple):
+    """A fetched detail page whose body the parse stage has yet to extract."""
+
+    lang: str
+    url: str
+    resp: requests.Response
+
+
+class LocaleStats:
+    """Locale requests launched, launched as hedges, and discarded unused (cancelled or late)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = {"launched": 0, "hedged": 0, "discarded": 0}
+
+    def add(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += n
+
+    def report(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def fast_choice(langs: List[str], outcome: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[bool, Optional[str]]:
+    """``(decided, lang)``: the first locale in priority order that succeeded, once every
+    locale ahead of it has failed. Keeps ``--fast`` output independent of timing."""
+    for lang in langs:
+        if lang not in outcome:
+            return False, None
+        if outcome[lang]:
+            return True, lang
+    return True, None
+
+
+def fetch_locales(
+    pool: ThreadPoolExecutor,
+    fetch_lang: Callable[[str], LocaleResult],
+    langs: List[str],
+    fast: bool,
+    hedge_delay: float,
+    stats: Optional[LocaleStats] = None,
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], bool]:
+    """Fetch one festa's locales concurrently; returns successes in ``langs`` order.
+
+    Without ``fast`` every locale is requested at once. With ``fast`` locales are
+    hedged: the next one starts when the previous fails or has been in flight for
+    ``hedge_delay`` seconds, and the rest are cancelled once ``fast_choice`` decides.
+    """
+    stats = stats or LocaleStats()
+    if not fast:
+        futures = [(lang, pool.submit(fetch_lang, lang)) for lang in langs]
+        stats.add("launched", len(futures))
+        results = [(lang, fut.result()) for lang, fut in futures]
+        return [(lang, festa) for lang, (festa, _) in results if festa], any(err for _, (_, err) in results)
+
+    outcome: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending: Dict[Future, str] = {}
+    launched = 0
+    had_error = False
+
+    def launch(hedge: bool = False) -> None:
+        nonlocal launched
+        pending[pool.submit(fetch_lang, langs[launched])] = langs[launched]
+        launched += 1
+        stats.add("launched")
+        if hedge:
+            stats.add("hedged")
+
+    while True:
+        decided, chosen = fast_choice(langs, outcome)
+        if decided:
+            break
+        if not pending:
+            launch()
+            continue
+        more = launched < len(langs)
+        done, _ = wait(list(pending), timeout=hedge_delay if more else None, return_when=FIRST_COMPLETED)
+        if not done:
+            launch(hedge=True)
+            continue
+        for fut in done:
+            festa, err = fut.result()
+            outcome[pending.pop(fut)] = festa
+            had_error = had_error or err
+            if not festa and launched < len(langs):
+                launch()
+    for fut in pending:
+        fut.cancel()
+    stats.add("discarded", len(pending) + sum(1 for lang, f in outcome.items() if f and lang != chosen))
+    return ([(chosen, outcome[chosen])] if chosen else []), had_error  # type: ignore[list-item]
+
+
+def build_record(
+    fetched: List[Tuple[str, Dict[str, Any]]], had_error: bool, metrics: Optional[Metrics] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Merge per-locale festas (already in priority order) and classify the outcome.
+
+    Returns ``(status, record)`` where status is ``saved`` (at least one fresh locale),
+    ``unchanged`` (every locale answered 304 from the extraction cache), ``failed``
+    (no locale and at least one error) or ``skipped`` (no locale had data).
+    """
+    if not fetched:
+        return ("failed" if had_error else "skipped"), None
+    merged: Dict[str, Any] = {}
+    for lang, festa in fetched:
+        merged = merge_localized(merged, festa, lang)
+    finalize_record(merged, metrics)
+    status = "unchanged" if all(f.get("_notModified") for _, f in fetched) else "saved"
+    return status, merged
+
+
+Pair = Tuple[str, str]  # (festa_id, lang)
+
+
+def requeue_failures(
+    failed: Dict[Pair, BaseException],
+    fetch_pairs: Callable[[List[Pair]], Dict[Pair, Any]],
+    policy: RequeuePolicy,
+    sleep: Callable[[float], None] = time.sleep,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Tuple[Dict[Pair, Optional[Dict[str, Any]]], Dict[Pair, BaseException], List[Dict[str, int]]]:
+    """Retry failed (id, locale) pairs in ``policy.rounds`` rounds with growing delays.
+
+    ``fetch_pairs`` fetches a list of pairs concurrently and maps each to its festa
+    (or None) or the exception it raised. Pairs that failed with a final 4xx are not
+    retried. A round never starts while ``breaker`` still has a host open, and sends
+    one pair alone first so that the half-open probe, not the whole queue, meets a
+    host that is still down. Returns the recovered results, the pairs that still fail
+    (dead letters) and per-round counts.
+    """
+    dead = {pair: e for pair, e in failed.items() if is_permanent(e)}
+    queued = {pair: e for pair, e in failed.items() if pair not in dead}
+    recovered: Dict[Pair, Optional[Dict[str, Any]]] = {}
+    rounds: List[Dict[str, int]] = []
+    for round_no in range(1, policy.rounds + 1):
+        if not queued:
+            break
+        sleep(max(policy.delay(round_no), breaker.reopens_in() if breaker is not None else 0.0))
+        probe, *rest = sorted(queued)
+        results = fetch_pairs([probe])
+        if rest:
+            results.update(fetch_pairs(rest))
+        for pair, res in results.items():
+            if not isinstance(res, BaseException):
+                recovered[pair] = res
+                queued.pop(pair, None)
+            elif is_permanent(res):
+                dead[pair] = res
+                queued.pop(pair, None)
             else:
-                skipped += 1
+                queued[pair] = res
+        rounds.append({"round": round_no, "pairs": len(results), "recovered": sum(1 for p in results if p in recovered)})
+    dead.update(queued)
+    return recovered, dead, rounds
 
-    # Update SQLite from collected records
-    if records:
-        upsert_records_sqlite(records)
 
-    # Retry queue for failures (second attempt, sequential)
-    if errors:
-        retry_ids = sorted({e["id"] for e in errors})
-        retry_saved = 0
-        for fid in tqdm(retry_ids, desc="Retry failures"):
-            try:
-                res = process_one(fid)
-                if res:
-                    retry_saved += 1
-            except Exception:
-                pass
-        if retry_saved:
-            print(f"Retry saved additionally: {retry_saved}")
+def dead_letter(dead: Dict[Pair, BaseException], cache: HttpCache) -> List[Dict[str, Any]]:
+    """Report entries for pairs that still fail. Only failures that reached the origin
+    go to ``http_failures``: breaker rejections and expired deadlines say nothing about
+    the URL, and counting them would quarantine a whole host after an outage."""
+    out = []
+    for (fid, lang), e in sorted(dead.items()):
+        url = triple_detail_url(lang, fid)
+        recorded = reached_origin(e)
+        if recorded:
+            cache.record_failure(url, repr(e))
+        out.append({"id": fid, "lang": lang, "url": url, "error": repr(e), "recorded": recorded})
+    return out
 
-    # Emit report
-    report = {
-        "saved": saved,
-        "skipped": skipped,
-        "failedEntries": errors,
-    }
+
+def new_counts() -> Dict[str, int]:
+    return {"saved": 0, "unchanged": 0, "failed": 0, "skipped": 0}
+
+
+def emit_report(counts: Dict[str, int], errors: List[Dict[str, Any]], **sections: Any) -> None:
+    write_report({**counts, "failedEntries": errors, **sections})
+    print(
+        f"Saved: {counts['saved']}, Unchanged: {counts['unchanged']}, Failed: {counts['failed']}, "
+        f"Skipped(no data): {counts['skipped']}, Failures: {len(errors)}"
+    )
+
+
+def write_report(report: Dict[str, Any]) -> None:
     try:
         Path("data").mkdir(parents=True, exist_ok=True)
         (Path("data") / "crawl_report.json").write_text(
@@ -268,20 +551,408 @@ def main(limit: Optional[int], fast: bool, workers: int, qps: float, langs: List
     except Exception:
         pass
 
-    print(f"Saved: {saved}, Skipped(non-popup/failed/unchanged): {skipped}, Failures: {len(errors)}")
-    return 0
 
+def main(
+    limit: Optional[int],
+    fast: bool,
+    workers: int,
+    qps: float,
+    langs: List[str],
+    engine: str = "thread",
+    adaptive: bool = False,
+    min_qps: float = 0.2,
+    max_qps: float = 20.0,
+    pool_per_host: Optional[int] = None,
+    full: bool = False,
+    hedge_delay: float = 0.5,
+    source: str = "html",
+    graphql_endpoint: Optional[str] = None,
+    record_dir: Optional[str] = None,
+    replay_dir: Optional[str] = None,
+    replay_latency: float = 0.0,
+    sitemap_url: Optional[str] = None,
+    detail_base: Optional[str] = None,
+    metrics_textfile: Optional[str] = None,
+    resume: bool = False,
+    parse_workers: Optional[int] = None,
+) -> int:
+    if source == "graphql" and engine != "thread":
+        raise ValueError("--source graphql is only supported by the thread engine")
+    if (record_dir or replay_dir) and engine != "thread":
+        raise ValueError("--record/--replay are only supported by the thread engine")
+    if resume and engine != "thread":
+        raise ValueError("--resume is only supported by the thread engine")
+    if detail_base:
+        set_detail_base(detail_base)
+    limiter = make_limiter(qps, adaptive=adaptive, min_qps=min_qps, max_qps=max_qps)
+    metrics = Metrics()
+    conn_stats = ConnectionStats(metrics)
+    breaker = CircuitBreaker.from_policy(load_retry_policy())
+
+    if engine == "async":
+        from scripts.async_engine import crawl as crawl_async
+
+        writer = RecordWriter(load_writer_conf(), metrics=metrics)
+
+        result = crawl_async(
+            limit,
+            fast,
+            workers,
+            limiter,
+            langs,
+            conn_stats,
+            pool_per_host,
+            breaker,
+            full,
+            hedge_delay=hedge_delay,
+            index_url=sitemap_url,
+            metrics=metrics,
+            writer=writer,
+        )
+        writer.close()
+        emit_report(
+            result["counts"],
+            result["errors"],
+            rateLimiter=limiter.report() if limiter else None,
+            transport=conn_stats.report(),
+            circuitBreaker=breaker.report(),
+            discovery=result["discovery"],
+            plan=result["plan"],
+            locales=result["locales"],
+            httpCache=result["httpCache"],
+            quarantine=result["quarantine"],
+            metrics=metrics.report(),
+            writer=writer.report(),
+            retry=result["retry"],
+        )
+        if metrics_textfile:
+            metrics.write_textfile(metrics_textfile, result["counts"])
+        return 0
+
+    # One pooled session for sitemaps and every detail fetch (keep-alive across IDs);
+    # each festa may have every locale in flight at once
+    session = build_session(workers * len(langs), stats=conn_stats, per_host=pool_per_host)
+    # --record/--replay wrap the session so every fetch (sitemaps included) is archived or served offline
+    session, archive = archive_session(session, record=record_dir, replay=replay_dir, latency=replay_latency)
+    cache = HttpCache()
+    journal = CrawlJournal()
+
+    resumed = journal.resume() if resume else None
+    if resumed is not None:
+        # Same work list as the interrupted run; no rediscovery or replanning
+        ordered_ids, plan_summary = resumed
+        discovery = None
+    else:
+        if resume:
+            print("No interrupted run to resume; starting a new one")
+        entries, discovery = load_sitemap_festa_entries(
+            session, limiter, breaker, cache, workers=workers, index_url=sitemap_url, metrics=metrics
+        )
+        ordered_ids, plan_summary = plan_ids(entries, limit, cache, langs, full)
+        journal.start(ordered_ids, plan_summary)
+    done = journal.done_ids()
+    quarantine = Quarantine(cache, load_quarantine_conf())
+
+    errors: List[Dict[str, Any]] = []
+    # Every (id, locale) whose fetch raised, for the retry queue
+    failed: Dict[Pair, BaseException] = {}
+    err_lock = threading.Lock()
+    locale_stats = LocaleStats()
+    lang_pool = ThreadPoolExecutor(max_workers=max(1, workers * len(langs)))
+
+    def record_error(fid: str, lang: str, e: Exception) -> None:
+        with err_lock:
+            errors.append({"id": fid, "lang": lang, "error": repr(e)})
+            failed[(fid, lang)] = e
+
+    def run_cpu(fn: Callable[..., Any], *args: Any, **labels: Any) -> Future:
+        # CPU work goes to the worker processes; with a single CPU it runs in the calling thread
+        if cpu_pool is not None:
+            return cpu_pool.submit(run_with_metrics, fn, *args, labels=labels)
+        fut: Future = Future()
+        try:
+            fut.set_result((fn(*args, metrics=metrics.labeled(**labels)), {}))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def parse_raw(fid: str, pages: List[RawPage]) -> List[Tuple[Optional[Dict[str, Any]], bool]]:
+        # Bodies are parsed by the CPU workers; the cache and journal are written here
+        futs = [run_cpu(parse_festa_bytes, p.resp.content, p.resp.encoding, p.url, lang=p.lang) for p in pages]
+        out: List[Tuple[Optional[Dict[str, Any]], bool]] = []
+        for p, fut in zip(pages, futs):
+            try:
+                festa, series = fut.result()
+            except Exception as e:
+                record_error(fid, p.lang, e)
+                out.append((None, True))
+                continue
+            metrics.merge_series(series)
+            cache.update_from_response(p.url, p.resp, extraction=festa)
+            journal.record_locale(fid, p.lang, festa)
+            out.append((festa, False))
+        return out
+
+    # Stage 1 (I/O threads): every locale of one ID, bodies left unparsed
+    def fetch_stage(fid: str) -> Tuple[str, List[Tuple[str, Any]], bool]:
+        def fetch_lang(lang: str) -> Tuple[Any, bool]:
+            found, festa = journal.locale(fid, lang)
+            if found:
+                return festa, False
+            held, festa = quarantine.held(triple_detail_url(lang, fid))
+            if held:
+                return festa, False
+            try:
+                url, resp = fetch_detail(session, fid, lang, limiter, cache, breaker=breaker, metrics=metrics)
+                if resp.status_code == 304:
+                    festa = festa_from_response(url, resp, cache, metrics.labeled(lang=lang))
+                    journal.record_locale(fid, lang, festa)
+                    return festa, False
+            except Exception as e:
+                record_error(fid, lang, e)
+                return None, True
+            if fast:
+                # Hedging needs to know whether this locale has data before choosing
+                return parse_raw(fid, [RawPage(lang, url, resp)])[0]
+            return RawPage(lang, url, resp), False
+
+        fetched, had_error = fetch_locales(lang_pool, fetch_lang, langs, fast, hedge_delay, locale_stats)
+        return fid, fetched, had_error
+
+    # Stage 2 (CPU workers): parse and extract the fetched bodies
+    def parse_stage(item: Tuple[str, List[Tuple[str, Any]], bool]) -> Tuple[str, List[Tuple[str, Dict[str, Any]]], bool]:
+        fid, fetched, had_error = item
+        raw = [page for _, page in fetched if isinstance(page, RawPage)]
+        parsed = iter(parse_raw(fid, raw) if raw else [])
+        out: List[Tuple[str, Dict[str, Any]]] = []
+        for lang, page in fetched:
+            if isinstance(page, RawPage):
+                festa, err = next(parsed)
+                had_error = had_error or err
+            else:
+                festa = page
+            if festa:
+                out.append((lang, festa))
+        return fid, out, had_error
+
+    # Stage 3 (CPU workers): merge, classify, validate
+    def build_stage(item: Tuple[str, List[Tuple[str, Dict[str, Any]]], bool]) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        fid, fetched, had_error = item
+        if not fetched:
+            return (fid, *build_record(fetched, had_error))
+        (status, merged), series = run_cpu(build_record, fetched, had_error).result()
+        metrics.merge_series(series)
+        return fid, status, merged
+
+    def process_batch(fids: List[str]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        # GraphQL source: every (id, locale) of the batch in one request
+        pairs = [(fid, lang) for fid in fids for lang in langs]
+        try:
+            got = fetch_festas_graphql(session, pairs, gql_conf, limiter, breaker=breaker, metrics=metrics)
+        except Exception as e:
+            with err_lock:
+                errors.extend({"id": fid, "lang": "*", "error": repr(e)} for fid in fids)
+                failed.update(((fid, lang), e) for fid in fids for lang in langs)
+            return [("failed", None) for _ in fids]
+        outcomes: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        for fid in fids:
+            fetched: List[Tuple[str, Dict[str, Any]]] = []
+            had_error = False
+            for lang in langs:
+                res = got.get((fid, lang))
+                if not isinstance(res, Exception):
+                    cache.touch(triple_detail_url(lang, fid))  # lets the planner see the check
+                    journal.record_locale(fid, lang, res)
+                if isinstance(res, Exception):
+                    had_error = True
+                    with err_lock:
+                        errors.append({"id": fid, "lang": lang, "error": repr(res)})
+                        failed[(fid, lang)] = res
+                elif res:
+                    fetched.append((lang, res))
+                    if fast:
+                        break
+            outcomes.append(build_record(fetched, had_error, metrics))
+        return outcomes
+
+    def fetch_pairs(pairs: List[Pair]) -> Dict[Pair, Any]:
+        # Retry queue: every pair (or GraphQL batch of pairs) in flight at once on the locale pool
+        if source == "graphql":
+            chunks = [pairs[i : i + gql_conf.batch_size] for i in range(0, len(pairs), gql_conf.batch_size)]
+            futs = [
+                (chunk, lang_pool.submit(fetch_festas_graphql, session, chunk, gql_conf, limiter, breaker=breaker, metrics=metrics))
+                for chunk in chunks
+            ]
+            out: Dict[Pair, Any] = {}
+            for chunk, fut in futs:
+                try:
+                    got = fut.result()
+                except Exception as e:
+                    got = {pair: e for pair in chunk}
+                out.update((pair, got.get(pair)) for pair in chunk)
+            return out
+        pair_futs = {
+            (fid, lang): lang_pool.submit(
+                fetch_festa_by_lang, session, fid, lang, limiter, cache, breaker=breaker, metrics=metrics
+            )
+            for fid, lang in pairs
+        }
+        results: Dict[Pair, Any] = {}
+        for pair, fut in pair_futs.items():
+            try:
+                results[pair] = fut.result()
+            except Exception as e:
+                results[pair] = e
+        return results
+
+    counts = new_counts()
+    for status in done.values():
+        counts[status] += 1
+    statuses: Dict[str, str] = {}
+    todo_ids = [fid for fid in ordered_ids if fid not in done]
+
+    ex: Optional[ThreadPoolExecutor] = None
+    cpu_pool: Optional[ProcessPoolExecutor] = None
+    pipeline: Optional[StagedPipeline] = None
+    if source == "graphql":
+        gql_conf = load_graphql_conf(graphql_endpoint)
+        per_batch = max(1, gql_conf.batch_size // len(langs))
+        todo = [todo_ids[i : i + per_batch] for i in range(0, len(todo_ids), per_batch)]
+        ex = ThreadPoolExecutor(max_workers=workers)
+
+        def outcomes() -> Iterator[Tuple[str, str, Optional[Dict[str, Any]]]]:
+            for fids, batch in zip(todo, ex.map(process_batch, todo)):
+                for fid, (status, res) in zip(fids, batch):
+                    yield fid, status, res
+
+    else:
+        # Network, parsing, classification and storage each get their own workers,
+        # joined by bounded queues
+        pipeline_conf = load_pipeline_conf()
+        cpu_workers = parse_workers or pipeline_conf.cpu_workers()
+        cpu_pool = process_pool(cpu_workers) if cpu_workers > 1 else None
+        size = pipeline_conf.queue_size
+        pipeline = StagedPipeline(
+            [
+                Stage("fetch", fetch_stage, workers, size),
+                Stage("parse", parse_stage, cpu_workers, size),
+                Stage("build", build_stage, pipeline_conf.build_workers, size),
+            ],
+            out_size=size,
+        )
+
+        def outcomes() -> Iterator[Tuple[str, str, Optional[Dict[str, Any]]]]:
+            return pipeline.run(todo_ids)
+
+    # Records reach JSON, SQLite and then the journal on the writer thread, in batches, so an
+    # interrupted run keeps its progress; a full writer queue holds back the fetchers
+    writer = RecordWriter(load_writer_conf(), on_flush=journal.complete, metrics=metrics)
+
+    def rebuild(fid: str, had_error: bool) -> Tuple[str, Optional[Dict[str, Any]]]:
+        # Record from the locales journaled for ``fid``, in locale priority order
+        by_lang = journal.fetched(fid, langs)
+        fetched = []
+        for lang in langs:
+            if by_lang.get(lang):
+                fetched.append((lang, by_lang[lang]))
+                if fast:
+                    break
+        return build_record(fetched, had_error, metrics)
 
- 
-def _parse_date(s: Optional[str]) -> Optional[date]:
-    if not s:
-        return None
     try:
-        return datetime.strptime(s, "%Y-%m-%d").date()
-    except Exception:
-        return None
+        # The interrupted run's record JSON and SQLite rows may be gone (a CI runner keeps
+        # only the journal), so IDs it completed are rebuilt from their journaled locales
+        # and saved again. Records already on disk are left alone by the content hash.
+        resaved = 0
+        for fid, status in done.items():
+            if status in ("saved", "unchanged"):
+                status, merged = rebuild(fid, False)
+                if merged is not None:
+                    writer.put(fid, status, merged)
+                    resaved += 1
+        if resaved:
+            print(f"Re-saved {resaved} record(s) completed before the interruption")
+        with tqdm(total=len(ordered_ids), initial=len(done), desc="Fetch festas") as bar:
+            for fid, status, res in outcomes():
+                counts[status] += 1
+                statuses[fid] = status
+                writer.put(fid, status, res)
+                bar.update(1)
+    except BaseException:
+        # Interrupted (SIGINT/SIGTERM): drop queued IDs, keep everything that completed
+        lang_pool.shutdown(wait=False, cancel_futures=True)
+        if cpu_pool is not None:
+            cpu_pool.shutdown(wait=False, cancel_futures=True)
+        if pipeline is not None:
+            pipeline.close()
+        if ex is not None:
+            ex.shutdown(wait=True, cancel_futures=True)
+        try:
+            writer.close()
+        finally:
+            journal.close()
+            # Commit queued validator and failure writes; the workflow keeps this file
+            cache.close()
+        raise
+    if ex is not None:
+        ex.shutdown()
+    if cpu_pool is not None:
+        cpu_pool.shutdown()
+
+    # Retry queue: only the failed (id, locale) pairs, merged into what each ID already has.
+    # With --fast an ID that got any locale is complete, so only IDs without one are retried.
+    if fast:
+        failed = {pair: e for pair, e in failed.items() if statuses.get(pair[0]) == "failed"}
+    recovered, dead, rounds = requeue_failures(failed, fetch_pairs, load_requeue_policy(), breaker=breaker)
+    for (fid, lang), festa in recovered.items():
+        journal.record_locale(fid, lang, festa)
+    for fid in sorted({fid for fid, _ in recovered}):
+        status, merged = rebuild(fid, any((fid, lang) in dead for lang in langs))
+        counts[statuses[fid]] -= 1
+        counts[status] += 1
+        writer.put(fid, status, merged)
+    writer.close()
+    dead_letters = dead_letter(dead, cache)
+    if recovered:
+        print(f"Retry recovered {len(recovered)} locale(s) across {len({fid for fid, _ in recovered})} festa(s)")
 
+    lang_pool.shutdown(wait=True)
+    # Commit any queued validator writes
+    cache.close()
 
+    # Emit report
+    emit_report(
+        counts,
+        errors,
+        rateLimiter=limiter.report() if limiter else None,
+        transport=conn_stats.report(),
+        circuitBreaker=breaker.report(),
+        discovery=discovery,
+        plan=plan_summary,
+        locales=locale_stats.report(),
+        httpCache=cache.report(),
+        archive=archive.report() if archive else None,
+        metrics=metrics.report(),
+        journal=journal.report(),
+        quarantine=quarantine.report(),
+        pipeline=pipeline.report() if pipeline is not None else None,
+        writer=writer.report(),
+        retry={
+            "queued": len(failed),
+            "recovered": len(recovered),
+            "rounds": rounds,
+            "deadLettered": len(dead_letters),
+            "deadLetters": dead_letters,
+        },
+    )
+    if metrics_textfile:
+        metrics.write_textfile(metrics_textfile, counts)
+    journal.finish()
+    journal.close()
+    return 0
+
+
+ 
 def _compute_image_meta(images: List[Dict[str, Any]]) -> Dict[str, Any]:
     meta: Dict[str, Any] = {"total": len(images), "gallery": max(0, len(images) - 1)}
     if images:
@@ -345,13 +1016,152 @@ if __name__ == "__main__":
     parser.add_argument("--limit", type=int, default=None, help="Limit number of festa IDs")
     parser.add_argument("--fast", action="store_true", help="Stop after first successful locale")
     parser.add_argument("--workers", type=int, default=8, help="Number of concurrent workers")
-    parser.add_argument("--qps", type=float, default=2.0, help="Global requests per second")
+    parser.add_argument("--qps", type=float, default=2.0, help="Global requests per second (initial per-host rate with --adaptive)")
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Per-host AIMD rate limiting driven by 429/503, Retry-After, timeouts and latency",
+    )
+    parser.add_argument("--min-qps", type=float, default=0.2, help="Adaptive limiter floor per host")
+    parser.add_argument("--max-qps", type=float, default=20.0, help="Adaptive limiter ceiling per host")
+    parser.add_argument(
+        "--pool-per-host",
+        type=int,
+        default=None,
+        help="Max keep-alive connections per host in the shared pool (default: --workers)",
+    )
     parser.add_argument(
         "--langs",
         type=str,
         default=",".join(LANGS),
         help="Comma-separated locale order to try",
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["thread", "async"],
+        default="thread",
+        help="Concurrency engine: thread pool (default) or asyncio tasks",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the incremental planner and fetch every discovered ID",
+    )
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        default=0.5,
+        help="With --fast, seconds before the next locale is requested alongside a slow one (0 = all at once)",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["html", "graphql"],
+        default="html",
+        help="Detail source: SSR pages (default) or batched getFesta GraphQL queries (thread engine)",
+    )
+    parser.add_argument(
+        "--graphql-endpoint",
+        type=str,
+        default=None,
+        help="GraphQL endpoint for --source graphql (default: graphql.endpoint in config/crawl.json)",
+    )
+    parser.add_argument(
+        "--sitemap-url",
+        type=str,
+        default=None,
+        help=f"Sitemap index to discover festas from (default: {SITEMAP_INDEX_URL})",
+    )
+    parser.add_argument(
+        "--detail-base",
+        type=str,
+        default=None,
+        help=f"Origin serving /{{lang}}/festas/{{id}} detail pages (default: {DETAIL_BASE_URL})",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Also write stage latency histograms in Prometheus text format (node_exporter textfile collector)",
+    )
+    parser.add_argument(
+        "--reclassify",
+        action="store_true",
+        help="No crawl: re-derive classification, image/pricing meta and validation for every stored record "
+        "(process pool of --workers, capped at the CPU count) and refresh changed SQLite rows",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="Worker processes parsing pages and classifying records (default: pipeline.parseWorkers, 0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from data/crawl_journal.sqlite (thread engine)",
+    )
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Archive every response (status, headers, compressed body) into DIR (thread engine)",
+    )
+    archive_group.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Serve every request from an archive written by --record; no network access (thread engine)",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        help="With --replay, seconds of simulated latency per response",
+    )
     args = parser.parse_args()
+    if args.reclassify:
+        summary = reclassify(workers=min(args.workers, os.cpu_count() or 1))
+        print(json.dumps({**summary, "errors": summary["errors"][:20]}, ensure_ascii=False, indent=2))
+        raise SystemExit(1 if summary["errors"] else 0)
+    if args.resume and args.engine != "thread":
+        parser.error("--resume is only supported by --engine thread")
+    if (args.record or args.replay) and args.engine != "thread":
+        parser.error("--record/--replay are only supported by --engine thread")
+    if args.source == "graphql" and args.engine != "thread":
+        parser.error("--source graphql is only supported by --engine thread")
+    if args.source == "graphql" and not load_graphql_conf(args.graphql_endpoint).endpoint:
+        parser.error("--source graphql needs --graphql-endpoint or graphql.endpoint in config/crawl.json")
     lang_list = [x.strip() for x in args.langs.split(",") if x.strip()]
-    raise SystemExit(main(args.limit, args.fast, args.workers, args.qps, lang_list))
+    # CI cancellation sends SIGTERM; unwind like Ctrl-C so completed records are flushed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    raise SystemExit(
+        main(
+            args.limit,
+            args.fast,
+            args.workers,
+            args.qps,
+            lang_list,
+            engine=args.engine,
+            adaptive=args.adaptive,
+            min_qps=args.min_qps,
+            max_qps=args.max_qps,
+            pool_per_host=args.pool_per_host,
+            full=args.full,
+            hedge_delay=args.hedge_delay,
+            source=args.source,
+            graphql_endpoint=args.graphql_endpoint,
+            record_dir=args.record,
+            replay_dir=args.replay,
+            replay_latency=args.replay_latency,
+            sitemap_url=args.sitemap_url,
+            detail_base=args.detail_base,
+            metrics_textfile=args.metrics_textfile,
+            resume=args.resume,
+            parse_workers=args.parse_workers,
+        )
+    )
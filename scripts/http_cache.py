@@ -1,103 +1,321 @@
 from __future__ import annotations
 
+import atexit
 import os
+import queue
 import sqlite3
-from contextlib import closing
-from datetime import datetime
-from typing import Dict, Optional
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
 
 
 DB_PATH = os.path.join("data", "http_cache.sqlite")
 
+# A 304 keeps the stored extraction; any other status replaces it (possibly with NULL)
+_UPSERT_CACHE = """
+    INSERT INTO http_cache(url, etag, last_modified, last_status, hit_count, updated_at, extract)
+    VALUES(?,?,?,?,1,?,?)
+    ON CONFLICT(url) DO UPDATE SET
+      etag=COALESCE(excluded.etag, http_cache.etag),
+      last_modified=COALESCE(excluded.last_modified, http_cache.last_modified),
+      last_status=excluded.last_status,
+      hit_count=http_cache.hit_count + 1,
+      updated_at=excluded.updated_at,
+      extract=CASE WHEN excluded.last_status = 304 THEN http_cache.extract ELSE excluded.extract END
+"""
+
+_UPSERT_FAILURE = """
+    INSERT INTO http_failures(url, last_error, count, last_at)
+    VALUES(?,?,1,?)
+    ON CONFLICT(url) DO UPDATE SET
+      last_error=excluded.last_error,
+      count=http_failures.count + 1,
+      last_at=excluded.last_at
+"""
+
 
 def _ensure_dir() -> None:
     os.makedirs("data", exist_ok=True)
 
 
+def _pack(obj: Any) -> bytes:
+    return zlib.compress(orjson.dumps(obj), 6)
+
+
+def _unpack(blob: bytes) -> Any:
+    return orjson.loads(zlib.decompress(blob))
+
+
 class HttpCache:
-    def __init__(self, path: Optional[str] = None) -> None:
+    """ETag/Last-Modified store for conditional requests.
+
+    Validators are preloaded into memory at startup, so lookups never touch SQLite.
+    Writes go through a queue to one writer thread that owns a persistent WAL
+    connection and commits in batches (every ``batch_size`` writes or
+    ``flush_interval`` seconds). Rows older than ``ttl_days`` and the oldest rows
+    beyond ``max_entries`` are evicted on open. Call ``close()`` (or ``flush()``)
+    before reading the database from elsewhere.
+
+    Alongside the validators each URL can keep the compressed result extracted from
+    its last 200 body, so a 304 can be answered from the cache at zero parse cost.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        ttl_days: Optional[float] = 90,
+        max_entries: Optional[int] = 200_000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+    ) -> None:
         self.path = path or DB_PATH
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
         _ensure_dir()
-        with closing(sqlite3.connect(self.path)) as conn:
-            with conn:
-                conn.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS http_cache (
-                      url TEXT PRIMARY KEY,
-                      etag TEXT,
-                      last_modified TEXT,
-                      last_status INTEGER,
-                      hit_count INTEGER DEFAULT 0,
-                      updated_at TEXT
-                    )
-                    """
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # url -> (etag, last_modified, has_extraction, updated_at)
+        self._entries: Dict[str, Tuple[Optional[str], Optional[str], bool, Optional[str]]] = {}
+        # Extractions queued but not yet committed by the writer
+        self._unflushed: Dict[str, Optional[bytes]] = {}
+        # url -> (count, last_error, last_at) from http_failures
+        self._failures: Dict[str, Tuple[int, str, str]] = {}
+        self._stats: Dict[str, int] = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "notModified": 0,
+            "extractionReused": 0,
+            "updated": 0,
+            "writes": 0,
+            "batches": 0,
+            "evicted": 0,
+            "failuresReleased": 0,
+        }
+        self._init_db(ttl_days, max_entries)
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name="http-cache-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _init_db(self, ttl_days: Optional[float], max_entries: Optional[int]) -> None:
+        conn = self._conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS http_cache (
+                  url TEXT PRIMARY KEY,
+                  etag TEXT,
+                  last_modified TEXT,
+                  last_status INTEGER,
+                  hit_count INTEGER DEFAULT 0,
+                  updated_at TEXT
                 )
-                conn.execute(
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS http_failures (
+                  url TEXT PRIMARY KEY,
+                  last_error TEXT,
+                  count INTEGER DEFAULT 0,
+                  last_at TEXT
+                )
+                """
+            )
+            cols = {row[1] for row in conn.execute("PRAGMA table_info(http_cache)")}
+            if "extract" not in cols:
+                conn.execute("ALTER TABLE http_cache ADD COLUMN extract BLOB")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_updated ON http_cache(updated_at)")
+            evicted = 0
+            if ttl_days is not None:
+                cutoff = (datetime.utcnow() - timedelta(days=ttl_days)).isoformat()
+                evicted += conn.execute("DELETE FROM http_cache WHERE updated_at < ?", (cutoff,)).rowcount
+            if max_entries is not None:
+                evicted += conn.execute(
                     """
-                    CREATE TABLE IF NOT EXISTS http_failures (
-                      url TEXT PRIMARY KEY,
-                      last_error TEXT,
-                      count INTEGER DEFAULT 0,
-                      last_at TEXT
+                    DELETE FROM http_cache WHERE url IN (
+                      SELECT url FROM http_cache ORDER BY updated_at DESC LIMIT -1 OFFSET ?
                     )
-                    """
-                )
+                    """,
+                    (max_entries,),
+                ).rowcount
+            self._stats["evicted"] = max(0, evicted)
+        for url, etag, last_mod, has_extract, updated_at in conn.execute(
+            "SELECT url, etag, last_modified, extract IS NOT NULL, updated_at FROM http_cache"
+        ):
+            self._entries[url] = (etag, last_mod, bool(has_extract), updated_at)
+        for url, err, cnt, at in conn.execute("SELECT url, last_error, count, last_at FROM http_failures"):
+            self._failures[url] = (int(cnt or 0), err, at)
 
-    def get_conditional_headers(self, url: str) -> Dict[str, str]:
-        with closing(sqlite3.connect(self.path)) as conn:
-            cur = conn.execute("SELECT etag, last_modified FROM http_cache WHERE url = ?", (url,))
-            row = cur.fetchone()
+    # ---- writer ----
+    def _writer_loop(self) -> None:
+        pending: List[Tuple[str, Tuple[Any, ...]]] = []
+        last_commit = time.monotonic()
+        while True:
+            try:
+                kind, payload = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                kind, payload = "tick", None
+            if kind in ("cache", "failure", "release"):
+                pending.append((kind, payload))
+            due = time.monotonic() - last_commit >= self.flush_interval
+            if pending and (len(pending) >= self.batch_size or due or kind in ("flush", "stop")):
+                self._commit(pending)
+                pending = []
+                last_commit = time.monotonic()
+            if kind in ("flush", "stop"):
+                payload.set()
+                if kind == "stop":
+                    return
+
+    def _commit(self, pending: List[Tuple[str, Tuple[Any, ...]]]) -> None:
+        cache_rows = [p for k, p in pending if k == "cache"]
+        failure_rows = [p for k, p in pending if k == "failure"]
+        release_rows = [p for k, p in pending if k == "release"]
+        with self._db_lock:
+            with self._conn:
+                if cache_rows:
+                    self._conn.executemany(_UPSERT_CACHE, cache_rows)
+                if failure_rows:
+                    self._conn.executemany(_UPSERT_FAILURE, failure_rows)
+                if release_rows:
+                    self._conn.executemany("DELETE FROM http_failures WHERE url = ?", release_rows)
+        with self._lock:
+            for row in cache_rows:
+                if self._unflushed.get(row[0]) is row[5]:
+                    self._unflushed.pop(row[0], None)
+            self._stats["writes"] += len(pending)
+            self._stats["batches"] += 1
+
+    def _send(self, kind: str) -> None:
+        done = threading.Event()
+        self._queue.put((kind, done))
+        done.wait()
+
+    def flush(self) -> None:
+        if not self._closed:
+            self._send("flush")
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._send("stop")
+        self._closed = True
+        with self._db_lock:
+            self._conn.close()
+
+    # ---- public API ----
+    def get_conditional_headers(self, url: str, *, require_extraction: bool = False) -> Dict[str, str]:
+        """Validators for ``url``; with ``require_extraction`` only when a 304 could be served."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            entry = self._entries.get(url)
             headers: Dict[str, str] = {}
-            if row:
-                etag, last_mod = row
+            if entry and (entry[2] or not require_extraction):
+                etag, last_mod = entry[0], entry[1]
                 if etag:
                     headers["If-None-Match"] = etag
                 if last_mod:
                     headers["If-Modified-Since"] = last_mod
+            self._stats["hits" if headers else "misses"] += 1
             return headers
 
-    def update_from_response(self, url: str, resp) -> None:
+    def update_from_response(self, url: str, resp, extraction: Any = None) -> None:
+        """Record validators from ``resp``; on non-304 also store ``extraction`` (or clear it)."""
         etag = resp.headers.get("ETag")
         last_mod = resp.headers.get("Last-Modified")
         status = int(getattr(resp, "status_code", 0) or 0)
         now = datetime.utcnow().isoformat()
-        with closing(sqlite3.connect(self.path)) as conn:
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO http_cache(url, etag, last_modified, last_status, hit_count, updated_at)
-                    VALUES(?,?,?,?,1,?)
-                    ON CONFLICT(url) DO UPDATE SET
-                      etag=COALESCE(excluded.etag, http_cache.etag),
-                      last_modified=COALESCE(excluded.last_modified, http_cache.last_modified),
-                      last_status=excluded.last_status,
-                      hit_count=http_cache.hit_count + 1,
-                      updated_at=excluded.updated_at
-                    """,
-                    (url, etag, last_mod, status, now),
-                )
+        blob = _pack(extraction) if extraction is not None and status != 304 else None
+        with self._lock:
+            prev_etag, prev_mod, prev_has, _ = self._entries.get(url, (None, None, False, None))
+            has_extract = prev_has if status == 304 else blob is not None
+            self._entries[url] = (etag or prev_etag, last_mod or prev_mod, has_extract, now)
+            self._stats["notModified" if status == 304 else "updated"] += 1
+            if status != 304:
+                self._unflushed[url] = blob
+            released = status < 400 and self._release(url)
+        self._queue.put(("cache", (url, etag, last_mod, status, now, blob)))
+        if released:
+            self._queue.put(("release", (url,)))
+
+    def touch(self, url: str) -> None:
+        """Record that ``url``'s content was checked by other means (e.g. the GraphQL
+        source); validators and the stored extraction are left as they are."""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            etag, last_mod, has_extract, _ = self._entries.get(url, (None, None, False, None))
+            self._entries[url] = (etag, last_mod, has_extract, now)
+            released = self._release(url)
+        # Written like a 304 so the UPSERT keeps validators and extraction
+        self._queue.put(("cache", (url, None, None, 304, now, None)))
+        if released:
+            self._queue.put(("release", (url,)))
+
+    def _release(self, url: str) -> bool:
+        # Caller holds self._lock; a URL that answers again leaves the failure history
+        if self._failures.pop(url, None) is None:
+            return False
+        self._stats["failuresReleased"] += 1
+        return True
+
+    def get_extraction(self, url: str) -> Any:
+        """The extraction stored with the last 200 for ``url``, or None."""
+        with self._lock:
+            from_db = url not in self._unflushed
+            if from_db:
+                entry = self._entries.get(url)
+                if not entry or not entry[2]:
+                    return None
+            else:
+                blob = self._unflushed[url]
+        if from_db:
+            with self._db_lock:
+                row = self._conn.execute("SELECT extract FROM http_cache WHERE url = ?", (url,)).fetchone()
+            blob = row[0] if row else None
+        if blob is None:
+            return None
+        with self._lock:
+            self._stats["extractionReused"] += 1
+        return _unpack(blob)
+
+    def checked_at(self, url: str) -> Optional[str]:
+        """UTC ISO time of the last 200/304 recorded for ``url`` (None if never)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry[3] if entry else None
 
     def record_failure(self, url: str, error: str) -> None:
         now = datetime.utcnow().isoformat()
-        with closing(sqlite3.connect(self.path)) as conn:
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO http_failures(url, last_error, count, last_at)
-                    VALUES(?,?,1,?)
-                    ON CONFLICT(url) DO UPDATE SET
-                      last_error=excluded.last_error,
-                      count=http_failures.count + 1,
-                      last_at=excluded.last_at
-                    """,
-                    (url, error, now),
-                )
+        with self._lock:
+            count = self._failures.get(url, (0, "", ""))[0]
+            self._failures[url] = (count + 1, error, now)
+        self._queue.put(("failure", (url, error, now)))
+
+    def failure(self, url: str) -> Optional[Tuple[int, str, str]]:
+        """``(count, last_error, last_at)`` from the failure history of ``url`` (None if clean)."""
+        with self._lock:
+            return self._failures.get(url)
 
     def failure_report(self) -> Dict[str, Dict[str, object]]:
-        with closing(sqlite3.connect(self.path)) as conn:
-            cur = conn.execute("SELECT url, last_error, count, last_at FROM http_failures ORDER BY count DESC, last_at DESC")
+        self.flush()
+        with self._db_lock:
+            cur = self._conn.execute("SELECT url, last_error, count, last_at FROM http_failures ORDER BY count DESC, last_at DESC")
             out: Dict[str, Dict[str, object]] = {}
             for url, err, cnt, at in cur.fetchall():
                 out[url] = {"error": err, "count": cnt, "lastAt": at}
             return out
 
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "failures": len(self._failures), **self._stats}
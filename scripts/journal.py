@@ -0,0 +1,209 @@
+"""Crawl journal: what the current run has finished, so an interrupted run can resume.
+
+One run is journaled at a time in ``data/crawl_journal.sqlite``:
+
+- ``journal_run``: the planned work list and plan report, written when the run starts.
+- ``journal_locales``: each (ID, locale) whose fetch returned (a festa, or no data),
+  with the compressed festa and its fingerprint. Written as soon as the fetch returns.
+- ``journal_ids``: each ID's outcome (``saved``/``unchanged``/``skipped``/``failed``)
+  and record fingerprint. Written only after the record has been flushed to SQLite.
+
+A resumed run reuses the stored work list instead of rediscovering, skips IDs that
+completed, and answers journaled locales without a request, so an interruption costs
+only the requests that were in flight. Completed IDs are rebuilt from their journaled
+locales and saved again, since their record files may not have survived. IDs that failed are retried. A new run (no
+``--resume``) clears the journal; a finished run drops the stored festas.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from scripts.storage import content_hash
+
+
+DB_PATH = os.path.join("data", "crawl_journal.sqlite")
+
+# (festa_id, status, record or None) as produced by the per-ID workers
+Outcome = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def fingerprint(obj: Dict[str, Any]) -> str:
+    """Content hash of a record or festa, ignoring ``meta.fetchedAt`` and the 304 marker."""
+    if "_notModified" in obj:
+        obj = {k: v for k, v in obj.items() if k != "_notModified"}
+    return content_hash(obj)
+
+
+class CrawlJournal:
+    """SQLite journal shared by the crawl threads.
+
+    Locale rows are committed at most every ``commit_interval`` seconds; ``complete``
+    commits immediately, so an ID is never journaled as done before its record is.
+    """
+
+    def __init__(self, path: Optional[str] = None, *, commit_interval: float = 1.0) -> None:
+        self.path = path or DB_PATH
+        self.commit_interval = commit_interval
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._last_commit = time.monotonic()
+        self._locales: Dict[Tuple[str, str], Optional[bytes]] = {}
+        self._done: Dict[str, str] = {}
+        self._started_at: Optional[str] = None
+        self._resumed = False
+        self._stats = {"resumedIds": 0, "resumedLocales": 0, "localesReused": 0, "locales": 0, "ids": 0, "flushes": 0}
+        self._init_db()
+
+    def _init_db(self) -> None:
+        conn = self._conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS journal_run (
+                  started_at TEXT,
+                  finished_at TEXT,
+                  work BLOB,
+                  plan BLOB
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS journal_locales (
+                  festa_id TEXT,
+                  lang TEXT,
+                  fingerprint TEXT,
+                  festa BLOB,
+                  done_at TEXT,
+                  PRIMARY KEY (festa_id, lang)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS journal_ids (
+                  festa_id TEXT PRIMARY KEY,
+                  status TEXT,
+                  fingerprint TEXT,
+                  done_at TEXT
+                )
+                """
+            )
+
+    # ---- run lifecycle ----
+    def resume(self) -> Optional[Tuple[List[str], Dict[str, Any]]]:
+        """``(work, plan)`` of an unfinished run, loading its progress; None if there is none."""
+        with self._lock:
+            row = self._conn.execute("SELECT started_at, finished_at, work, plan FROM journal_run").fetchone()
+            if row is None or row[1] is not None:
+                return None
+            self._started_at = row[0]
+            self._resumed = True
+            for fid, lang, blob in self._conn.execute("SELECT festa_id, lang, festa FROM journal_locales"):
+                self._locales[(fid, lang)] = blob
+            for fid, status in self._conn.execute("SELECT festa_id, status FROM journal_ids WHERE status != 'failed'"):
+                self._done[fid] = status
+            self._stats["resumedIds"] = len(self._done)
+            self._stats["resumedLocales"] = len(self._locales)
+            return orjson.loads(row[2]), orjson.loads(row[3])
+
+    def start(self, work: List[str], plan: Dict[str, Any]) -> None:
+        """Begin a new run, discarding whatever the previous one journaled."""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._locales.clear()
+            self._done.clear()
+            self._started_at = now
+            self._resumed = False
+            with self._conn:
+                self._conn.execute("DELETE FROM journal_run")
+                self._conn.execute("DELETE FROM journal_locales")
+                self._conn.execute("DELETE FROM journal_ids")
+                self._conn.execute(
+                    "INSERT INTO journal_run(started_at, finished_at, work, plan) VALUES(?,?,?,?)",
+                    (now, None, orjson.dumps(work), orjson.dumps(plan)),
+                )
+            self._last_commit = time.monotonic()
+
+    def finish(self) -> None:
+        """Mark the run complete; the next ``--resume`` starts a new one."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE journal_run SET finished_at = ?", (datetime.utcnow().isoformat(),))
+                self._conn.execute("UPDATE journal_locales SET festa = NULL")
+            self._locales.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    # ---- progress ----
+    def done_ids(self) -> Dict[str, str]:
+        """Status of every ID completed in this run (failed IDs are not complete)."""
+        with self._lock:
+            return dict(self._done)
+
+    def locale(self, festa_id: str, lang: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """``(found, festa)``: whether this run already fetched the locale, and its result."""
+        with self._lock:
+            if (festa_id, lang) not in self._locales:
+                return False, None
+            blob = self._locales[(festa_id, lang)]
+            self._stats["localesReused"] += 1
+        return True, (orjson.loads(zlib.decompress(blob)) if blob is not None else None)
+
+    def fetched(self, festa_id: str, langs: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Journaled results of ``festa_id`` by locale (without counting them as reused)."""
+        with self._lock:
+            blobs = {lang: self._locales[(festa_id, lang)] for lang in langs if (festa_id, lang) in self._locales}
+        return {lang: orjson.loads(zlib.decompress(b)) if b is not None else None for lang, b in blobs.items()}
+
+    def record_locale(self, festa_id: str, lang: str, festa: Optional[Dict[str, Any]]) -> None:
+        """Journal a returned fetch (``festa`` None when the locale had no data)."""
+        blob = zlib.compress(orjson.dumps(festa), 6) if festa is not None else None
+        fp = fingerprint(festa) if festa is not None else None
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._locales[(festa_id, lang)] = blob
+            self._stats["locales"] += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO journal_locales(festa_id, lang, fingerprint, festa, done_at) VALUES(?,?,?,?,?)",
+                (festa_id, lang, fp, blob, now),
+            )
+            if time.monotonic() - self._last_commit >= self.commit_interval:
+                self._conn.commit()
+                self._last_commit = time.monotonic()
+
+    def complete(self, outcomes: Iterable[Outcome]) -> None:
+        """Journal per-ID outcomes; call after their records are durable (JSON + SQLite)."""
+        now = datetime.utcnow().isoformat()
+        rows = [(fid, status, fingerprint(rec) if rec else None, now) for fid, status, rec in outcomes]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO journal_ids(festa_id, status, fingerprint, done_at) VALUES(?,?,?,?)", rows
+                )
+            self._last_commit = time.monotonic()
+            for fid, status, _, _ in rows:
+                if status != "failed":
+                    self._done[fid] = status
+            self._stats["ids"] += len(rows)
+            self._stats["flushes"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"startedAt": self._started_at, "resumed": self._resumed, **self._stats}
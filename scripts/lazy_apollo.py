@@ -0,0 +1,238 @@
+"""Lazy, memoized view of an Apollo cache embedded in a raw ``__NEXT_DATA__`` payload.
+
+``extract_festa`` only ever reads ``ROOT_QUERY`` and the few entities it reaches via
+``__ref``. ``LazyApollo`` finds each requested top-level entry with ``bytes.rfind``,
+slices out just that value and decodes it with orjson, so unrelated entities,
+translation bundles and page props are never turned into Python objects. Anything
+that needs the whole cache (iteration, ``len``) falls back to a full decode once.
+
+The payload is scanned as UTF-8 bytes. A ``"key":`` match only counts when it sits
+directly in the object being looked up: its depth is measured on the payload reduced
+to the brackets outside strings (``replace``/``translate``, so C speed), and matches
+after the object closes are ignored. A repeated key resolves to its last occurrence
+and the cache is chosen in ``get_apollo_state``'s placement order, so lookups agree
+with a full decode.
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import orjson
+
+
+# JSON strings (unrolled loop, escape-aware) and structural brackets
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR = re.compile(rb"[^,}\]\s]+")
+# Every byte but quotes and brackets, for bytes.translate
+_NON_STRUCTURAL = bytes(b for b in range(256) if b not in b'"[]{}')
+_WS = b" \t\r\n"
+
+# Cache placements in ``triple_client.get_apollo_state``'s precedence order
+APOLLO_PATHS = (
+    ("props", "pageProps", "apolloState"),
+    ("props", "apolloState"),
+    ("apolloState",),
+    ("props", "pageProps", "__APOLLO_CACHE__"),
+)
+
+
+def _skip_ws(text: bytes, i: int) -> int:
+    while i < len(text) and text[i] in _WS:
+        i += 1
+    return i
+
+
+def _is_escaped(text: bytes, i: int) -> bool:
+    n = 0
+    while i > 0 and text[i - 1] == 0x5C:  # backslash
+        n += 1
+        i -= 1
+    return n % 2 == 1
+
+
+def find_key_values(text: bytes, key: str, start: int, end: int) -> Iterator[int]:
+    """Start offsets of every value written as ``"key": <value>`` within ``text[start:end]``,
+    last one first."""
+    needle = orjson.dumps(key)
+    pos = text.rfind(needle, start, end)
+    while pos != -1:
+        after = _skip_ws(text, pos + len(needle))
+        if after < end and text[after : after + 1] == b":" and not _is_escaped(text, pos):
+            yield _skip_ws(text, after + 1)
+        pos = text.rfind(needle, start, pos)
+
+
+def value_end(text: bytes, i: int, end: int) -> Optional[int]:
+    """Offset just past the JSON value starting at ``i`` (None if it is cut off)."""
+    ch = text[i : i + 1]
+    if ch == b'"':
+        m = _STRING.match(text, i, end)
+        return m.end() if m else None
+    if ch not in (b"{", b"["):
+        m = _SCALAR.match(text, i, end)
+        return m.end() if m else None
+    depth = 0
+    for m in _TOKEN.finditer(text, i, end):
+        tok = m.group()
+        if tok in (b"{", b"["):
+            depth += 1
+        elif tok in (b"}", b"]"):
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return None
+
+
+def _brackets(segment: bytes) -> bytes:
+    """The brackets of ``segment`` that are outside strings (it must start outside one)."""
+    # Escaped backslashes first, then escaped quotes, so every quote left delimits a string
+    if b"\\\\" in segment:
+        segment = segment.replace(b"\\\\", b"")
+    if b'\\"' in segment:
+        segment = segment.replace(b'\\"', b"")
+    # Adjacent quotes enclose no bracket; dropping them keeps the rest paired
+    skel = segment.translate(None, _NON_STRUCTURAL).replace(b'""', b"")
+    if b'"' in skel:
+        skel = b"".join(skel.split(b'"')[::2])
+    return skel
+
+
+def _dip(brackets: bytes) -> int:
+    """How far ``brackets`` (from well-formed JSON) goes below its starting depth."""
+    while True:
+        reduced = brackets.replace(b"{}", b"").replace(b"[]", b"")
+        if len(reduced) == len(brackets):
+            break
+        brackets = reduced
+    # What is left is the unmatched closers followed by the unmatched openers
+    return len(brackets) - len(brackets.lstrip(b"}]"))
+
+
+class _Depth:
+    """Bracket depth inside the object starting at ``start``, for offsets outside strings.
+
+    Depth 1 is directly inside the object; None means the object closed before the
+    offset. Measured segments are kept as checkpoints, so later queries only scan
+    text not seen before.
+    """
+
+    def __init__(self, text: bytes, start: int) -> None:
+        self._text = text
+        self._pos = [start + 1]
+        self._depth = [1]
+        self._closed_by: Optional[int] = None
+
+    def at(self, p: int) -> Optional[int]:
+        if self._closed_by is not None and p >= self._closed_by:
+            return None
+        i = bisect_right(self._pos, p) - 1
+        depth = self._depth[i]
+        brackets = _brackets(self._text[self._pos[i] : p])
+        closing = brackets.count(b"}") + brackets.count(b"]")
+        if closing >= depth and _dip(brackets) >= depth:
+            self._closed_by = p if self._closed_by is None else min(p, self._closed_by)
+            return None
+        depth += len(brackets) - 2 * closing
+        if p != self._pos[i]:
+            self._pos.insert(i + 1, p)
+            self._depth.insert(i + 1, depth)
+        return depth
+
+
+def find_member(text: bytes, start: int, end: int, key: str, depth: Optional[_Depth] = None) -> Optional[int]:
+    """Value offset of member ``key`` of the object at ``text[start]`` (the last one wins)."""
+    depth = depth or _Depth(text, start)
+    for vstart in find_key_values(text, key, start + 1, end):
+        if depth.at(vstart) == 1:
+            return vstart
+    return None
+
+
+def locate_apollo_cache(text: bytes, start: int, end: int) -> Optional[int]:
+    """Offset of the Apollo cache object in the payload at ``text[start:end]``.
+
+    Placements are tried in ``get_apollo_state``'s order, so the object is the one a
+    full decode would pick. None when there is none.
+    """
+    root = _skip_ws(text, start)
+    if text[root : root + 1] != b"{":
+        return None
+    absent = {key for path in APOLLO_PATHS for key in path if text.find(orjson.dumps(key), root, end) == -1}
+    depths: Dict[int, _Depth] = {}
+    members: Dict[Tuple[int, str], Optional[int]] = {}
+    for path in APOLLO_PATHS:
+        if absent.intersection(path):
+            continue
+        at: Optional[int] = root
+        for key in path:
+            if at is None or text[at : at + 1] != b"{":
+                at = None
+                break
+            if (at, key) not in members:
+                members[at, key] = find_member(text, at, end, key, depths.setdefault(at, _Depth(text, at)))
+            at = members[at, key]
+        if at is not None and text[at : at + 1] == b"{":
+            return at
+    return None
+
+
+_MISSING = object()
+
+
+class LazyApollo(Mapping):
+    """Read-only Apollo cache whose entries are decoded on first access.
+
+    ``text[start:end]`` (UTF-8) must begin with the cache object. Only its own members
+    match, and lookups never allocate anything beyond the requested entry;
+    ``materialize`` supplies the fully decoded cache for iteration/``len`` (only hit
+    by ``find_festa_node``'s last-resort scan).
+    """
+
+    def __init__(self, text: bytes, start: int, end: int, materialize: Callable[[], Dict[str, Any]]) -> None:
+        self._text = text
+        self._start = start
+        self._end = end
+        self._materialize = materialize
+        self._memo: Dict[str, Any] = {}
+        self._depth = _Depth(text, start)
+        self._full: Optional[Dict[str, Any]] = None
+
+    def _decode(self, key: str) -> Any:
+        vstart = find_member(self._text, self._start, self._end, key, self._depth)
+        vend = value_end(self._text, vstart, self._end) if vstart is not None else None
+        if vend is None:
+            return _MISSING
+        return orjson.loads(self._text[vstart:vend])
+
+    def __getitem__(self, key: str) -> Any:
+        if self._full is not None:
+            return self._full[key]
+        val = self._memo.get(key, None)
+        if val is None and key not in self._memo:
+            val = self._memo[key] = self._decode(key)
+        if val is _MISSING:
+            raise KeyError(key)
+        return val
+
+    def full(self) -> Dict[str, Any]:
+        if self._full is None:
+            self._full = self._materialize()
+        return self._full
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.full())
+
+    def __len__(self) -> int:
+        return len(self.full())
+
+    def __bool__(self) -> bool:
+        return True
+
+    @property
+    def decoded(self) -> int:
+        """Entries decoded individually so far (for tests/benchmarks)."""
+        return sum(1 for v in self._memo.values() if v is not _MISSING)
@@ -0,0 +1,203 @@
+"""Per-request and per-stage latency histograms for a crawl run.
+
+Every observation is a duration in seconds for one stage, labelled with ``host``,
+``lang`` and ``status`` where they apply. Stages, in pipeline order:
+
+- ``limiter_wait``: time blocked in ``Limiter.acquire`` before an attempt
+- ``connect``: TCP + TLS handshake of a fresh pooled connection
+- ``ttfb``: request sent until response headers (includes ``connect`` on new connections)
+- ``download``: response headers until the body is fully read
+- ``parse``: locating/decoding ``__NEXT_DATA__`` (lazy Apollo view or full decode)
+- ``extract``: ``extract_festa`` over the Apollo cache
+- ``classify`` / ``validate``: ``finalize_record``'s rules and schema checks
+- ``save``: ``save_record_json``
+
+Histograms use fixed buckets, so memory does not grow with the number of requests;
+percentiles are interpolated within a bucket (as Prometheus' ``histogram_quantile``).
+``report()`` goes to ``crawl_report.json`` under ``metrics``; ``write_textfile``
+writes the same series in the Prometheus text format for node_exporter's textfile
+collector.
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+
+STAGES = ("limiter_wait", "connect", "ttfb", "download", "parse", "extract", "classify", "validate", "save")
+LABELS = ("host", "lang", "status")
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROM_NAME = "popup_crawl_stage_seconds"
+
+SeriesKey = Tuple[str, str, str, str]  # (stage, host, lang, status)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        # First bucket whose upper bound is >= value (Prometheus "le")
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / c)
+            seen += c
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        def ms(v: Optional[float]) -> Optional[float]:
+            return round(v * 1000, 2) if v is not None else None
+
+        return {
+            "count": self.count,
+            "sumSeconds": round(self.sum, 3),
+            "p50Ms": ms(self.quantile(0.5)),
+            "p90Ms": ms(self.quantile(0.9)),
+            "p99Ms": ms(self.quantile(0.99)),
+            "maxMs": ms(self.max),
+        }
+
+
+class Metrics:
+    """Thread-safe histogram registry. ``labeled`` returns a view that shares the
+    same series but fills in default labels (e.g. the locale of one detail fetch)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, Histogram] = {}
+        self._labels: Dict[str, str] = {}
+
+    def labeled(self, **labels: Any) -> "Metrics":
+        view = Metrics.__new__(Metrics)
+        view._lock = self._lock
+        view._series = self._series
+        view._labels = {**self._labels, **{k: str(v) for k, v in labels.items() if v is not None}}
+        return view
+
+    def observe(self, stage: str, seconds: float, **labels: Any) -> None:
+        merged = {**self._labels, **{k: str(v) for k, v in labels.items() if v is not None}}
+        key = (stage, merged.get("host", ""), merged.get("lang", ""), merged.get("status", ""))
+        with self._lock:
+            hist = self._series.get(key)
+            if hist is None:
+                hist = self._series[key] = Histogram()
+            hist.observe(max(0.0, seconds))
+
+    @contextmanager
+    def timer(self, stage: str, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, **labels)
+
+    def _snapshot(self) -> Dict[SeriesKey, Histogram]:
+        with self._lock:
+            out = {}
+            for key, hist in self._series.items():
+                copy = Histogram()
+                copy.merge(hist)
+                out[key] = copy
+            return out
+
+    def series(self) -> Dict[SeriesKey, Histogram]:
+        """Copy of every series (picklable), e.g. to ship a worker process's observations back."""
+        return self._snapshot()
+
+    def merge_series(self, series: Dict[SeriesKey, Histogram]) -> None:
+        """Add observations from ``series()`` of another registry into this one."""
+        with self._lock:
+            for key, hist in series.items():
+                mine = self._series.get(key)
+                if mine is None:
+                    mine = self._series[key] = Histogram()
+                mine.merge(hist)
+
+    def report(self) -> Dict[str, Any]:
+        """Per stage: overall summary plus breakdowns by host, locale and status."""
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for (stage, host, lang, status), hist in self._snapshot().items():
+            g = grouped.setdefault(stage, {"all": Histogram(), "byHost": {}, "byLang": {}, "byStatus": {}})
+            g["all"].merge(hist)
+            for dim, value in (("byHost", host), ("byLang", lang), ("byStatus", status)):
+                if value:
+                    g[dim].setdefault(value, Histogram()).merge(hist)
+        order = {s: i for i, s in enumerate(STAGES)}
+        stages: Dict[str, Any] = {}
+        for stage in sorted(grouped, key=lambda s: (order.get(s, len(order)), s)):
+            g = grouped[stage]
+            entry = g["all"].summary()
+            for dim in ("byHost", "byLang", "byStatus"):
+                if g[dim]:
+                    entry[dim] = {k: h.summary() for k, h in sorted(g[dim].items())}
+            stages[stage] = entry
+        return {"bucketsSeconds": list(BUCKETS), "stages": stages}
+
+    def prometheus_text(self, counts: Optional[Dict[str, int]] = None) -> str:
+        """Histogram series in text format, plus per-outcome ID counts of the run if given."""
+        lines: List[str] = [
+            f"# HELP {PROM_NAME} Crawler stage latency in seconds.",
+            f"# TYPE {PROM_NAME} histogram",
+        ]
+        for (stage, host, lang, status), hist in sorted(self._snapshot().items()):
+            labels = [("stage", stage)] + [(k, v) for k, v in zip(LABELS, (host, lang, status)) if v]
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            cumulative = 0
+            for bound, c in zip(list(BUCKETS) + [float("inf")], hist.counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{PROM_NAME}_bucket{{{base},le="{le}"}} {cumulative}')
+            lines.append(f"{PROM_NAME}_sum{{{base}}} {hist.sum!r}")
+            lines.append(f"{PROM_NAME}_count{{{base}}} {hist.count}")
+        if counts is not None:
+            lines.append("# HELP popup_crawl_ids Festa IDs by outcome in the last run.")
+            lines.append("# TYPE popup_crawl_ids gauge")
+            for outcome, n in sorted(counts.items()):
+                lines.append(f'popup_crawl_ids{{outcome="{_escape(outcome)}"}} {n}')
+            lines.append("# TYPE popup_crawl_last_run_timestamp_seconds gauge")
+            lines.append(f"popup_crawl_last_run_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, counts: Optional[Dict[str, int]] = None) -> None:
+        """Atomic write (temp file + rename) so the collector never reads a partial file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text(counts))
+        os.replace(tmp, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def timed(metrics: Optional[Metrics], stage: str, **labels: Any) -> ContextManager[None]:
+    """``metrics.timer(...)``, or a no-op when metrics are not being collected."""
+    return metrics.timer(stage, **labels) if metrics is not None else nullcontext()
@@ -0,0 +1,235 @@
+"""Staged pipeline for the thread engine: I/O threads and CPU work in separate stages.
+
+A ``StagedPipeline`` is a chain of ``Stage``s joined by bounded queues. Each stage
+has its own pool of threads pulling from its input queue, so a slow stage fills its
+queue and blocks the stage before it (backpressure) instead of buffering the whole
+crawl. A stage whose work is CPU-bound gives its threads a shared process pool
+(``process_pool``): a thread submits the job and waits, without holding the GIL, while a
+worker process parses or classifies, so one stage's threads saturate the network
+budget and the other's saturate the cores.
+
+Per stage, ``report()`` gives items handled, busy time and utilization, time blocked
+on a full output queue, and input queue depth (sampled on every take). It goes to
+``crawl_report.json`` under ``pipeline``.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from scripts.metrics import Histogram, Metrics, SeriesKey
+from scripts.triple_client import _load_crawl_conf
+
+
+@dataclass(frozen=True)
+class PipelineConf:
+    parse_workers: int = 0  # 0 = one per CPU
+    build_workers: int = 2
+    queue_size: int = 64
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "PipelineConf":
+        p = conf.get("pipeline") or {}
+        return cls(
+            parse_workers=max(0, int(p.get("parseWorkers", cls.parse_workers))),
+            build_workers=max(1, int(p.get("buildWorkers", cls.build_workers))),
+            queue_size=max(1, int(p.get("queueSize", cls.queue_size))),
+        )
+
+    def cpu_workers(self) -> int:
+        return self.parse_workers or os.cpu_count() or 1
+
+
+def load_pipeline_conf() -> PipelineConf:
+    return PipelineConf.from_conf(_load_crawl_conf())
+
+
+def _ignore_sigint() -> None:
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Worker processes for CPU stages. Spawned rather than forked: the crawler forks
+    from a process full of threads holding locks (sessions, limiter, caches)."""
+    return ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"), initializer=_ignore_sigint
+    )
+
+
+def run_with_metrics(fn: Callable[..., Any], *args: Any, labels: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[SeriesKey, Histogram]]:
+    """Runs in a worker process: ``fn(*args, metrics=...)`` plus the observations it made,
+    for the parent to ``merge_series`` into the run's registry."""
+    metrics = Metrics()
+    result = fn(*args, metrics=metrics.labeled(**(labels or {})))
+    return result, metrics.series()
+
+
+_DONE = object()
+
+
+class Stage:
+    """One step of the pipeline: ``fn(item) -> item`` run by ``workers`` threads."""
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: int = 64) -> None:
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.inbox: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._running = self.workers
+        self._stats = {"items": 0, "busy": 0.0, "blocked": 0.0, "depthSum": 0, "depthMax": 0}
+
+    def _took(self, depth: int) -> None:
+        with self._lock:
+            self._stats["depthSum"] += depth
+            self._stats["depthMax"] = max(self._stats["depthMax"], depth)
+
+    def _did(self, busy: float, blocked: float) -> None:
+        with self._lock:
+            self._stats["items"] += 1
+            self._stats["busy"] += busy
+            self._stats["blocked"] += blocked
+
+    def _exited(self) -> bool:
+        """True for the last worker of the stage to stop."""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0
+
+    def report(self, wall: float) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        return {
+            "workers": self.workers,
+            "items": s["items"],
+            "busySeconds": round(s["busy"], 3),
+            "utilization": round(s["busy"] / (self.workers * wall), 3) if wall > 0 else None,
+            "blockedSeconds": round(s["blocked"], 3),
+            "queue": {
+                "capacity": self.inbox.maxsize,
+                "maxDepth": s["depthMax"],
+                "meanDepth": round(s["depthSum"] / s["items"], 2) if s["items"] else 0.0,
+            },
+        }
+
+
+class StagedPipeline:
+    """Feeds items through ``stages`` in order; ``run`` yields the last stage's outputs
+    as they complete (not in input order).
+
+    A stage that raises stops the pipeline and the exception is re-raised from ``run``.
+    ``close`` (also called when the consumer stops iterating) stops every stage; items
+    still queued are dropped.
+    """
+
+    def __init__(self, stages: List[Stage], out_size: int = 64) -> None:
+        self.stages = stages
+        self.outbox: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, out_size))
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._threads: List[threading.Thread] = []
+        self._started = 0.0
+        self._wall = 0.0
+
+    def _put(self, q: "queue.Queue[Any]", item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue[Any]") -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _worker(self, idx: int) -> None:
+        stage = self.stages[idx]
+        nxt = self.stages[idx + 1].inbox if idx + 1 < len(self.stages) else self.outbox
+        try:
+            while True:
+                depth = stage.inbox.qsize()
+                item = self._get(stage.inbox)
+                if item is _DONE:
+                    break
+                stage._took(depth)
+                t0 = time.perf_counter()
+                out = stage.fn(item)
+                t1 = time.perf_counter()
+                self._put(nxt, out)
+                stage._did(t1 - t0, time.perf_counter() - t1)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+        finally:
+            if stage._exited():
+                # Last one out tells every worker of the next stage (or the consumer)
+                n = self.stages[idx + 1].workers if idx + 1 < len(self.stages) else 1
+                for _ in range(n):
+                    self._put(nxt, _DONE)
+
+    def _feed(self, items: Iterable[Any]) -> None:
+        first = self.stages[0]
+        try:
+            for item in items:
+                if not self._put(first.inbox, item):
+                    return
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+        finally:
+            for _ in range(first.workers):
+                self._put(first.inbox, _DONE)
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        self._started = time.perf_counter()
+        self._threads = [threading.Thread(target=self._feed, args=(items,), name="pipeline-feed", daemon=True)]
+        for idx, stage in enumerate(self.stages):
+            self._threads.extend(
+                threading.Thread(target=self._worker, args=(idx,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            )
+        for t in self._threads:
+            t.start()
+        finished = False
+        try:
+            while True:
+                out = self._get(self.outbox)
+                if out is _DONE:
+                    break
+                yield out
+            finished = True
+        finally:
+            # On an interrupt the caller cancels the pools the stages wait on, then joins
+            self.close(wait=finished)
+        if self._error is not None:
+            raise self._error
+
+    def close(self, wait: bool = True) -> None:
+        """Stop every stage; with ``wait``, join the threads (items in hand are finished)."""
+        if self._wall == 0.0 and self._started:
+            self._wall = time.perf_counter() - self._started
+        if any(t.is_alive() for t in self._threads):
+            self._stop.set()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def report(self) -> Dict[str, Any]:
+        wall = self._wall or (time.perf_counter() - self._started if self._started else 0.0)
+        return {"seconds": round(wall, 3), "stages": {s.name: s.report(wall) for s in self.stages}}
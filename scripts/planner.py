@@ -0,0 +1,260 @@
+"""Incremental crawl planner: decide per festa ID whether to fetch, revalidate or skip.
+
+Sits between sitemap discovery and the per-ID workers. Inputs per ID are the newest
+sitemap ``<lastmod>`` across its locale URLs, the stored record (``duration.end`` and
+``meta.fetchedAt``, which only moves when content actually changed) and the last
+time any of its detail URLs was answered (``HttpCache.checked_at``).
+
+- ``fetch``: nothing usable stored yet (or ``--full``).
+- ``revalidate``: sitemap lastmod moved since the last check, or the ID is due again.
+  IDs without a lastmod are revisited on an interval that grows with how long the
+  record has gone unchanged (half its unchanged age, clamped to the configured range).
+- ``skip``: the event ended more than ``endedGraceDays`` ago (and its lastmod has not
+  moved), or nothing suggests a change.
+
+Below the ID level, ``Quarantine`` holds back single detail URLs (typically a locale
+that does not exist) that kept failing across runs.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+
+from scripts.storage import DATA_DIR
+from scripts.triple_client import SitemapEntry, _load_crawl_conf, extract_id_from_url, triple_detail_url
+
+
+FETCH = "fetch"
+REVALIDATE = "revalidate"
+SKIP = "skip"
+
+
+@dataclass(frozen=True)
+class PlannerConf:
+    ended_grace_days: float = 7.0
+    min_interval_days: float = 1.0
+    max_interval_days: float = 30.0
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "PlannerConf":
+        planner = conf.get("planner") or {}
+        return cls(
+            ended_grace_days=float(planner.get("endedGraceDays", cls.ended_grace_days)),
+            min_interval_days=float(planner.get("minIntervalDays", cls.min_interval_days)),
+            max_interval_days=float(planner.get("maxIntervalDays", cls.max_interval_days)),
+        )
+
+
+def load_planner_conf() -> PlannerConf:
+    return PlannerConf.from_conf(_load_crawl_conf())
+
+
+@dataclass(frozen=True)
+class QuarantineConf:
+    after: int = 2
+    base_days: float = 3.0
+    max_days: float = 60.0
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "QuarantineConf":
+        quarantine = conf.get("quarantine") or {}
+        return cls(
+            after=max(1, int(quarantine.get("after", cls.after))),
+            base_days=float(quarantine.get("baseDays", cls.base_days)),
+            max_days=float(quarantine.get("maxDays", cls.max_days)),
+        )
+
+    def next_probe(self, failures: int, last_at: Optional[datetime]) -> Optional[datetime]:
+        """When a URL that failed in ``failures`` runs may be requested again (None: not quarantined).
+
+        The wait doubles with every further failed run, up to ``max_days``.
+        """
+        if failures < self.after or last_at is None:
+            return None
+        return last_at + timedelta(days=min(self.max_days, self.base_days * 2 ** (failures - self.after)))
+
+
+def load_quarantine_conf() -> QuarantineConf:
+    return QuarantineConf.from_conf(_load_crawl_conf())
+
+
+@dataclass(frozen=True)
+class Decision:
+    id: str
+    action: str
+    reason: str
+    # Whether the HTTP cache had a check time for any of the ID's detail URLs
+    checked: bool = False
+
+
+def parse_when(value: Any) -> Optional[datetime]:
+    """Aware UTC datetime from a sitemap/ISO date or datetime string (naive means UTC)."""
+    if not value or not isinstance(value, str):
+        return None
+    text = value.strip().replace("Z", "+00:00")
+    try:
+        when = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            when = datetime.combine(date.fromisoformat(text[:10]), datetime.min.time())
+        except ValueError:
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc)
+
+
+def lastmod_by_id(entries: Iterable[SitemapEntry]) -> Dict[str, datetime]:
+    """Newest sitemap lastmod per festa ID (IDs without one are absent)."""
+    out: Dict[str, datetime] = {}
+    for loc, lastmod in entries:
+        fid = extract_id_from_url(loc)
+        when = parse_when(lastmod)
+        if fid and when and (fid not in out or when > out[fid]):
+            out[fid] = when
+    return out
+
+
+def load_stored_record(fid: str, records_dir: str = DATA_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(records_dir, f"{fid}.json"), "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def decide(
+    lastmod: Optional[datetime],
+    record: Optional[Dict[str, Any]],
+    checked_at: Optional[datetime],
+    now: datetime,
+    conf: PlannerConf = PlannerConf(),
+) -> Tuple[str, str]:
+    """``(action, reason)`` for one ID; pure so the policy is easy to test."""
+    if record is None:
+        return FETCH, "new"
+    changed_at = parse_when((record.get("meta") or {}).get("fetchedAt"))
+    seen_at = checked_at or changed_at
+    if lastmod is not None and seen_at is not None and lastmod > seen_at:
+        return REVALIDATE, "lastmod"
+    end = parse_when((record.get("duration") or {}).get("end"))
+    if end is not None and end + timedelta(days=1 + conf.ended_grace_days) < now:
+        return SKIP, "ended"
+    if checked_at is None:
+        return FETCH, "unchecked"
+    if lastmod is not None:
+        return SKIP, "lastmod-unchanged"
+    changed_at = changed_at or checked_at
+    unchanged_days = max(0.0, (checked_at - changed_at).total_seconds() / 86400)
+    interval = min(conf.max_interval_days, max(conf.min_interval_days, unchanged_days / 2))
+    if now - checked_at >= timedelta(days=interval):
+        return REVALIDATE, "due"
+    return SKIP, "not-due"
+
+
+def plan(
+    ids: List[str],
+    entries: Iterable[SitemapEntry],
+    cache: Any,
+    langs: List[str],
+    *,
+    full: bool = False,
+    now: Optional[datetime] = None,
+    conf: PlannerConf = PlannerConf(),
+    records_dir: str = DATA_DIR,
+) -> List[Decision]:
+    now = now or datetime.now(timezone.utc)
+    lastmods = lastmod_by_id(entries) if not full else {}
+    decisions: List[Decision] = []
+    for fid in ids:
+        checks = [parse_when(cache.checked_at(triple_detail_url(lang, fid))) for lang in langs]
+        checked_at = max((c for c in checks if c is not None), default=None)
+        if full:
+            action, reason = FETCH, "full"
+        else:
+            action, reason = decide(lastmods.get(fid), load_stored_record(fid, records_dir), checked_at, now, conf)
+        decisions.append(Decision(fid, action, reason, checked_at is not None))
+    return decisions
+
+
+def plan_report(decisions: List[Decision], planned: List[str]) -> Dict[str, Any]:
+    """Summary for ``crawl_report.json``: counts, reasons, the work set and every decision.
+
+    ``checkHistory`` is False when the HTTP cache knew no check time for any ID (a
+    missing or fresh ``data/http_cache.sqlite``): every stored ID then plans as
+    ``unchecked`` and is fetched again.
+    """
+    actions = Counter(d.action for d in decisions)
+    return {
+        "ids": len(decisions),
+        "checkHistory": any(d.checked for d in decisions),
+        "fetch": actions[FETCH],
+        "revalidate": actions[REVALIDATE],
+        "skip": actions[SKIP],
+        "reasons": dict(sorted(Counter(d.reason for d in decisions).items())),
+        "planned": planned,
+        "decisions": {d.id: {"action": d.action, "reason": d.reason} for d in decisions},
+    }
+
+
+class Quarantine:
+    """Skip detail URLs that failed in ``after`` or more runs until their next probe is due.
+
+    Failure history is ``http_failures`` in the HTTP cache: the crawler dead-letters a
+    URL once per run it fails in, and any later 200/304 removes it (the URL is released).
+    A held URL answers with the extraction stored from its last 200, marked like a 304,
+    so a locale that once existed is kept; otherwise it answers "no data". A URL that is
+    due is sent as a probe; failing again doubles its wait.
+    """
+
+    def __init__(self, cache: Any, conf: Optional[QuarantineConf] = None, now: Optional[datetime] = None) -> None:
+        self.cache = cache
+        self.conf = conf or QuarantineConf()
+        self.now = now or datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self._held: Dict[str, Dict[str, Any]] = {}
+        self._probed: Set[str] = set()
+        self._skips = 0
+
+    def held(self, url: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """``(held, festa)``: whether to skip requesting ``url``, and what to use instead."""
+        failure = self.cache.failure(url)
+        if failure is None:
+            return False, None
+        count, error, last_at = failure
+        next_probe = self.conf.next_probe(count, parse_when(last_at))
+        if next_probe is None:
+            return False, None
+        if next_probe <= self.now:
+            with self._lock:
+                self._probed.add(url)
+            return False, None
+        with self._lock:
+            self._skips += 1
+            self._held.setdefault(
+                url, {"url": url, "failures": count, "lastError": error, "nextProbe": next_probe.isoformat()}
+            )
+        festa = self.cache.get_extraction(url)
+        if festa:
+            festa["_notModified"] = True
+        return True, festa or None
+
+    def report(self) -> Dict[str, Any]:
+        """Held URLs and the requests they did not cost (at least one per skipped fetch)."""
+        with self._lock:
+            held = sorted(self._held.values(), key=lambda h: h["url"])
+            probed = sorted(self._probed)
+            skips = self._skips
+        return {
+            "held": len(held),
+            "requestsSaved": skips,
+            "probed": len(probed),
+            "released": sum(1 for url in probed if self.cache.failure(url) is None),
+            "urls": held,
+        }
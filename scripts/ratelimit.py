@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Global fixed-QPS slot reservation shared by every host."""
+
+    def __init__(self, qps: float) -> None:
+        self.interval = 1.0 / qps if qps and qps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def reserve(self, url: Optional[str] = None) -> float:
+        if self.interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            sleep_for = self._next_at - now
+            if sleep_for > 0:
+                # Reserve slot first to reduce thundering herd
+                self._next_at += self.interval
+            else:
+                self._next_at = now + self.interval
+        return max(0.0, sleep_for)
+
+    def acquire(self, url: Optional[str] = None) -> float:
+        sleep_for = self.reserve(url)
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+        return sleep_for
+
+    async def acquire_async(self, url: Optional[str] = None) -> float:
+        sleep_for = self.reserve(url)
+        if sleep_for > 0:
+            await asyncio.sleep(sleep_for)
+        return sleep_for
+
+    def observe(
+        self,
+        url: str,
+        *,
+        status: Optional[int] = None,
+        elapsed: Optional[float] = None,
+        timeout: bool = False,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {"*": {"qps": round(1.0 / self.interval, 3) if self.interval else None, "adaptive": False}}
+
+
+@dataclass
+class _HostState:
+    rate: float
+    next_at: float = 0.0
+    blocked_until: float = 0.0
+    last_cut_at: float = 0.0
+    latency_ewma: Optional[float] = None
+    latency_floor: Optional[float] = None
+    peak_rate: float = 0.0
+    counts: Dict[str, int] = field(
+        default_factory=lambda: {"requests": 0, "throttled": 0, "timeouts": 0, "slow": 0, "decreases": 0}
+    )
+
+
+class AdaptiveRateLimiter:
+    """Per-host AIMD limiter.
+
+    Each host starts at ``qps``. Healthy responses raise its rate additively (about
+    ``increase`` qps per second of traffic); 429/503, timeouts or latency rising above
+    ``latency_factor`` x the best observed EWMA cut it by ``decrease``, at most once
+    per cooldown window. Retry-After blocks the whole host, not just one request.
+    """
+
+    LATENCY_ALPHA = 0.2
+    WARMUP_RESPONSES = 5
+
+    def __init__(
+        self,
+        qps: float = 2.0,
+        *,
+        min_qps: float = 0.2,
+        max_qps: float = 20.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        latency_factor: float = 2.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self.initial = max(min_qps, min(max_qps, qps))
+        self.min_qps = min_qps
+        self.max_qps = max_qps
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = _HostState(rate=self.initial, peak_rate=self.initial)
+        return st
+
+    def reserve(self, url: Optional[str] = None) -> float:
+        host = host_of(url or "")
+        with self._lock:
+            st = self._state(host)
+            now = time.monotonic()
+            start = max(now, st.next_at, st.blocked_until)
+            st.next_at = start + 1.0 / st.rate
+            st.counts["requests"] += 1
+        return start - now
+
+    def acquire(self, url: Optional[str] = None) -> float:
+        sleep_for = self.reserve(url)
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+        return sleep_for
+
+    async def acquire_async(self, url: Optional[str] = None) -> float:
+        sleep_for = self.reserve(url)
+        if sleep_for > 0:
+            await asyncio.sleep(sleep_for)
+        return sleep_for
+
+    def _cut(self, st: _HostState, now: float) -> None:
+        if now - st.last_cut_at < max(self.cooldown, 1.0 / st.rate):
+            return
+        st.rate = max(self.min_qps, st.rate * self.decrease)
+        st.last_cut_at = now
+        st.counts["decreases"] += 1
+
+    def observe(
+        self,
+        url: str,
+        *,
+        status: Optional[int] = None,
+        elapsed: Optional[float] = None,
+        timeout: bool = False,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            st = self._state(host_of(url))
+            now = time.monotonic()
+            if retry_after is not None:
+                st.blocked_until = max(st.blocked_until, now + retry_after)
+            if timeout:
+                st.counts["timeouts"] += 1
+                self._cut(st, now)
+                return
+            if status in (429, 503):
+                st.counts["throttled"] += 1
+                self._cut(st, now)
+                return
+            if elapsed is not None:
+                prev = st.latency_ewma
+                st.latency_ewma = elapsed if prev is None else prev + self.LATENCY_ALPHA * (elapsed - prev)
+                responses = st.counts["requests"] - st.counts["throttled"] - st.counts["timeouts"]
+                if responses >= self.WARMUP_RESPONSES:
+                    if st.latency_floor is None or st.latency_ewma < st.latency_floor:
+                        st.latency_floor = st.latency_ewma
+                    elif st.latency_ewma > st.latency_floor * self.latency_factor:
+                        st.counts["slow"] += 1
+                        self._cut(st, now)
+                        return
+            if status is not None and status < 500:
+                st.rate = min(self.max_qps, st.rate + self.increase / st.rate)
+                st.peak_rate = max(st.peak_rate, st.rate)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {}
+            for host, st in sorted(self._hosts.items()):
+                out[host] = {
+                    "qps": round(st.rate, 3),
+                    "peakQps": round(st.peak_rate, 3),
+                    "latencyEwma": round(st.latency_ewma, 4) if st.latency_ewma is not None else None,
+                    "adaptive": True,
+                    **st.counts,
+                }
+            return out
+
+
+Limiter = Union[RateLimiter, AdaptiveRateLimiter]
+
+
+def make_limiter(
+    qps: float, *, adaptive: bool = False, min_qps: float = 0.2, max_qps: float = 20.0
+) -> Optional[Limiter]:
+    if adaptive:
+        return AdaptiveRateLimiter(qps if qps and qps > 0 else 2.0, min_qps=min_qps, max_qps=max_qps)
+    return RateLimiter(qps) if qps and qps > 0 else None
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from scripts.ratelimit import host_of
+
+
+# 4xx responses worth another attempt; every other 4xx is final
+RETRYABLE_4XX = frozenset({408, 425, 429})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request to a host whose breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The whole-fetch deadline (all attempts and backoff) ran out."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry/backoff, timeouts and budgets for one logical fetch.
+
+    Built once per run from ``config/crawl.json`` (see ``triple_client.load_retry_policy``).
+    """
+
+    attempts: int = 4
+    initial: float = 1.0
+    max_wait: float = 8.0
+    multiplier: float = 2.0
+    jitter: float = 0.2
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    deadline: float = 60.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "RetryPolicy":
+        retry = conf.get("retry") or {}
+        breaker = conf.get("breaker") or {}
+        return cls(
+            attempts=int(retry.get("attempts", cls.attempts)),
+            initial=float(retry.get("initial", cls.initial)),
+            max_wait=float(retry.get("max", cls.max_wait)),
+            multiplier=float(retry.get("multiplier", cls.multiplier)),
+            jitter=float(retry.get("jitter", cls.jitter)),
+            connect_timeout=float(conf.get("connectTimeout", cls.connect_timeout)),
+            read_timeout=float(conf.get("timeout", cls.read_timeout)),
+            deadline=float(conf.get("deadline", cls.deadline)),
+            breaker_threshold=int(breaker.get("threshold", cls.breaker_threshold)),
+            breaker_cooldown=float(breaker.get("cooldown", cls.breaker_cooldown)),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter over the capped exponential step
+        return random.uniform(0, min(self.max_wait, self.initial * (self.multiplier ** (attempt - 1))))
+
+    def timeout(self, remaining: Optional[float] = None) -> Tuple[float, float]:
+        read = self.read_timeout if remaining is None else max(0.1, min(self.read_timeout, remaining))
+        return (min(self.connect_timeout, read), read)
+
+    @staticmethod
+    def is_retryable_status(status: int) -> bool:
+        return status >= 500 or status in RETRYABLE_4XX
+
+    def remaining(self, started: float) -> float:
+        if self.deadline <= 0:
+            return float("inf")
+        return self.deadline - (time.monotonic() - started)
+
+
+def is_permanent(exc: BaseException) -> bool:
+    """True when retrying cannot help: the request was answered with a final 4xx (404/410/403...).
+
+    Reads ``requests``' ``exc.response.status_code`` and aiohttp's ``exc.status``.
+    """
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(exc, "status", None)
+    return status is not None and not RetryPolicy.is_retryable_status(int(status))
+
+
+def reached_origin(exc: BaseException) -> bool:
+    """False for failures that never put a request on the wire for this URL: a breaker
+    rejection or a fetch whose whole-call deadline ran out. Only the rest count as a
+    failure of the URL itself (``http_failures``, quarantine)."""
+    return not isinstance(exc, (CircuitOpenError, DeadlineExceeded))
+
+
+@dataclass(frozen=True)
+class RequeuePolicy:
+    """Rounds of the end-of-run retry queue for (id, locale) pairs that still failed.
+
+    Round ``n`` starts ``initial * multiplier ** (n - 1)`` seconds after the previous one,
+    giving throttled or briefly unavailable hosts longer to recover each time.
+    """
+
+    rounds: int = 2
+    initial: float = 5.0
+    multiplier: float = 3.0
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "RequeuePolicy":
+        requeue = conf.get("requeue") or {}
+        return cls(
+            rounds=max(0, int(requeue.get("rounds", cls.rounds))),
+            initial=float(requeue.get("initial", cls.initial)),
+            multiplier=float(requeue.get("multiplier", cls.multiplier)),
+        )
+
+    def delay(self, round_no: int) -> float:
+        return self.initial * (self.multiplier ** (round_no - 1))
+
+
+class CircuitBreaker:
+    """Per-host breaker: open after ``threshold`` consecutive failures.
+
+    While open every request fails fast with ``CircuitOpenError``. After ``cooldown``
+    seconds one caller is let through as a half-open probe; its success closes the
+    breaker, its failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_policy(cls, policy: RetryPolicy) -> "CircuitBreaker":
+        return cls(policy.breaker_threshold, policy.breaker_cooldown)
+
+    def _state(self, host: str) -> Dict[str, Any]:
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = {
+                "state": "closed",
+                "failures": 0,
+                "openedAt": 0.0,
+                "opened": 0,
+                "rejected": 0,
+            }
+        return st
+
+    def before(self, url: str) -> None:
+        host = host_of(url)
+        with self._lock:
+            st = self._state(host)
+            if st["state"] == "closed":
+                return
+            if st["state"] == "open" and time.monotonic() - st["openedAt"] >= self.cooldown:
+                st["state"] = "half_open"  # this caller is the probe
+                return
+            st["rejected"] += 1
+        raise CircuitOpenError(f"circuit open for host: {host}")
+
+    def record_success(self, url: str) -> None:
+        with self._lock:
+            st = self._state(host_of(url))
+            st["state"] = "closed"
+            st["failures"] = 0
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            st = self._state(host_of(url))
+            st["failures"] += 1
+            if st["state"] == "half_open" or (st["state"] == "closed" and st["failures"] >= self.threshold):
+                st["state"] = "open"
+                st["openedAt"] = time.monotonic()
+                st["opened"] += 1
+
+    def reopens_in(self) -> float:
+        """Seconds until every open host lets a half-open probe through (0 if none is open)."""
+        now = time.monotonic()
+        with self._lock:
+            waits = [st["openedAt"] + self.cooldown - now for st in self._hosts.values() if st["state"] == "open"]
+        return max([0.0, *waits])
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                host: {"state": st["state"], "failures": st["failures"], "opened": st["opened"], "rejected": st["rejected"]}
+                for host, st in sorted(self._hosts.items())
+            }
@@ -1,12 +1,90 @@
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
+from functools import cached_property, lru_cache
 import json
 import os
 from pathlib import Path
 import re
-from typing import Iterable, List, Tuple, Dict, Any
+import unicodedata
+from typing import Iterable, List, Mapping, Optional, Tuple, Dict, Any
+
+
+def fold(text: str) -> str:
+    """NFKC + casefold: full/half-width forms and case variants compare equal
+    (e.g. "ＰＯＰ-ＵＰ" -> "pop-up", half-width "ﾎﾟｯﾌﾟｱｯﾌﾟ" -> "ポップアップ")."""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over folded keywords.
+
+    Built once; scanning a title costs one dict lookup per character however many
+    keywords there are, and overlapping keywords ("팝업" inside "팝업스토어") all match.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: List[str] = []
+        for kw in keywords:
+            f = fold(kw)
+            if f and f not in self.keywords:
+                self.keywords.append(f)
+        # Trie: children per node and a bitmask of the keywords ending there
+        children: List[Dict[str, int]] = [{}]
+        out: List[int] = [0]
+        for i, kw in enumerate(self.keywords):
+            node = 0
+            for ch in kw:
+                nxt = children[node].get(ch)
+                if nxt is None:
+                    nxt = len(children)
+                    children[node][ch] = nxt
+                    children.append({})
+                    out.append(0)
+                node = nxt
+            out[node] |= 1 << i
+        # Breadth-first: failure links, inherited outputs, and a full transition table
+        # (failure transitions folded in) so scanning never walks failure chains
+        fail = [0] * len(children)
+        delta: List[Dict[str, int]] = [dict(children[0])] + [{} for _ in children[1:]]
+        queue = deque(children[0].values())
+        while queue:
+            node = queue.popleft()
+            out[node] |= out[fail[node]]
+            delta[node] = {**delta[fail[node]], **children[node]}
+            for ch, nxt in children[node].items():
+                fail[nxt] = delta[fail[node]].get(ch, 0)
+                queue.append(nxt)
+        self._delta = delta
+        self._out = out
+
+    def scan(self, text: str) -> int:
+        """Bitmask of the keywords occurring in ``fold(text)`` (bit i = ``keywords[i]``)."""
+        delta, out = self._delta, self._out
+        state = mask = 0
+        for ch in fold(text):
+            state = delta[state].get(ch, 0)
+            mask |= out[state]
+        return mask
+
+    def hits(self, texts: Iterable[str]) -> List[str]:
+        """Keywords found, per text in keyword order, first occurrence only."""
+        found: List[str] = []
+        seen = 0
+        for t in texts:
+            if not t:
+                continue
+            new = self.scan(t) & ~seen
+            seen |= new
+            i = 0
+            while new:
+                if new & 1:
+                    found.append(self.keywords[i])
+                new >>= 1
+                i += 1
+        return found
 
 
 @dataclass(frozen=True)
@@ -66,24 +144,14 @@ class PopupRules:
             return False
         return token in self.allowed_categories
 
+    @cached_property
+    def matcher(self) -> KeywordMatcher:
+        # Compiled on first use and kept with the (immutable) rules
+        return KeywordMatcher(self.keyword_ko + self.keyword_en + self.keyword_ja)
+
     def find_keyword_hits(self, titles: Iterable[str]) -> List[str]:
-        hits: List[str] = []
-        kws = tuple({*(k.lower() for k in (self.keyword_ko + self.keyword_en + self.keyword_ja))})
-        for t in titles:
-            if not t:
-                continue
-            tl = t.lower()
-            for kw in kws:
-                if kw and kw in tl:
-                    hits.append(kw)
-        # De-duplicate preserving order
-        seen = set()
-        uniq: List[str] = []
-        for h in hits:
-            if h not in seen:
-                seen.add(h)
-                uniq.append(h)
-        return uniq
+        """Folded keywords found in ``titles``, in title then keyword order, de-duplicated."""
+        return self.matcher.hits(titles)
 
     def match_keywords(self, titles: Iterable[str]) -> bool:
         return len(self.find_keyword_hits(titles)) > 0
@@ -103,31 +171,75 @@ class PopupRules:
         titles: Iterable[str],
         start: date | None,
         end: date | None,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        return self._decide(self.match_category(category), category=category, titles=titles, start=start, end=end)
+
+    def classify_record(self, record: Mapping[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """``classify`` on a merged/saved record (category, translated titles, duration)."""
+        return self.classify(**record_inputs(record))
+
+    def classify_many(self, records: Iterable[Mapping[str, Any]]) -> List[Tuple[bool, Dict[str, Any]]]:
+        """``classify_record`` for a batch; category tokens are resolved once per distinct value."""
+        categories: Dict[Any, bool] = {}
+        out: List[Tuple[bool, Dict[str, Any]]] = []
+        for record in records:
+            inputs = record_inputs(record)
+            category = inputs["category"]
+            cat_ok = categories.get(category)
+            if cat_ok is None:
+                cat_ok = categories[category] = self.match_category(category)
+            out.append(self._decide(cat_ok, **inputs))
+        return out
+
+    def _decide(
+        self, cat_ok: bool, *, category: str | None, titles: Iterable[str], start: date | None, end: date | None
     ) -> Tuple[bool, Dict[str, Any]]:
         reasons: List[str] = []
         details: Dict[str, Any] = {}
-
-        cat_ok = self.match_category(category)
         if cat_ok:
             reasons.append("category")
             details["category"] = category
-
         kw_hits = self.find_keyword_hits(titles)
-        kw_ok = len(kw_hits) > 0
-        if kw_ok:
+        if kw_hits:
             reasons.append("keyword")
             details["keywordHits"] = kw_hits
-
         dur_ok = self.match_duration(start, end)
         if dur_ok:
             reasons.append("duration")
             if start and end:
                 details["durationDays"] = (end - start).days
-
-        # Decision: category alone is sufficient. Otherwise require (keyword AND duration).
-        is_popup = cat_ok or (kw_ok and dur_ok)
         details["rule"] = "|".join(reasons) if reasons else ""
-        return is_popup, details
+        # Decision: category alone is sufficient. Otherwise require (keyword AND duration).
+        return cat_ok or (bool(kw_hits) and dur_ok), details
+
+
+def _parse_day(value: Any) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def record_inputs(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """``classify`` keyword arguments from a record: category, every translation's title
+    (in stored locale order) and the ``duration`` dates."""
+    titles: List[str] = []
+    tr = record.get("translations") or {}
+    if isinstance(tr, dict):
+        for vals in tr.values():
+            if isinstance(vals, dict) and vals.get("title"):
+                titles.append(str(vals["title"]))
+    dur = record.get("duration") or {}
+    if not isinstance(dur, dict):
+        dur = {}
+    return {
+        "category": record.get("category"),
+        "titles": titles,
+        "start": _parse_day(dur.get("start")),
+        "end": _parse_day(dur.get("end")),
+    }
 
 
 # ---- Config loading ----
@@ -142,6 +254,8 @@ def _default_config_path() -> Path:
 def load_rules(path: str | os.PathLike | None = None) -> PopupRules:
     """Load PopupRules from a JSON config file if present; otherwise defaults.
 
+    Read and compiled once per process and path; every caller shares the instance.
+
     The config shape:
       {
         "allowed_categories": ["POPUP", "POPUPEVENT", ...],
@@ -151,7 +265,11 @@ def load_rules(path: str | os.PathLike | None = None) -> PopupRules:
         "max_days_heuristic": 90
       }
     """
-    cfg_path = Path(path) if path else _default_config_path()
+    return _load_rules(Path(path) if path else _default_config_path())
+
+
+@lru_cache(maxsize=None)
+def _load_rules(cfg_path: Path) -> PopupRules:
     if not cfg_path.exists():
         return PopupRules()
     try:
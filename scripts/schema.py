@@ -0,0 +1,202 @@
+"""Compiled JSON Schema validation shared by ``validators.py`` and ``validate_index.py``.
+
+Each schema file is loaded once per process and compiled into a generated Python
+predicate that answers "is this instance valid?" with plain ``isinstance``/``in``
+checks and precompiled regexes, instead of walking the schema per instance. Valid
+instances, which are almost all of them, never reach ``jsonschema``. When the predicate
+says no, the instance is re-validated with the ``jsonschema`` validator for the schema's
+``$schema`` draft, so error messages, paths and order are exactly what they were.
+
+Only the keywords the repo's schemas use are compiled (``type``, ``required``,
+``properties``, ``items``, ``pattern``, ``minLength``, ``format``, permissive
+``additionalProperties``). A schema using anything else gets no predicate and is
+always validated by ``jsonschema``.
+"""
+from __future__ import annotations
+
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from jsonschema import FormatChecker
+from jsonschema.exceptions import ValidationError
+from jsonschema.validators import validator_for
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Annotations that never affect validity
+_IGNORED = frozenset({"$schema", "$id", "$comment", "title", "description", "examples", "default"})
+
+# Same semantics as jsonschema's default type checker (bools are not numbers)
+_TYPE_CHECKS = {
+    "string": "isinstance({v}, str)",
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "null": "{v} is None",
+    "boolean": "isinstance({v}, bool)",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": (
+        "((isinstance({v}, int) and not isinstance({v}, bool))"
+        " or (isinstance({v}, float) and {v}.is_integer()))"
+    ),
+}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Compiler:
+    """Turns a schema into the source of ``check(instance) -> bool``."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.consts: Dict[str, Any] = {}
+        self._n = 0
+
+    def _var(self, prefix: str) -> str:
+        self._n += 1
+        return f"{prefix}{self._n}"
+
+    def _const(self, value: Any) -> str:
+        name = self._var("_c")
+        self.consts[name] = value
+        return name
+
+    def emit(self, schema: Any, v: str, indent: int) -> None:
+        pad = "    " * indent
+        if schema is True or schema == {}:
+            return
+        if not isinstance(schema, dict):
+            raise _Unsupported(repr(schema))
+        unknown = set(schema) - _IGNORED - {
+            "type", "required", "properties", "items", "pattern", "minLength", "format", "additionalProperties",
+        }
+        if unknown:
+            raise _Unsupported(", ".join(sorted(unknown)))
+        if schema.get("additionalProperties", True) is not True:
+            raise _Unsupported("additionalProperties")
+
+        if "type" in schema:
+            types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            if any(t not in _TYPE_CHECKS for t in types):
+                raise _Unsupported(f"type {types}")
+            cond = " or ".join(_TYPE_CHECKS[t].format(v=v) for t in types)
+            self.lines.append(f"{pad}if not ({cond}): return False")
+        if "format" in schema:
+            checker = self._const(schema["format"])
+            self.lines.append(f"{pad}if not _formats.conforms({v}, {checker}): return False")
+        if "pattern" in schema or "minLength" in schema:
+            self.lines.append(f"{pad}if isinstance({v}, str):")
+            if "pattern" in schema:
+                rx = self._const(re.compile(schema["pattern"]))
+                self.lines.append(f"{pad}    if {rx}.search({v}) is None: return False")
+            if "minLength" in schema:
+                self.lines.append(f"{pad}    if len({v}) < {int(schema['minLength'])}: return False")
+        if "required" in schema or "properties" in schema:
+            self.lines.append(f"{pad}if isinstance({v}, dict):")
+            self.lines.append(f"{pad}    pass")
+            for key in schema.get("required") or []:
+                self.lines.append(f"{pad}    if {key!r} not in {v}: return False")
+            for key, sub in (schema.get("properties") or {}).items():
+                if sub is True or sub == {}:
+                    continue
+                child = self._var("_v")
+                self.lines.append(f"{pad}    {child} = {v}.get({key!r}, _MISSING)")
+                self.lines.append(f"{pad}    if {child} is not _MISSING:")
+                mark = len(self.lines)
+                self.emit(sub, child, indent + 2)
+                if len(self.lines) == mark:
+                    self.lines.append(f"{pad}        pass")
+        if "items" in schema:
+            items = schema["items"]
+            if isinstance(items, list):
+                raise _Unsupported("tuple items")
+            child = self._var("_v")
+            self.lines.append(f"{pad}if isinstance({v}, list):")
+            self.lines.append(f"{pad}    for {child} in {v}:")
+            mark = len(self.lines)
+            self.emit(items, child, indent + 2)
+            if len(self.lines) == mark:
+                self.lines.append(f"{pad}        pass")
+
+
+def compile_check(schema: Dict[str, Any], format_checker: Optional[FormatChecker] = None) -> Optional[Callable[[Any], bool]]:
+    """Generated validity predicate for ``schema``; None if it uses keywords we don't compile."""
+    comp = _Compiler()
+    try:
+        comp.emit(schema, "instance", 1)
+    except _Unsupported:
+        return None
+    source = "\n".join(["def check(instance):", *comp.lines, "    return True"])
+    namespace: Dict[str, Any] = {
+        **comp.consts,
+        "_MISSING": object(),
+        "_formats": format_checker or _NO_FORMATS,
+    }
+    exec(compile(source, "<compiled schema>", "exec"), namespace)
+    return namespace["check"]
+
+
+class _NoFormats:
+    """Stands in when no format checker is used: ``format`` is an annotation only."""
+
+    @staticmethod
+    def conforms(instance: Any, fmt: str) -> bool:
+        return True
+
+
+_NO_FORMATS = _NoFormats()
+
+
+class SchemaValidator:
+    """A schema compiled once: fast predicate first, ``jsonschema`` for the errors."""
+
+    def __init__(self, schema: Dict[str, Any], *, formats: bool = False) -> None:
+        self.schema = schema
+        self.format_checker = FormatChecker() if formats else None
+        cls = validator_for(schema)
+        self._validator = cls(schema, format_checker=self.format_checker)
+        self.check = compile_check(schema, self.format_checker)
+
+    @property
+    def compiled(self) -> bool:
+        return self.check is not None
+
+    def is_valid(self, instance: Any) -> bool:
+        if self.check is not None:
+            return self.check(instance)
+        return self._validator.is_valid(instance)
+
+    def iter_errors(self, instance: Any) -> Iterator[ValidationError]:
+        if self.check is not None and self.check(instance):
+            return iter(())
+        return self._validator.iter_errors(instance)
+
+
+@lru_cache(maxsize=None)
+def load_validator(path: Path | str, *, formats: bool = False) -> SchemaValidator:
+    """The compiled validator for the schema file at ``path``, built once per process."""
+    schema = json.loads(Path(path).read_text(encoding="utf-8"))
+    return SchemaValidator(schema, formats=formats)
+
+
+def parallel_map(fn: Callable[[T], R], items: Sequence[T], workers: Optional[int] = None, *, chunksize: int = 1) -> List[R]:
+    """``[fn(x) for x in items]`` across a process pool (in order); inline for one worker or item.
+
+    ``fn`` must be a module-level function so it can be pickled. Each worker compiles the
+    schemas it needs once, through ``load_validator``'s cache.
+    """
+    if not items:
+        return []
+    workers = min(workers or 1, len(items))
+    if workers <= 1:
+        return [fn(x) for x in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items, chunksize=chunksize))
+
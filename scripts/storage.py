@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import os
 import sqlite3
 from contextlib import closing
 from datetime import datetime
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 import orjson
 
 
 DATA_DIR = os.path.join("data", "popups")
 DB_PATH = os.path.join("data", "popups.sqlite")
+MANIFEST_PATH = os.path.join("data", "popups_manifest.json")
+CHANGED_IDS_PATH = os.path.join("data", "changed_ids.json")
+MANIFEST_VERSION = 1
 
 
 def ensure_dirs() -> None:
@@ -25,37 +28,111 @@ def dump_json(path: str, data: Dict[str, Any]) -> None:
 
 
 def _strip_volatile_meta(data: Dict[str, Any]) -> Dict[str, Any]:
-    # Return a shallow-normalized copy with volatile fields removed for stable comparison
-    try:
-        import copy
-        clean = copy.deepcopy(data)
-    except Exception:
-        clean = json.loads(json.dumps(data))
+    # Copy of the top level (and ``meta``) without volatile fields, for stable comparison.
+    # Nested values are shared with ``data``; callers only read or hash the result.
+    clean = dict(data)
     meta = clean.get("meta")
     if isinstance(meta, dict) and "fetchedAt" in meta:
         # Remove fetchedAt to avoid churn-only updates
+        meta = dict(meta)
         meta.pop("fetchedAt", None)
-        if not meta:
+        if meta:
+            clean["meta"] = meta
+        else:
             clean.pop("meta", None)
     return clean
 
 
-def save_record_json(record: Dict[str, Any]) -> str:
+def content_hash(record: Dict[str, Any]) -> str:
+    """Canonical hash of a record's content: sorted-key JSON, ``meta.fetchedAt`` excluded."""
+    clean = _strip_volatile_meta(record)
+    return hashlib.sha1(orjson.dumps(clean, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class ContentManifest:
+    """Content hash of every stored record JSON, persisted in ``data/popups_manifest.json``.
+
+    ``save_record_json`` consults it so an unchanged record costs one hash and no disk
+    read, and records here every ID it actually (re)writes. ``save`` persists the hashes
+    and writes those IDs to ``data/changed_ids.json`` for ``build_index.py`` and
+    ``build_pages.py --changed``. Not thread-safe: one writer owns a manifest.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or MANIFEST_PATH
+        self.hashes: Dict[str, str] = {}
+        self.changed: Set[str] = set()
+        self._dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                data = orjson.loads(f.read())
+            if data.get("version") == MANIFEST_VERSION:
+                self.hashes = dict(data.get("hashes") or {})
+        except (OSError, ValueError, AttributeError):
+            # Missing or unreadable: start empty; save_record_json falls back to comparing files
+            pass
+
+    def get(self, rid: str) -> Optional[str]:
+        return self.hashes.get(rid)
+
+    def set(self, rid: str, digest: str, *, changed: bool) -> None:
+        if self.hashes.get(rid) != digest:
+            self.hashes[rid] = digest
+            self._dirty = True
+        if changed:
+            self.changed.add(rid)
+
+    def save(self, changed_path: Optional[str] = CHANGED_IDS_PATH) -> None:
+        """Persist the hashes (when any changed) and this run's changed IDs."""
+        if self._dirty:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps({"version": MANIFEST_VERSION, "hashes": self.hashes}, option=orjson.OPT_SORT_KEYS))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        if changed_path:
+            write_changed_ids(sorted(self.changed), changed_path)
+
+
+def write_changed_ids(ids: List[str], path: str = CHANGED_IDS_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {"generatedAt": datetime.utcnow().isoformat(), "changed": ids}
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+
+
+def load_changed_ids(path: str = CHANGED_IDS_PATH) -> Set[str]:
+    """IDs listed by the last ``write_changed_ids``; raises ``OSError`` when there is none."""
+    with open(path, "rb") as f:
+        return set(orjson.loads(f.read()).get("changed") or [])
+
+
+def save_record_json(record: Dict[str, Any], manifest: Optional[ContentManifest] = None) -> bool:
+    """Write ``data/<id>.json``; True when it was (re)written, False when the content
+    (ignoring ``meta.fetchedAt``) was already stored."""
     ensure_dirs()
     rid = record["id"]
     path = os.path.join(DATA_DIR, f"{rid}.json")
     # Write only when meaningful content changed (ignore meta.fetchedAt)
+    digest = content_hash(record)
+    if manifest is not None and manifest.get(rid) == digest and os.path.exists(path):
+        return False  # no-op, known from the manifest
     try:
         if os.path.exists(path):
             with open(path, "rb") as f:
-                existing = json.loads(f.read().decode("utf-8"))
-            if _strip_volatile_meta(existing) == _strip_volatile_meta(record):
-                return path  # no-op
+                existing = orjson.loads(f.read())
+            if content_hash(existing) == digest:
+                if manifest is not None:
+                    manifest.set(rid, digest, changed=False)
+                return False  # no-op
     except Exception:
         # On any error, fall back to writing
         pass
     dump_json(path, record)
-    return path
+    if manifest is not None:
+        manifest.set(rid, digest, changed=True)
+    return True
 
 
 def init_db(conn: sqlite3.Connection) -> None:
@@ -108,71 +185,76 @@ def upsert_records_sqlite(records: Iterable[Dict[str, Any]]) -> str:
     ensure_dirs()
     with closing(sqlite3.connect(DB_PATH)) as conn:
         init_db(conn)
-        now = datetime.utcnow().isoformat()
-        with conn:
-            for r in records:
-                start = r.get("duration", {}).get("start")
-                end = r.get("duration", {}).get("end")
-                lon = r.get("geo", {}).get("lon")
-                lat = r.get("geo", {}).get("lat")
-                city = r.get("address", {}).get("city")
-                price_type = r.get("pricing", {}).get("type")
+        upsert_records(conn, records)
+    return DB_PATH
+
+
+def upsert_records(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]) -> None:
+    """Upsert ``records`` on an open connection, in one transaction."""
+    now = datetime.utcnow().isoformat()
+    with conn:
+        for r in records:
+            start = r.get("duration", {}).get("start")
+            end = r.get("duration", {}).get("end")
+            lon = r.get("geo", {}).get("lon")
+            lat = r.get("geo", {}).get("lat")
+            city = r.get("address", {}).get("city")
+            price_type = r.get("pricing", {}).get("type")
+            conn.execute(
+                """
+                INSERT INTO popups(id, category, startDate, endDate, lon, lat, city, priceType, createdAt, updatedAt)
+                VALUES(?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(id) DO UPDATE SET
+                  category=excluded.category,
+                  startDate=excluded.startDate,
+                  endDate=excluded.endDate,
+                  lon=excluded.lon,
+                  lat=excluded.lat,
+                  city=excluded.city,
+                  priceType=excluded.priceType,
+                  updatedAt=excluded.updatedAt
+                """,
+                (
+                    r["id"],
+                    r.get("category"),
+                    start,
+                    end,
+                    lon,
+                    lat,
+                    city,
+                    price_type,
+                    now,
+                    now,
+                ),
+            )
+            # translations
+            tr = r.get("translations", {})
+            for loc in ("ko", "en", "ja", "zh-cn", "zh-CN"):
+                t = tr.get(loc, {}) if isinstance(tr, dict) else {}
                 conn.execute(
                     """
-                    INSERT INTO popups(id, category, startDate, endDate, lon, lat, city, priceType, createdAt, updatedAt)
-                    VALUES(?,?,?,?,?,?,?,?,?,?)
-                    ON CONFLICT(id) DO UPDATE SET
-                      category=excluded.category,
-                      startDate=excluded.startDate,
-                      endDate=excluded.endDate,
-                      lon=excluded.lon,
-                      lat=excluded.lat,
-                      city=excluded.city,
-                      priceType=excluded.priceType,
-                      updatedAt=excluded.updatedAt
+                    INSERT INTO popup_translations(popupId, locale, title, address, priceDesc)
+                    VALUES(?,?,?,?,?)
+                    ON CONFLICT(popupId, locale) DO UPDATE SET
+                      title=excluded.title,
+                      address=excluded.address,
+                      priceDesc=excluded.priceDesc
                     """,
                     (
                         r["id"],
-                        r.get("category"),
-                        start,
-                        end,
-                        lon,
-                        lat,
-                        city,
-                        price_type,
-                        now,
-                        now,
+                        loc,
+                        t.get("title"),
+                        t.get("address"),
+                        t.get("priceDesc"),
                     ),
                 )
-                # translations
-                tr = r.get("translations", {})
-                for loc in ("ko", "en", "ja", "zh-cn", "zh-CN"):
-                    t = tr.get(loc, {}) if isinstance(tr, dict) else {}
-                    conn.execute(
-                        """
-                        INSERT INTO popup_translations(popupId, locale, title, address, priceDesc)
-                        VALUES(?,?,?,?,?)
-                        ON CONFLICT(popupId, locale) DO UPDATE SET
-                          title=excluded.title,
-                          address=excluded.address,
-                          priceDesc=excluded.priceDesc
-                        """,
-                        (
-                            r["id"],
-                            loc,
-                            t.get("title"),
-                            t.get("address"),
-                            t.get("priceDesc"),
-                        ),
-                    )
-                # images
-                conn.execute("DELETE FROM popup_images WHERE popupId = ?", (r["id"],))
-                for idx, img in enumerate(r.get("images", [])):
-                    conn.execute(
-                        """
-                        INSERT INTO popup_images(popupId, url, variant, "order", role)
-                        VALUES(?,?,?,?,?)
-                        """,
-                        (r["id"], img.get("url"), img.get("variant"), idx, img.get("role")),
-                    )
-    return DB_PATH
+            # images
+            conn.execute("DELETE FROM popup_images WHERE popupId = ?", (r["id"],))
+            for idx, img in enumerate(r.get("images", [])):
+                conn.execute(
+                    """
+                    INSERT INTO popup_images(popupId, url, variant, "order", role)
+                    VALUES(?,?,?,?,?)
+                    """,
+                    (r["id"], img.get("url"), img.get("variant"), idx, img.get("role")),
+                )
@@ -0,0 +1,126 @@
+"""Shared pooled HTTP transport with connection-reuse statistics.
+
+One ``requests.Session`` is shared by every worker. Its adapter keeps one urllib3
+pool per host, capped at ``per_host`` connections (blocking when exhausted), and
+counts every connection checkout, every fresh connect (TCP + TLS handshake) and the
+time spent in it. Reused connections are checkouts that needed no connect.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+if TYPE_CHECKING:
+    from scripts.metrics import Metrics
+
+
+class ConnectionStats:
+    def __init__(self, metrics: Optional["Metrics"] = None) -> None:
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, float]] = {}
+        # Also feeds each handshake into the run's ``connect`` histogram
+        self.metrics = metrics
+
+    def _host(self, host: str) -> Dict[str, float]:
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = {"requests": 0, "newConnections": 0, "handshakeSeconds": 0.0, "handshakeMax": 0.0}
+        return h
+
+    def on_checkout(self, host: str) -> None:
+        with self._lock:
+            self._host(host)["requests"] += 1
+
+    def on_connect(self, host: str, seconds: float) -> None:
+        with self._lock:
+            h = self._host(host)
+            h["newConnections"] += 1
+            h["handshakeSeconds"] += seconds
+            h["handshakeMax"] = max(h["handshakeMax"], seconds)
+        if self.metrics is not None:
+            self.metrics.observe("connect", seconds, host=host)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            hosts: Dict[str, Any] = {}
+            total = {"requests": 0, "newConnections": 0, "reusedConnections": 0, "handshakeSeconds": 0.0}
+            for host, h in sorted(self._hosts.items()):
+                req = int(h["requests"])
+                new = int(h["newConnections"])
+                reused = max(0, req - new)
+                hosts[host] = {
+                    "requests": req,
+                    "newConnections": new,
+                    "reusedConnections": reused,
+                    "reuseRatio": round(reused / req, 3) if req else None,
+                    "handshakeSeconds": round(h["handshakeSeconds"], 3),
+                    "handshakeMsAvg": round(1000 * h["handshakeSeconds"] / new, 1) if new else None,
+                    "handshakeMsMax": round(1000 * h["handshakeMax"], 1),
+                }
+                total["requests"] += req
+                total["newConnections"] += new
+                total["reusedConnections"] += reused
+                total["handshakeSeconds"] += h["handshakeSeconds"]
+            total["handshakeSeconds"] = round(total["handshakeSeconds"], 3)
+            return {"total": total, "hosts": hosts}
+
+
+def _instrumented(pool_cls: type, stats: ConnectionStats) -> type:
+    base_conn = pool_cls.ConnectionCls
+
+    class Connection(base_conn):  # type: ignore[misc, valid-type]
+        def connect(self) -> None:
+            t0 = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                stats.on_connect(self.host, time.perf_counter() - t0)
+
+    class Pool(pool_cls):  # type: ignore[misc, valid-type]
+        ConnectionCls = Connection
+
+        def _get_conn(self, timeout: Optional[float] = None) -> Any:
+            conn = super()._get_conn(timeout)
+            stats.on_checkout(self.host)
+            return conn
+
+    return Pool
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, **kwargs: Any) -> None:
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any) -> None:
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _instrumented(HTTPConnectionPool, self._stats),
+            "https": _instrumented(HTTPSConnectionPool, self._stats),
+        }
+
+
+def build_session(
+    workers: int,
+    *,
+    stats: Optional[ConnectionStats] = None,
+    per_host: Optional[int] = None,
+    hosts: int = 8,
+) -> requests.Session:
+    """Session shared by all workers: ``hosts`` pools of up to ``per_host`` keep-alive connections."""
+    per_host = max(1, per_host or workers)
+    adapter = PooledAdapter(
+        stats or ConnectionStats(),
+        pool_connections=max(1, hosts),
+        pool_maxsize=per_host,
+        pool_block=True,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
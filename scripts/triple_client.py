@@ -1,21 +1,32 @@
 from __future__ import annotations
 
+import codecs
+import io
 import json
 import re
 import time
 from dataclasses import dataclass
 from datetime import datetime, date
-from typing import Any, Dict, List, Optional, Tuple, Callable
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Callable, Union
 import time as _time
-import random
 import json
 from pathlib import Path
 
+import orjson
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
+from requests.compat import chardet
+
+from scripts.lazy_apollo import LazyApollo, locate_apollo_cache
+from scripts.metrics import Metrics, timed
+from scripts.ratelimit import Limiter, host_of, parse_retry_after
+from scripts.retry import CircuitBreaker, DeadlineExceeded, RequeuePolicy, RetryPolicy
 
 
 SITEMAP_INDEX_URL = "https://triple.global/sitemap-index.xml"
+DETAIL_BASE_URL = "https://interparkglobal.com"
 
 
 @dataclass
@@ -51,52 +62,184 @@ def _load_crawl_conf() -> Dict[str, Any]:
     return {
         "retry": {"attempts": 4, "initial": 1.0, "max": 8.0, "multiplier": 2.0, "jitter": 0.2},
         "timeout": 20,
+        "connectTimeout": 5,
+        "deadline": 60,
+        "breaker": {"threshold": 5, "cooldown": 30},
+        "planner": {"endedGraceDays": 7, "minIntervalDays": 1, "maxIntervalDays": 30},
+        "graphql": {"endpoint": None, "batchSize": 50, "langArg": "lang"},
+        "writer": {"batchSize": 200, "flushInterval": 30, "maxPending": 256},
+        "requeue": {"rounds": 2, "initial": 5, "multiplier": 3},
+        "quarantine": {"after": 2, "baseDays": 3, "maxDays": 60},
+        "pipeline": {"parseWorkers": 0, "buildWorkers": 2, "queueSize": 64},
     }
 
 
-def fetch(session: requests.Session, url: str, *, headers: Optional[Dict[str, str]] = None) -> requests.Response:
-    conf = _load_crawl_conf().get("retry", {})
-    attempts = int(conf.get("attempts", 4))
-    initial = float(conf.get("initial", 1.0))
-    max_wait = float(conf.get("max", 8.0))
-    mult = float(conf.get("multiplier", 2.0))
-    jitter_ratio = float(conf.get("jitter", 0.2))
-    timeout = float(_load_crawl_conf().get("timeout", 20))
+@lru_cache(maxsize=1)
+def load_retry_policy() -> RetryPolicy:
+    """Retry policy for this process; config/crawl.json is read once per run."""
+    return RetryPolicy.from_conf(_load_crawl_conf())
+
+
+def load_requeue_policy() -> RequeuePolicy:
+    return RequeuePolicy.from_conf(_load_crawl_conf())
+
+
+def fetch(
+    session: requests.Session,
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    limiter: Optional[Limiter] = None,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    json_body: Any = None,
+    metrics: Optional[Metrics] = None,
+) -> requests.Response:
+    """GET ``url`` (or POST ``json_body``) under the retry policy, limiter and breaker.
+
+    With ``metrics``, every attempt records ``limiter_wait``, ``ttfb`` and ``download``
+    for the URL's host (status = HTTP code or exception name).
+    """
+    policy = policy or load_retry_policy()
+    started = _time.monotonic()
+    if metrics is not None:
+        metrics = metrics.labeled(host=host_of(url))
 
     last_exc: Optional[Exception] = None
-    for i in range(1, attempts + 1):
+    for i in range(1, policy.attempts + 1):
+        remaining = policy.remaining(started)
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline {policy.deadline}s exceeded for url: {url}") from last_exc
+        # Fail fast while the host's breaker is open (not retried)
+        if breaker is not None:
+            breaker.before(url)
+        # Every attempt (retries included) takes a limiter slot for this host
+        if limiter is not None:
+            with timed(metrics, "limiter_wait"):
+                limiter.acquire(url)
+        sent_at = _time.monotonic()
         try:
-            resp = session.get(url, headers=headers, timeout=timeout)
-            # Respect Retry-After on throttling/server busy
-            if resp.status_code in (429, 503) and resp.headers.get("Retry-After"):
-                try:
-                    ra = float(resp.headers.get("Retry-After", "0"))
-                    _time.sleep(min(ra, max_wait))
-                    continue
-                except Exception:
-                    pass
-            resp.raise_for_status()
-            return resp
+            timeout = policy.timeout(policy.remaining(started))
+            if json_body is not None:
+                resp = session.post(url, json=json_body, headers=headers, timeout=timeout)
+            else:
+                resp = session.get(url, headers=headers, timeout=timeout)
         except Exception as e:
             last_exc = e
-            if i >= attempts:
-                break
-            backoff = min(max_wait, initial * (mult ** (i - 1)))
-            # Full jitter
-            sleep_for = random.uniform(0, backoff)
-            _time.sleep(sleep_for)
-    assert last_exc is not None
+            if metrics is not None:
+                metrics.observe("ttfb", _time.monotonic() - sent_at, status=type(e).__name__)
+            if breaker is not None:
+                breaker.record_failure(url)
+            if limiter is not None and isinstance(e, requests.Timeout):
+                limiter.observe(url, timeout=True)
+        else:
+            status = resp.status_code
+            if metrics is not None:
+                # requests' elapsed stops at the headers; the body is read after it
+                ttfb = resp.elapsed.total_seconds()
+                metrics.observe("ttfb", ttfb, status=status)
+                metrics.observe("download", _time.monotonic() - sent_at - ttfb, status=status)
+            ra = None
+            if status in (429, 503):
+                ra = parse_retry_after(resp.headers.get("Retry-After"))
+            if limiter is not None:
+                limiter.observe(
+                    url,
+                    status=status,
+                    elapsed=_time.monotonic() - sent_at,
+                    retry_after=min(ra, policy.max_wait) if ra is not None else None,
+                )
+            if breaker is not None:
+                if status >= 500:
+                    breaker.record_failure(url)
+                else:
+                    breaker.record_success(url)
+            # Respect Retry-After on throttling/server busy; with a limiter the
+            # whole host is held back instead of only this request
+            if ra is not None:
+                if limiter is None:
+                    _time.sleep(max(0.0, min(ra, policy.max_wait, policy.remaining(started))))
+                continue
+            if status < 400:
+                return resp
+            try:
+                resp.raise_for_status()
+            except requests.HTTPError as e:
+                last_exc = e
+            # 404/410/403...: the answer will not change on retry
+            if not policy.is_retryable_status(status):
+                raise last_exc
+        if i >= policy.attempts:
+            break
+        _time.sleep(max(0.0, min(policy.backoff(i), policy.remaining(started))))
+    if last_exc is None:
+        # Every attempt was answered with Retry-After
+        last_exc = requests.HTTPError(f"retry budget exhausted by Retry-After for url: {url}")
     raise last_exc
 
 
-def parse_sitemap_index(xml_text: str) -> List[str]:
-    soup = BeautifulSoup(xml_text, "lxml-xml")
-    return [loc.get_text(strip=True) for loc in soup.find_all("loc")]
+# (loc, lastmod) from one <url> or <sitemap> element
+SitemapEntry = Tuple[str, Optional[str]]
+
+
+def iter_sitemap_entries(content: bytes) -> Iterator[SitemapEntry]:
+    """Stream ``(loc, lastmod)`` pairs from a sitemap or sitemap index.
+
+    Each ``<url>``/``<sitemap>`` element is dropped as soon as it is read, so memory
+    does not grow with the number of entries. Namespaced and bare documents both work.
+    """
+    loc: Optional[str] = None
+    lastmod: Optional[str] = None
+    for _, el in etree.iterparse(io.BytesIO(content), events=("end",), recover=True, huge_tree=True):
+        name = etree.QName(el).localname
+        if name == "loc":
+            loc = (el.text or "").strip()
+        elif name == "lastmod":
+            lastmod = (el.text or "").strip() or None
+        elif name in ("url", "sitemap"):
+            if loc:
+                yield loc, lastmod
+            loc = lastmod = None
+            el.clear()
+            parent = el.getparent()
+            if parent is not None:
+                while el.getprevious() is not None:
+                    del parent[0]
+
+
+def _as_bytes(xml: Any) -> bytes:
+    return xml.encode("utf-8") if isinstance(xml, str) else xml
+
+
+def parse_sitemap_index(xml_text: Any) -> List[str]:
+    return [loc for loc, _ in iter_sitemap_entries(_as_bytes(xml_text))]
+
+
+def parse_sitemap_urls(xml_text: Any) -> List[str]:
+    return [loc for loc, _ in iter_sitemap_entries(_as_bytes(xml_text))]
+
+
+def sitemap_from_response(url: str, resp: Any, cache: Optional["HttpCache"] = None) -> Tuple[List[SitemapEntry], bool]:
+    """``(entries, not_modified)`` for a sitemap response; a 304 reuses the stored list."""
+    entries, not_modified = reuse_or_parse(
+        url, resp, cache, lambda r: list(iter_sitemap_entries(r.content))
+    )
+    # Stored as JSON arrays; hand back tuples either way
+    return [(loc, lastmod) for loc, lastmod in entries or []], not_modified
 
 
-def parse_sitemap_urls(xml_text: str) -> List[str]:
-    soup = BeautifulSoup(xml_text, "lxml-xml")
-    return [loc.get_text(strip=True) for loc in soup.find_all("loc")]
+def fetch_sitemap(
+    session: requests.Session,
+    url: str,
+    limiter: Optional[Limiter] = None,
+    cache: Optional["HttpCache"] = None,
+    *,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[List[SitemapEntry], bool]:
+    hdrs = cache.get_conditional_headers(url, require_extraction=True) if cache is not None else None
+    resp = fetch(session, url, headers=hdrs or None, limiter=limiter, breaker=breaker, metrics=metrics)
+    return sitemap_from_response(url, resp, cache)
 
 
 def extract_id_from_url(url: str) -> Optional[str]:
@@ -109,12 +252,90 @@ def _lang_path(lang: str) -> str:
     return lang.lower()
 
 
+def set_detail_base(base: str) -> None:
+    """Serve detail pages from ``base`` instead of Interpark Global (mock origin, staging)."""
+    global DETAIL_BASE_URL
+    DETAIL_BASE_URL = base.rstrip("/")
+
+
 def triple_detail_url(lang: str, festa_id: str) -> str:
     # Interpark Global now serves festa details
-    return f"https://interparkglobal.com/{_lang_path(lang)}/festas/{festa_id}"
+    return f"{DETAIL_BASE_URL}/{_lang_path(lang)}/festas/{festa_id}"
+
+
+_NEXT_DATA_OPEN = re.compile(r"""<script\b[^>]*?(?<![\w-])id\s*=\s*(["']?)__NEXT_DATA__\1(?(1)|(?=[\s/>]))[^>]*>""", re.I)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.I)
+# Same patterns for raw (UTF-8) response bodies
+_NEXT_DATA_OPEN_B = re.compile(_NEXT_DATA_OPEN.pattern.encode(), re.I)
+_SCRIPT_CLOSE_B = re.compile(_SCRIPT_CLOSE.pattern.encode(), re.I)
+# Below this payload size decoding everything beats locating entries one by one
+LAZY_APOLLO_MIN_CHARS = 256 * 1024
+
+
+def scan_next_data(html: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """Slice the ``__NEXT_DATA__`` payload straight out of the page and decode it with orjson.
+
+    No DOM is built. ``html`` may be the raw UTF-8 body. Returns None when the tag is
+    missing or its payload does not decode to an object, so callers can fall back to
+    ``parse_next_data_soup``.
+    """
+    span = next_data_span(html)
+    if span is None:
+        return None
+    try:
+        data = orjson.loads(html[span[0]:span[1]])
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def next_data_span(html: Union[str, bytes]) -> Optional[Tuple[int, int]]:
+    """``(start, end)`` offsets of the raw ``__NEXT_DATA__`` payload in ``html``."""
+    if isinstance(html, bytes):
+        marker, open_re, close_re = b"__NEXT_DATA__", _NEXT_DATA_OPEN_B, _SCRIPT_CLOSE_B
+    else:
+        marker, open_re, close_re = "__NEXT_DATA__", _NEXT_DATA_OPEN, _SCRIPT_CLOSE
+    if marker not in html:
+        return None
+    m = open_re.search(html)
+    if not m:
+        return None
+    end = close_re.search(html, m.end())
+    if not end:
+        return None
+    return m.end(), end.start()
+
+
+def lazy_apollo_state(html: Union[str, bytes]) -> Optional[LazyApollo]:
+    """Apollo cache of a detail page as a ``LazyApollo`` view, without decoding the payload.
+
+    A raw UTF-8 body is used in place; a str page has its payload encoded once. None
+    when the payload is small (a full orjson decode is cheaper), or when it holds no
+    cache object; callers then take the full ``parse_next_data`` + ``get_apollo_state``
+    path.
+    """
+    span = next_data_span(html)
+    if span is None or span[1] - span[0] < LAZY_APOLLO_MIN_CHARS:
+        return None
+    if isinstance(html, bytes):
+        payload, lo, hi = html, span[0], span[1]
+    else:
+        try:
+            payload = html[span[0] : span[1]].encode()
+        except UnicodeEncodeError:
+            return None
+        lo, hi = 0, len(payload)
+    start = locate_apollo_cache(payload, lo, hi)
+    if start is None:
+        return None
+    return LazyApollo(payload, start, hi, lambda: get_apollo_state(parse_next_data(html) or {}) or {})
+
 
+def parse_next_data(html: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    return scan_next_data(html) or parse_next_data_soup(html)
 
-def parse_next_data(html: str) -> Optional[Dict[str, Any]]:
+
+def parse_next_data_soup(html: Union[str, bytes]) -> Optional[Dict[str, Any]]:
     soup = BeautifulSoup(html, "lxml")
     # Try canonical Next.js data
     node = soup.find("script", id="__NEXT_DATA__")
@@ -165,14 +386,14 @@ def get_apollo_state(next_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return None
 
 
-def deref(apollo: Dict[str, Any], obj: Any) -> Any:
+def deref(apollo: Mapping[str, Any], obj: Any) -> Any:
     if isinstance(obj, dict) and "__ref" in obj:
         ref = obj["__ref"]
         return apollo.get(ref, obj)
     return obj
 
 
-def find_festa_node(apollo: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def find_festa_node(apollo: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
     root = apollo.get("ROOT_QUERY")
     if isinstance(root, dict):
         for k, v in root.items():
@@ -208,10 +429,14 @@ def _number(n: Any) -> Optional[float]:
         return None
 
 
+# Image size variants read by _extract_image_urls (and requested by the GraphQL source)
+IMAGE_VARIANTS = ("full", "large", "original", "small", "small_square")
+
+
 def _extract_image_urls(img_obj: Dict[str, Any]) -> List[Tuple[str, str]]:
     urls: List[Tuple[str, str]] = []
     # Support both legacy flat variants and nested sizes
-    variant_candidates = ("full", "large", "original", "small", "small_square")
+    variant_candidates = IMAGE_VARIANTS
     # 1) Nested under sizes
     sizes = img_obj.get("sizes")
     if isinstance(sizes, dict):
@@ -235,7 +460,7 @@ def _extract_image_urls(img_obj: Dict[str, Any]) -> List[Tuple[str, str]]:
     return urls
 
 
-def extract_festa(apollo: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def extract_festa(apollo: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
     festa = find_festa_node(apollo)
     if not festa:
         return None
@@ -333,39 +558,242 @@ def extract_festa(apollo: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     }
 
 
-def fetch_festa_by_lang(
+def fetch_detail(
     session: requests.Session,
     festa_id: str,
     lang: str,
-    limiter: Optional[Callable[[], None]] = None,
+    limiter: Optional[Limiter] = None,
     cache: Optional["HttpCache"] = None,
-) -> Optional[Dict[str, Any]]:
+    *,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[str, requests.Response]:
+    """``(url, response)`` for one detail page, without parsing it."""
     url = triple_detail_url(lang, festa_id)
-    if limiter:
-        limiter()
     hdrs = _lang_headers(lang)
     if cache is not None:
-        try:
-            cond = cache.get_conditional_headers(url)
-            hdrs = {**hdrs, **cond}
-        except Exception:
-            pass
-    resp = fetch(session, url, headers=hdrs)
-    if cache is not None:
-        try:
-            cache.update_from_response(url, resp)
-        except Exception:
-            pass
+        # Only revalidate when a 304 can be answered from the stored extraction
+        hdrs = {**hdrs, **cache.get_conditional_headers(url, require_extraction=True)}
+    if metrics is not None:
+        metrics = metrics.labeled(lang=lang)
+    resp = fetch(session, url, headers=hdrs, limiter=limiter, policy=policy, breaker=breaker, metrics=metrics)
+    return url, resp
+
+
+def fetch_festa_by_lang(
+    session: requests.Session,
+    festa_id: str,
+    lang: str,
+    limiter: Optional[Limiter] = None,
+    cache: Optional["HttpCache"] = None,
+    *,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Optional[Dict[str, Any]]:
+    url, resp = fetch_detail(
+        session, festa_id, lang, limiter, cache, policy=policy, breaker=breaker, metrics=metrics
+    )
+    return festa_from_response(url, resp, cache, metrics.labeled(lang=lang) if metrics is not None else None)
+
+
+@dataclass(frozen=True)
+class GraphQLConf:
+    """``graphql`` section of ``config/crawl.json`` (endpoint can be overridden on the CLI)."""
+
+    endpoint: Optional[str] = None
+    batch_size: int = 50
+    lang_arg: str = "lang"
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any], endpoint: Optional[str] = None) -> "GraphQLConf":
+        gql = conf.get("graphql") or {}
+        return cls(
+            endpoint=endpoint or gql.get("endpoint") or None,
+            batch_size=max(1, int(gql.get("batchSize", cls.batch_size))),
+            lang_arg=str(gql.get("langArg", cls.lang_arg)),
+        )
+
+
+def load_graphql_conf(endpoint: Optional[str] = None) -> GraphQLConf:
+    return GraphQLConf.from_conf(_load_crawl_conf(), endpoint)
+
+
+def _image_selection() -> str:
+    variants = " ".join(f"{v} {{ url }}" for v in IMAGE_VARIANTS)
+    return f"url {variants} sizes {{ {variants} }}"
+
+
+# Exactly the fields extract_festa reads
+FESTA_FRAGMENT = f"""
+fragment FestaFields on Festa {{
+  __typename resourceId title category
+  duration {{ start end }}
+  address {{ city street }}
+  geolocation {{ coordinates }}
+  links {{ href label }}
+  pricing {{ type description }}
+  headImage {{ {_image_selection()} }}
+  contents {{ image {{ {_image_selection()} }} }}
+}}
+"""
+
+
+def build_festa_batch_query(pairs: List[Tuple[str, str]], lang_arg: str = "lang") -> Dict[str, Any]:
+    """One GraphQL document with an aliased ``getFesta`` per ``(festa_id, lang)`` pair."""
+    var_defs: List[str] = []
+    fields: List[str] = []
+    variables: Dict[str, str] = {}
+    for n, (fid, lang) in enumerate(pairs):
+        var_defs += [f"$id{n}: ID!", f"$lang{n}: String!"]
+        fields.append(f"f{n}: getFesta(id: $id{n}, {lang_arg}: $lang{n}) {{ ...FestaFields }}")
+        variables[f"id{n}"] = fid
+        variables[f"lang{n}"] = lang
+    query = f"query FestaBatch({', '.join(var_defs)}) {{ {' '.join(fields)} }}{FESTA_FRAGMENT}"
+    return {"operationName": "FestaBatch", "query": query, "variables": variables}
+
+
+def fetch_festas_graphql(
+    session: requests.Session,
+    pairs: List[Tuple[str, str]],
+    conf: GraphQLConf,
+    limiter: Optional[Limiter] = None,
+    *,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[Metrics] = None,
+) -> Dict[Tuple[str, str], Any]:
+    """Festa dicts for ``pairs`` in one batched request, normalized by ``extract_festa``.
+
+    Values are the festa dict, None (no such festa), or a ``RuntimeError`` carrying the
+    GraphQL error for that alias. Transport/HTTP failures raise for the whole batch.
+    """
+    if not conf.endpoint:
+        raise ValueError("GraphQL source needs an endpoint (config graphql.endpoint or --graphql-endpoint)")
+    body = build_festa_batch_query(pairs, conf.lang_arg)
+    headers = {"user-agent": _lang_headers("en")["user-agent"], "accept": "application/json"}
+    resp = fetch(
+        session, conf.endpoint, headers=headers, limiter=limiter, policy=policy, breaker=breaker, json_body=body, metrics=metrics
+    )
+    payload = orjson.loads(resp.content)
+    data = payload.get("data") or {}
+    alias_errors: Dict[str, str] = {}
+    for err in payload.get("errors") or []:
+        path = err.get("path") or []
+        if path:
+            alias_errors[str(path[0])] = str(err.get("message"))
+        elif not data:
+            raise RuntimeError(f"GraphQL error: {err.get('message')}")
+    out: Dict[Tuple[str, str], Any] = {}
+    for n, (fid, lang) in enumerate(pairs):
+        alias = f"f{n}"
+        node = data.get(alias)
+        if node is None and alias in alias_errors:
+            out[(fid, lang)] = RuntimeError(f"GraphQL error: {alias_errors[alias]}")
+            continue
+        festa = extract_festa({"ROOT_QUERY": {"getFesta": node}}) if isinstance(node, dict) else None
+        if festa:
+            festa["_sourceUrl"] = triple_detail_url(lang, fid)
+        out[(fid, lang)] = festa
+    return out
+
+
+def reuse_or_parse(
+    url: str, resp: Any, cache: Optional["HttpCache"], parse: Callable[[Any], Any]
+) -> Tuple[Any, bool]:
+    """``(extraction, not_modified)``: a 304 is answered from ``cache``, anything else
+    is parsed with ``parse(resp)`` and stored as the new extraction."""
     if resp.status_code == 304:
-        return None
-    data = parse_next_data(resp.text)
-    if not data:
-        return None
-    apollo = get_apollo_state(data)
+        extracted = cache.get_extraction(url) if cache is not None else None
+        if cache is not None:
+            cache.update_from_response(url, resp)
+        return extracted, True
+    extracted = parse(resp)
+    if cache is not None:
+        cache.update_from_response(url, resp, extraction=extracted)
+    return extracted, False
+
+
+def festa_from_response(
+    url: str, resp: Any, cache: Optional["HttpCache"] = None, metrics: Optional[Metrics] = None
+) -> Optional[Dict[str, Any]]:
+    """Festa dict for a detail response; a 304 reuses the cached extraction.
+
+    Extractions served from a 304 carry ``_notModified: True`` so callers can count
+    unchanged pages separately from failures.
+    """
+    festa, not_modified = reuse_or_parse(
+        url, resp, cache, lambda r: parse_festa_bytes(r.content, r.encoding, url, metrics)
+    )
+    if festa and not_modified:
+        festa["_notModified"] = True
+    return festa
+
+
+def parse_festa_html(html: str, url: str, metrics: Optional[Metrics] = None) -> Optional[Dict[str, Any]]:
+    """Extract the normalized Festa dict from a detail page body.
+
+    Shared by the threaded and asyncio engines so both produce identical records.
+    """
+    with timed(metrics, "parse"):
+        apollo: Optional[Mapping[str, Any]] = lazy_apollo_state(html)
+        if apollo is None:
+            data = parse_next_data(html)
+            apollo = get_apollo_state(data) if data else None
+    return _festa_from_apollo(apollo, url, metrics)
+
+
+def _festa_from_apollo(
+    apollo: Optional[Mapping[str, Any]], url: str, metrics: Optional[Metrics] = None
+) -> Optional[Dict[str, Any]]:
     if not apollo:
         return None
-    festa = extract_festa(apollo)
+    with timed(metrics, "extract"):
+        festa = extract_festa(apollo)
     if not festa:
         return None
     festa["_sourceUrl"] = url
     return festa
+
+
+def decode_body(content: bytes, encoding: Optional[str]) -> str:
+    """``requests.Response.text`` for a body read elsewhere (e.g. shipped to a worker process)."""
+    if not content:
+        return ""
+    if encoding is None:
+        encoding = chardet.detect(content)["encoding"] if chardet is not None else "utf-8"
+    try:
+        return str(content, encoding, errors="replace")
+    except (LookupError, TypeError):
+        return str(content, errors="replace")
+
+
+def parse_festa_bytes(
+    content: bytes, encoding: Optional[str], url: str, metrics: Optional[Metrics] = None
+) -> Optional[Dict[str, Any]]:
+    """``parse_festa_html`` over a raw response body (``resp.content``/``resp.encoding``).
+
+    A UTF-8 body is scanned and decoded as bytes, so the page is never turned into a
+    str. Other encodings, and bodies the byte scan cannot read (no ``__NEXT_DATA__``
+    cache, invalid UTF-8), go through ``decode_body`` and ``parse_festa_html``.
+    """
+    if _is_utf8(encoding):
+        with timed(metrics, "parse"):
+            apollo: Optional[Mapping[str, Any]] = lazy_apollo_state(content)
+            if apollo is None:
+                data = scan_next_data(content)
+                apollo = get_apollo_state(data) if data else None
+        if apollo:
+            try:
+                return _festa_from_apollo(apollo, url, metrics)
+            except orjson.JSONDecodeError:
+                pass  # invalid UTF-8 in a lazily decoded entry
+    return parse_festa_html(decode_body(content, encoding), url, metrics)
+
+
+def _is_utf8(encoding: Optional[str]) -> bool:
+    try:
+        return encoding is not None and codecs.lookup(encoding).name == "utf-8"
+    except LookupError:
+        return False
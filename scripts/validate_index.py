@@ -1,10 +1,16 @@
 from __future__ import annotations
 import argparse
 import json
+import os
+import sys
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-from jsonschema import Draft202012Validator
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.schema import load_validator, parallel_map
 
 
 def load_json(path: Path) -> Any:
@@ -12,31 +18,36 @@ def load_json(path: Path) -> Any:
 
 
 def validate_array(schema_path: Path, data: Any, context: str) -> List[str]:
-    schema = json.loads(schema_path.read_text(encoding="utf-8"))
-    validator = Draft202012Validator(schema)
     errors: List[str] = []
-    for err in validator.iter_errors(data):
+    for err in load_validator(schema_path).iter_errors(data):
         loc = "/".join([str(p) for p in err.absolute_path])
         errors.append(f"[{context}] {loc}: {err.message}")
     return errors
 
 
-def validate_monthly(base_dir: Path, schema_path: Path, manifest: Dict[str, Any]) -> Tuple[int, List[str]]:
+def _validate_shard(job: Tuple[Path, Path, str]) -> Tuple[int, List[str]]:
+    base_dir, schema_path, m = job
+    name = "index-unknown.json" if m == "unknown" else f"index-{m}.json"
+    p = base_dir / name
+    if not p.exists():
+        return 0, [f"[manifest] missing shard file: {p}"]
+    arr = load_json(p)
+    if not isinstance(arr, list):
+        return 0, [f"[{name}] not an array"]
+    return len(arr), validate_array(schema_path, arr, name)
+
+
+def validate_monthly(
+    base_dir: Path, schema_path: Path, manifest: Dict[str, Any], workers: Optional[int] = None
+) -> Tuple[int, List[str]]:
+    """Validate every shard listed in the manifest; shards are checked in parallel across
+    ``workers`` processes and errors are reported in manifest order."""
     months = manifest.get("months") or []
     total = 0
     all_errors: List[str] = []
-    for m in months:
-        name = "index-unknown.json" if m == "unknown" else f"index-{m}.json"
-        p = base_dir / name
-        if not p.exists():
-            all_errors.append(f"[manifest] missing shard file: {p}")
-            continue
-        arr = load_json(p)
-        if not isinstance(arr, list):
-            all_errors.append(f"[{name}] not an array")
-            continue
-        total += len(arr)
-        all_errors.extend(validate_array(schema_path, arr, name))
+    for count, errors in parallel_map(_validate_shard, [(base_dir, schema_path, m) for m in months], workers):
+        total += count
+        all_errors.extend(errors)
     return total, all_errors
 
 
@@ -44,6 +55,7 @@ def main() -> int:
     ap = argparse.ArgumentParser(description="Validate built index.json or monthly shards against schema")
     ap.add_argument("--base", type=str, default=str(Path("web") / "data"), help="Directory containing index.json and shards")
     ap.add_argument("--schema", type=str, default=str(Path("config") / "index.schema.json"))
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes validating monthly shards")
     args = ap.parse_args()
 
     base = Path(args.base)
@@ -55,7 +67,7 @@ def main() -> int:
         manifest = load_json(manifest_path)
         mode = manifest.get("mode")
         if mode == "monthly":
-            total, errors = validate_monthly(base, schema_path, manifest)
+            total, errors = validate_monthly(base, schema_path, manifest, args.workers)
             print(f"Validated monthly shards: total_items={total}, files={len(manifest.get('months') or [])}")
             if errors:
                 print("Validation errors:")
@@ -1,33 +1,27 @@
 from __future__ import annotations
 
-import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-from jsonschema import Draft7Validator, FormatChecker
+from scripts.schema import load_validator
 
 
 _SCHEMA_PATH = Path(__file__).resolve().parent.parent / "config" / "record.schema.json"
 
+Result = Tuple[List[str], List[str]]
 
-def _load_schema() -> Dict[str, Any]:
-    return json.loads(_SCHEMA_PATH.read_text(encoding="utf-8"))
 
-
-_FORMAT_CHECKER = FormatChecker()
-_VALIDATOR = Draft7Validator(_load_schema(), format_checker=_FORMAT_CHECKER)
-
-
-def _is_date(s: str) -> bool:
+def _parse_date(s: Any) -> Optional[datetime]:
+    if not isinstance(s, str) or not s:
+        return None
     try:
-        datetime.strptime(s, "%Y-%m-%d")
-        return True
+        return datetime.strptime(s, "%Y-%m-%d")
     except Exception:
-        return False
+        return None
 
 
-def validate_record(rec: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+def validate_record(rec: Dict[str, Any]) -> Result:
     """Return (errors, warnings) lists for a record.
 
     - Schema validation for required fields and basic types
@@ -37,7 +31,7 @@ def validate_record(rec: Dict[str, Any]) -> Tuple[List[str], List[str]]:
     warnings: List[str] = []
 
     # JSON schema
-    for err in _VALIDATOR.iter_errors(rec):
+    for err in load_validator(_SCHEMA_PATH, formats=True).iter_errors(rec):
         path = ".".join(str(p) for p in err.path)
         errors.append(f"schema:{path}:{err.message}")
 
@@ -45,14 +39,9 @@ def validate_record(rec: Dict[str, Any]) -> Tuple[List[str], List[str]]:
     dur = rec.get("duration") or {}
     s = dur.get("start") if isinstance(dur, dict) else None
     e = dur.get("end") if isinstance(dur, dict) else None
-    if s and e and _is_date(s) and _is_date(e):
-        try:
-            sd = datetime.strptime(s, "%Y-%m-%d")
-            ed = datetime.strptime(e, "%Y-%m-%d")
-            if ed < sd:
-                errors.append("duration:end_before_start")
-        except Exception:
-            warnings.append("duration:parse_failed")
+    sd, ed = _parse_date(s), _parse_date(e)
+    if sd and ed and ed < sd:
+        errors.append("duration:end_before_start")
 
     # Coordinates range
     geo = rec.get("geo") or {}
@@ -81,4 +70,3 @@ def validate_record(rec: Dict[str, Any]) -> Tuple[List[str], List[str]]:
                 warnings.append(f"links[{i}]:non_http_scheme")
 
     return errors, warnings
-
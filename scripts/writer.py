@@ -0,0 +1,186 @@
+"""Dedicated record writer: per-ID outcomes become durable while the crawl runs.
+
+Both engines hand each outcome ``(festa_id, status, record or None)`` to a
+``RecordWriter`` as soon as it is built. One writer thread saves the record JSON right
+away, then upserts the records whose JSON changed to ``data/popups.sqlite`` in batches
+(every record when the database is new). A batch is flushed
+every ``writer.batchSize`` outcomes or every ``writer.flushInterval`` seconds, on one
+connection, one transaction per batch. ``on_flush`` is called with each batch once it is
+committed, unchanged IDs included, which is when the crawl journal marks those IDs done.
+
+Record JSON goes through a ``ContentManifest``: a record whose content hash matches the
+manifest is not read or rewritten. When the writer stops, the manifest is saved along
+with ``data/changed_ids.json``, the IDs whose JSON this run actually wrote.
+
+At most ``writer.maxPending`` outcomes wait in the queue. When storage falls behind,
+``put`` blocks, and through the pipeline's bounded queues (or the async engine's
+semaphore) so do the fetchers. Memory therefore stays bounded by the queue and the
+batch, not by the number of IDs crawled.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.journal import Outcome
+from scripts.metrics import Metrics, timed
+from scripts.storage import DB_PATH, ContentManifest, ensure_dirs, init_db, save_record_json, upsert_records
+from scripts.triple_client import _load_crawl_conf
+
+
+@dataclass(frozen=True)
+class WriterConf:
+    batch_size: int = 200
+    flush_interval: float = 30.0
+    max_pending: int = 256
+
+    @classmethod
+    def from_conf(cls, conf: Dict[str, Any]) -> "WriterConf":
+        w = conf.get("writer") or {}
+        return cls(
+            batch_size=max(1, int(w.get("batchSize", cls.batch_size))),
+            flush_interval=float(w.get("flushInterval", cls.flush_interval)),
+            max_pending=max(1, int(w.get("maxPending", cls.max_pending))),
+        )
+
+
+def load_writer_conf() -> WriterConf:
+    return WriterConf.from_conf(_load_crawl_conf())
+
+
+_CLOSE = object()
+
+
+class RecordWriter:
+    """Writer thread for record JSON and batched SQLite upserts; see the module docstring.
+
+    An exception on the writer thread (e.g. disk full) is re-raised by the next ``put``
+    or by ``close``.
+    """
+
+    def __init__(
+        self,
+        conf: Optional[WriterConf] = None,
+        *,
+        db_path: Optional[str] = None,
+        on_flush: Optional[Callable[[List[Outcome]], None]] = None,
+        metrics: Optional[Metrics] = None,
+        manifest: Optional[ContentManifest] = None,
+    ) -> None:
+        self.conf = conf or WriterConf()
+        self.db_path = db_path or DB_PATH
+        self.manifest = manifest if manifest is not None else ContentManifest()
+        self.on_flush = on_flush
+        self.metrics = metrics
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.conf.max_pending)
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._stats = {"outcomes": 0, "records": 0, "batches": 0, "maxPending": 0, "blockedSeconds": 0.0, "flushSeconds": 0.0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, festa_id: str, status: str, record: Optional[Dict[str, Any]]) -> None:
+        """Queue one outcome; blocks while ``max_pending`` outcomes are already waiting."""
+        t0 = time.perf_counter()
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                self._queue.put((festa_id, status, record), timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with self._lock:
+            self._stats["blockedSeconds"] += time.perf_counter() - t0
+            self._stats["maxPending"] = max(self._stats["maxPending"], self._queue.qsize())
+
+    def close(self) -> None:
+        """Write and flush everything queued, then stop the thread."""
+        if not self._closed:
+            self._closed = True
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(_CLOSE, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        batch: List[Outcome] = []
+        records: List[Dict[str, Any]] = []
+        conn: Optional[sqlite3.Connection] = None
+        deadline = time.monotonic() + self.conf.flush_interval
+        try:
+            ensure_dirs()
+            # A new database has none of the rows, so unchanged records are upserted too
+            upsert_all = not os.path.exists(self.db_path)
+            conn = sqlite3.connect(self.db_path)
+            init_db(conn)
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _CLOSE:
+                    break
+                if item is not None:
+                    _, _, record = item
+                    if record is not None:
+                        with timed(self.metrics, "save"):
+                            changed = save_record_json(record, self.manifest)
+                        if changed or upsert_all:
+                            records.append(record)
+                    batch.append(item)
+                if len(batch) >= self.conf.batch_size or time.monotonic() >= deadline:
+                    self._flush(conn, batch, records)
+                    batch, records = [], []
+                    deadline = time.monotonic() + self.conf.flush_interval
+            self._flush(conn, batch, records)
+        except BaseException as e:
+            self._error = e
+            # Unblock producers waiting on a full queue
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        finally:
+            if conn is not None:
+                conn.close()
+            try:
+                # Hashes of whatever was written, even when the run stopped early
+                self.manifest.save()
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+
+    def _flush(self, conn: sqlite3.Connection, batch: List[Outcome], records: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        if records:
+            upsert_records(conn, records)
+        if self.on_flush is not None:
+            self.on_flush(batch)
+        with self._lock:
+            self._stats["outcomes"] += len(batch)
+            self._stats["records"] += len(records)
+            self._stats["batches"] += 1
+            self._stats["flushSeconds"] += time.perf_counter() - t0
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        s["blockedSeconds"] = round(s["blockedSeconds"], 3)
+        s["flushSeconds"] = round(s["flushSeconds"], 3)
+        s["changed"] = len(self.manifest.changed)
+        return {"batchSize": self.conf.batch_size, "flushInterval": self.conf.flush_interval, "capacity": self.conf.max_pending, **s}
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scripts.archive import archive_session
+from scripts.retry import CircuitBreaker, RetryPolicy
+from scripts.triple_client import fetch, fetch_festa_by_lang
+
+PAGE = (
+    '<html><body><script id="__NEXT_DATA__" type="application/json">'
+    '{"props":{"pageProps":{"apolloState":{"ROOT_QUERY":{"getFesta":'
+    '{"__typename":"Festa","resourceId":"44444444-4444-4444-4444-444444444444","title":"Archived POP-UP",'
+    '"category":"POP-UP"}}}}}}</script></body></html>'
+).encode()
+
+
+def _serve():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            seen.append((self.path, self.headers.get("If-None-Match")))
+            if self.path.startswith("/missing"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, seen
+
+
+def test_record_then_replay_offline(tmp_path):
+    server, seen = _serve()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    policy = RetryPolicy(attempts=1)
+    archive_dir = str(tmp_path / "archive")
+    try:
+        session, archive = archive_session(requests.Session(), record=archive_dir)
+        live = [fetch(session, f"{base}/a", headers={"If-None-Match": '"v1"'}, policy=policy, breaker=CircuitBreaker())]
+        live.append(fetch(session, f"{base}/b", headers={}, policy=policy, breaker=CircuitBreaker()))
+        with pytest.raises(requests.HTTPError):
+            fetch(session, f"{base}/missing", headers={}, policy=policy, breaker=CircuitBreaker())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Conditional headers are stripped so the archive holds full bodies
+    assert seen[0] == ("/a", None)
+    # /a and /b share one blob
+    blobs = [f for _, _, files in os.walk(os.path.join(archive_dir, "blobs")) for f in files]
+    assert len(blobs) == 2 and archive.report()["responses"] == 3
+
+    session, archive = archive_session(requests.Session(), replay=archive_dir)
+    for url, resp in zip(("/a", "/b"), live):
+        got = fetch(session, f"{base}{url}", headers={"If-None-Match": '"v1"'}, policy=policy, breaker=CircuitBreaker())
+        assert got.status_code == resp.status_code
+        assert got.content == resp.content
+        assert got.headers.get("ETag") == resp.headers.get("ETag")
+    # Recorded and unrecorded 404s both fail like a live 404
+    for url in ("/missing", "/never"):
+        with pytest.raises(requests.HTTPError) as err:
+            fetch(session, f"{base}{url}", headers={}, policy=policy, breaker=CircuitBreaker())
+        assert err.value.response.status_code == 404
+    assert err.value.response.headers["X-Archive-Miss"] == "1"
+    assert archive.report()["hits"] == 3 and archive.report()["misses"] == 1
+
+
+def test_replay_keys_detail_pages_by_locale(tmp_path, monkeypatch):
+    server, _ = _serve()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr("scripts.triple_client.triple_detail_url", lambda lang, fid: f"{base}/{lang}/festas/{fid}")
+    archive_dir = str(tmp_path / "archive")
+    fid = "44444444-4444-4444-4444-444444444444"
+    try:
+        session, _ = archive_session(requests.Session(), record=archive_dir)
+        recorded = fetch_festa_by_lang(session, fid, "en", breaker=CircuitBreaker())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    session, archive = archive_session(requests.Session(), replay=archive_dir)
+    assert fetch_festa_by_lang(session, fid, "en", breaker=CircuitBreaker())["title"] == recorded["title"]
+    with pytest.raises(requests.HTTPError):
+        fetch_festa_by_lang(session, fid, "ja", breaker=CircuitBreaker())
+    assert archive.report()["misses"] == 1
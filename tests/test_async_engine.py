@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+from scripts import triple_client
+from scripts.async_engine import fetch_async, fetch_festa_by_lang_async
+
+
+def _serve(handler_cls):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def test_fetch_async_honours_retry_after_then_parses(monkeypatch):
+    hits = {"n": 0}
+    festa = {"__typename": "Festa", "resourceId": "abc", "title": "T", "category": "POP-UP"}
+    page = '<script id="__NEXT_DATA__">%s</script>' % json.dumps(
+        {"props": {"pageProps": {"__APOLLO_CACHE__": {"ROOT_QUERY": {"getFesta": festa}}}}}
+    )
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits["n"] += 1
+            if hits["n"] == 1:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = page.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = _serve(Handler)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    monkeypatch.setattr(triple_client, "DETAIL_BASE_URL", base)
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            resp = await fetch_async(session, f"{base}/x")
+            parsed = await fetch_festa_by_lang_async(session, "abc", "en")
+            return resp, parsed
+
+    try:
+        resp, parsed = asyncio.run(run())
+    finally:
+        srv.shutdown()
+    assert resp.status_code == 200
+    assert hits["n"] == 3
+    assert parsed["resourceId"] == "abc"
+    assert parsed["_sourceUrl"] == f"{base}/en/festas/abc"
+
+
+def test_async_detail_pages_are_parsed_from_bytes(monkeypatch):
+    festa = {"__typename": "Festa", "resourceId": "abc", "title": "팝업", "category": "POP-UP"}
+    body = ('<script id="__NEXT_DATA__">%s</script>' % json.dumps(
+        {"props": {"pageProps": {"__APOLLO_CACHE__": {"ROOT_QUERY": {"getFesta": festa}}}}}, ensure_ascii=False
+    )).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def no_decode(content, encoding):
+        raise AssertionError("UTF-8 body was decoded to str")
+
+    srv = _serve(Handler)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    monkeypatch.setattr(triple_client, "DETAIL_BASE_URL", base)
+    monkeypatch.setattr(triple_client, "decode_body", no_decode)
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_async(session, f"{base}/x"), await fetch_festa_by_lang_async(session, "abc", "ko")
+
+    try:
+        resp, parsed = asyncio.run(run())
+    finally:
+        srv.shutdown()
+    assert resp.content == body and resp.encoding == "utf-8"
+    assert parsed["title"] == "팝업"
+
+
+class _Writer:
+    def __init__(self):
+        self.puts = []
+
+    def put(self, fid, status, record):
+        self.puts.append((fid, status, record))
+
+
+def test_crawl_requeues_only_failed_locale_and_merges_it(tmp_path, monkeypatch):
+    from benchmarks.mock_origin import MockConfig, MockOrigin, make_handler
+    from scripts import async_engine
+    from scripts.retry import RequeuePolicy, RetryPolicy
+
+    monkeypatch.chdir(tmp_path)
+    conf = MockConfig(ids=2, langs=["en", "ko"])
+    flaky = f"/ko/festas/{MockOrigin(conf).ids[0]}"
+    hits = {"flaky": 0}
+
+    class Flaky(make_handler(MockOrigin(conf))):
+        def do_GET(self):
+            if self.path == flaky:
+                hits["flaky"] += 1
+                if hits["flaky"] == 1:
+                    self._reply("detail", 500)
+                    return
+            super().do_GET()
+
+    srv = _serve(Flaky)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    monkeypatch.setattr(triple_client, "DETAIL_BASE_URL", base)
+    monkeypatch.setattr(async_engine, "load_retry_policy", lambda: RetryPolicy(attempts=1))
+    monkeypatch.setattr(async_engine, "load_requeue_policy", lambda: RequeuePolicy(rounds=1, initial=0))
+
+    writer = _Writer()
+    try:
+        result = async_engine.crawl(
+            None, False, 2, None, ["en", "ko"], index_url=f"{base}/sitemap-index.xml", writer=writer
+        )
+    finally:
+        srv.shutdown()
+    assert hits["flaky"] == 2  # the failed pair alone was fetched again, not the whole ID
+    assert result["counts"]["saved"] == 2 and result["counts"]["failed"] == 0
+    assert result["retry"]["recovered"] == 1 and result["retry"]["deadLettered"] == 0
+    fid = flaky.rsplit("/", 1)[1]
+    last = [rec for f, _, rec in writer.puts if f == fid][-1]
+    assert set(last["translations"]) == {"en", "ko"}
+
+
+def test_crawl_dead_letters_permanent_404_without_requeueing(tmp_path, monkeypatch):
+    from benchmarks.mock_origin import MockConfig, MockOrigin, make_handler
+    from scripts import async_engine
+    from scripts.retry import RequeuePolicy, RetryPolicy
+
+    monkeypatch.chdir(tmp_path)
+    hits = {"ko": 0}
+
+    class Counting(make_handler(MockOrigin(MockConfig(ids=2, langs=["en"])))):
+        def do_GET(self):
+            hits["ko"] += self.path.startswith("/ko/")
+            super().do_GET()  # no ko pages: 404
+
+    srv = _serve(Counting)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    monkeypatch.setattr(triple_client, "DETAIL_BASE_URL", base)
+    monkeypatch.setattr(async_engine, "load_retry_policy", lambda: RetryPolicy(attempts=1))
+    monkeypatch.setattr(async_engine, "load_requeue_policy", lambda: RequeuePolicy(rounds=2, initial=0))
+    try:
+        result = async_engine.crawl(
+            None, False, 2, None, ["en", "ko"], index_url=f"{base}/sitemap-index.xml", writer=_Writer()
+        )
+    finally:
+        srv.shutdown()
+    assert hits["ko"] == 2  # one request per ID, none from the retry queue
+    assert result["retry"]["rounds"] == []
+    assert result["retry"]["deadLettered"] == 2
+    assert all(d["lang"] == "ko" and d["recorded"] for d in result["retry"]["deadLetters"])
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import builtins
+import copy
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.corpus import record
+from scripts import build_pages
+from scripts.build_index import build_index, load_previous_index, update_entries, write_json
+from scripts.storage import CHANGED_IDS_PATH, DATA_DIR, ContentManifest, load_changed_ids, save_record_json
+
+
+def _tree(root: Path) -> dict:
+    return {p.name: p.read_text(encoding="utf-8") for p in sorted(root.glob("*")) if p.name != "index-manifest.json"}
+
+
+def test_unchanged_records_are_skipped_without_reading(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recs = [record(i) for i in range(5)]
+    manifest = ContentManifest()
+    for rec in recs:
+        save_record_json(rec, manifest)
+    assert manifest.changed == {r["id"] for r in recs}
+    manifest.save()
+
+    # A new run: same content with a newer fetchedAt needs one hash and no file read
+    manifest = ContentManifest()
+    real_open = builtins.open
+
+    def no_reads(path, mode="r", *a, **kw):
+        assert not (str(path).startswith(DATA_DIR) and "r" in mode), path
+        return real_open(path, mode, *a, **kw)
+
+    monkeypatch.setattr(builtins, "open", no_reads)
+    edited = copy.deepcopy(recs[2])
+    edited["category"] = "EXHIBITION"
+    for rec in recs:
+        again = copy.deepcopy(edited if rec is recs[2] else rec)
+        again["meta"]["fetchedAt"] = "2099-01-01T00:00:00Z"
+        save_record_json(again, manifest)
+    monkeypatch.setattr(builtins, "open", real_open)
+    manifest.save()
+
+    assert load_changed_ids() == {recs[2]["id"]}
+    stored = json.loads((tmp_path / DATA_DIR / f"{recs[0]['id']}.json").read_text())
+    assert stored["meta"]["fetchedAt"] == recs[0]["meta"]["fetchedAt"]
+
+    # Without a manifest entry, an identical file on disk is still not rewritten
+    (tmp_path / "data" / "popups_manifest.json").unlink()
+    manifest = ContentManifest()
+    for rec in recs:
+        save_record_json(rec, manifest)
+    assert manifest.changed == {recs[2]["id"]}
+
+
+def test_incremental_builds_match_full_builds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recs = [record(i) for i in range(30)]
+    for rec in recs:
+        save_record_json(rec)
+    src = tmp_path / DATA_DIR
+    inc, full = tmp_path / "inc", tmp_path / "full"
+
+    def index(out: Path, **kw) -> dict:
+        _, manifest = build_index(src, out / "data" / "index.json", 5 * 1024 * 1024, "monthly", **kw)
+        write_json(out / "data" / "index-manifest.json", manifest)
+        return manifest
+
+    def pages(out: Path, *extra: str) -> None:
+        argv = ["build_pages.py", "--input-dir", str(src), "--out-dir", str(out / "p"), "--sitemap-out", str(out / "sitemap.xml")]
+        monkeypatch.setattr(sys, "argv", argv + list(extra))
+        build_pages.main()
+
+    for out in (inc, full):
+        index(out)
+        pages(out)
+
+    # Change one record (moving it to another month), add one, remove one
+    manifest = ContentManifest()
+    moved = copy.deepcopy(recs[3])
+    moved["duration"]["start"] = "2031-05-01"
+    moved["translations"]["ko"]["title"] = "바뀐 제목"
+    save_record_json(moved, manifest)
+    save_record_json(record(99), manifest)
+    (src / f"{recs[7]['id']}.json").unlink()
+    manifest.save()
+    changed = load_changed_ids(CHANGED_IDS_PATH)
+
+    untouched = inc / "p" / f"{recs[0]['id']}.html"
+    untouched.write_text("stale", encoding="utf-8")  # would be overwritten by a full render
+    previous, _ = load_previous_index(inc / "data" / "index.json")
+    assert update_entries(src, previous, changed)[1] == 2  # only the changed and the new record are read
+    inc_manifest = index(inc, changed=changed)
+    pages(inc, "--changed", CHANGED_IDS_PATH)
+    full_manifest = index(full)
+    pages(full)
+
+    assert _tree(inc / "data") == _tree(full / "data")
+    assert {k: v for k, v in inc_manifest.items() if k != "generatedAt"} == {
+        k: v for k, v in full_manifest.items() if k != "generatedAt"
+    }
+    assert "2031-05" in inc_manifest["months"]
+    assert untouched.read_text(encoding="utf-8") == "stale"
+    assert (inc / "p" / f"{moved['id']}.html").read_text() == (full / "p" / f"{moved['id']}.html").read_text()
+    assert (inc / "p" / f"{record(99)['id']}.html").exists()
+
+    def urls(path: Path) -> dict:
+        return {k: v for k, v in build_pages.read_sitemap_lastmods(path).items() if "/p/" in k}
+
+    assert urls(inc / "sitemap.xml") == urls(full / "sitemap.xml")
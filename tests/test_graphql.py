@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from scripts.triple_client import GraphQLConf, fetch_festas_graphql, parse_festa_html
+
+FESTA = {
+    "__typename": "Festa",
+    "resourceId": "33333333-3333-3333-3333-333333333333",
+    "title": "GQL POP-UP",
+    "category": "POP-UP",
+    "duration": {"start": "2025-03-01", "end": "2025-03-31"},
+    "address": {"city": "Seoul", "street": "Road"},
+    "geolocation": {"coordinates": [127.0, 37.5]},
+    "headImage": {"sizes": {"large": {"url": "//img.example/h.jpg"}}},
+    "contents": [{"image": [{"url": "https://img.example/c.jpg"}]}],
+    "links": [{"href": "https://example.com", "label": "More"}],
+    "pricing": {"type": "FREE", "description": None},
+}
+
+
+def test_batched_getfesta_matches_html_normalizer():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seen.append(body)
+            v = body["variables"]
+            data, errors = {}, []
+            for n in range(len(v) // 2):
+                fid = v[f"id{n}"]
+                if fid == "bad":
+                    data[f"f{n}"] = None
+                    errors.append({"message": "boom", "path": [f"f{n}"]})
+                else:
+                    data[f"f{n}"] = {**FESTA, "title": f"{FESTA['title']} {v[f'lang{n}']}"} if fid == FESTA["resourceId"] else None
+            out = json.dumps({"data": data, "errors": errors}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        conf = GraphQLConf(endpoint=f"http://127.0.0.1:{srv.server_port}/graphql")
+        fid = FESTA["resourceId"]
+        pairs = [(fid, "en"), (fid, "ja"), ("missing", "en"), ("bad", "en")]
+        got = fetch_festas_graphql(requests.Session(), pairs, conf)
+    finally:
+        srv.shutdown()
+
+    assert len(seen) == 1  # one request for every (id, locale)
+    assert "getFesta(id: $id3, lang: $lang3)" in seen[0]["query"]
+    assert got[("missing", "en")] is None
+    assert isinstance(got[("bad", "en")], RuntimeError)
+
+    # Same normalizer as the SSR path
+    page = '<script id="__NEXT_DATA__">%s</script>' % json.dumps(
+        {"props": {"pageProps": {"__APOLLO_CACHE__": {"ROOT_QUERY": {"getFesta": {**FESTA, "title": "GQL POP-UP en"}}}}}}
+    )
+    assert got[(fid, "en")] == parse_festa_html(page, "https://interparkglobal.com/en/festas/" + fid)
+    assert got[(fid, "ja")]["title"] == "GQL POP-UP ja"
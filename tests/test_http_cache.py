@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+from scripts.http_cache import HttpCache
+
+
+def _resp(status=200, etag=None, last_mod=None):
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if last_mod:
+        headers["Last-Modified"] = last_mod
+    return SimpleNamespace(status_code=status, headers=headers)
+
+
+def test_validators_survive_reopen_and_are_served_from_memory(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = HttpCache(path)
+    assert cache.get_conditional_headers("u1") == {}
+    cache.update_from_response("u1", _resp(etag='"a"', last_mod="Mon, 01 Jan 2024 00:00:00 GMT"))
+    cache.update_from_response("u1", _resp(status=304))
+    # Visible immediately, before the writer has committed
+    assert cache.get_conditional_headers("u1")["If-None-Match"] == '"a"'
+    cache.close()
+    rep = cache.report()
+    assert rep["hits"] == 1 and rep["misses"] == 1 and rep["notModified"] == 1
+
+    reopened = HttpCache(path)
+    assert reopened.get_conditional_headers("u1") == {
+        "If-None-Match": '"a"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    reopened.close()
+
+
+def test_concurrent_writes_are_not_lost(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = HttpCache(path, batch_size=50)
+
+    def worker(n):
+        for i in range(100):
+            cache.update_from_response(f"u{n}-{i}", _resp(etag=f'"{n}-{i}"'))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cache.close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM http_cache WHERE etag IS NOT NULL").fetchone()[0] == 800
+    assert cache.report()["batches"] < 800
+
+
+def test_size_eviction_keeps_newest(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = HttpCache(path)
+    for i in range(5):
+        cache.update_from_response(f"u{i}", _resp(etag=f'"{i}"'))
+        cache.flush()
+    cache.close()
+    small = HttpCache(path, max_entries=2)
+    assert small.report()["evicted"] == 3
+    assert small.get_conditional_headers("u4")
+    assert not small.get_conditional_headers("u0")
+    small.close()
+
+
+def test_not_modified_reuses_stored_extraction(tmp_path):
+    from scripts.triple_client import festa_from_response
+
+    path = str(tmp_path / "c.sqlite")
+    cache = HttpCache(path)
+    cache.update_from_response("u1", _resp(etag='"a"'))
+    # Validators without an extraction are not worth a conditional request
+    assert cache.get_conditional_headers("u1", require_extraction=True) == {}
+    cache.update_from_response("u1", _resp(etag='"b"'), extraction={"id": "1", "title": "T"})
+    assert cache.get_conditional_headers("u1", require_extraction=True)["If-None-Match"] == '"b"'
+    cache.close()
+
+    reopened = HttpCache(path)
+    festa = festa_from_response("u1", _resp(status=304), reopened)
+    assert festa == {"id": "1", "title": "T", "_notModified": True}
+    # The 304 kept the extraction in place
+    assert reopened.get_extraction("u1") == {"id": "1", "title": "T"}
+    reopened.close()
+    assert reopened.report()["extractionReused"] == 2
+
+
+def test_build_record_outcomes():
+    from scripts.crawl_popups import build_record
+
+    assert build_record([], had_error=True) == ("failed", None)
+    assert build_record([], had_error=False) == ("skipped", None)
+
+
+def test_sitemap_not_modified_reuses_entry_list(tmp_path):
+    from scripts.triple_client import sitemap_from_response
+
+    cache = HttpCache(str(tmp_path / "c.sqlite"))
+    ok = SimpleNamespace(
+        status_code=200,
+        headers={"ETag": '"s1"'},
+        content=b"<urlset><url><loc>https://x/a</loc><lastmod>2025-01-02</lastmod></url></urlset>",
+    )
+    assert sitemap_from_response("sm", ok, cache) == ([("https://x/a", "2025-01-02")], False)
+    assert cache.get_conditional_headers("sm", require_extraction=True) == {"If-None-Match": '"s1"'}
+    assert sitemap_from_response("sm", _resp(status=304), cache) == ([("https://x/a", "2025-01-02")], True)
+    cache.close()
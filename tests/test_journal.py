@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+
+import pytest
+
+from scripts.journal import CrawlJournal, fingerprint
+
+
+def _record(fid: str, title: str) -> dict:
+    return {"id": fid, "title": title, "meta": {"fetchedAt": "2024-01-01T00:00:00"}}
+
+
+def test_resume_skips_completed_ids_and_reuses_locales(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    j = CrawlJournal(path)
+    assert j.resume() is None
+    j.start(["a", "b", "c"], {"workItems": 3})
+    j.record_locale("a", "en", {"title": "A"})
+    j.record_locale("b", "en", {"title": "B"})
+    j.record_locale("b", "ko", None)  # answered without data
+    j.complete([("a", "saved", _record("a", "A")), ("c", "failed", None)])
+    # Interrupted here: "b" was fetched but never flushed
+    j.close()
+
+    j = CrawlJournal(path)
+    work, plan = j.resume()
+    assert work == ["a", "b", "c"] and plan == {"workItems": 3}
+    assert j.done_ids() == {"a": "saved"}  # failed IDs are retried
+    assert j.locale("b", "en") == (True, {"title": "B"})
+    assert j.locale("b", "ko") == (True, None)
+    assert j.locale("b", "ja") == (False, None)
+    j.complete([("b", "saved", _record("b", "B")), ("c", "skipped", None)])
+    assert j.report()["resumed"] and j.report()["resumedLocales"] == 3
+    j.finish()
+    j.close()
+
+    # A finished run is not resumed, and a new run starts empty
+    j = CrawlJournal(path)
+    assert j.resume() is None
+    j.start(["d"], {})
+    assert j.done_ids() == {} and j.locale("b", "en") == (False, None)
+    j.close()
+
+
+def test_fingerprint_ignores_fetched_at():
+    a = _record("x", "Same")
+    b = {**_record("x", "Same"), "meta": {"fetchedAt": "2025-06-01T12:00:00"}}
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint(_record("x", "Other"))
+
+
+def test_resume_into_a_clean_data_dir_resaves_completed_ids(tmp_path, monkeypatch):
+    from benchmarks.mock_origin import MockConfig, serve
+    from scripts import crawl_popups, triple_client
+    from scripts.storage import DATA_DIR, load_changed_ids
+    from scripts.writer import RecordWriter
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(triple_client, "DETAIL_BASE_URL", triple_client.DETAIL_BASE_URL)
+    srv = serve(MockConfig(ids=6, langs=["en", "ko"]))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_port}"
+
+    def crawl(resume: bool) -> None:
+        crawl_popups.main(
+            None, False, 1, 100.0, ["en", "ko"], sitemap_url=f"{base}/sitemap-index.xml",
+            detail_base=base, resume=resume, parse_workers=1,
+        )
+
+    # Interrupt the run after three outcomes reach the writer
+    real_put, puts = RecordWriter.put, []
+
+    def put(self, fid, status, record):
+        if len(puts) == 3:
+            raise KeyboardInterrupt
+        puts.append(fid)
+        real_put(self, fid, status, record)
+
+    monkeypatch.setattr(RecordWriter, "put", put)
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            crawl(resume=False)
+        monkeypatch.setattr(RecordWriter, "put", real_put)
+        # A fresh runner: only the journal survives
+        for name in os.listdir("data"):
+            if name != "crawl_journal.sqlite":
+                path = os.path.join("data", name)
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        crawl(resume=True)
+    finally:
+        srv.shutdown()
+
+    saved = {name[: -len(".json")] for name in os.listdir(DATA_DIR)}
+    assert set(puts) <= saved and len(saved) == 6
+    assert load_changed_ids() == saved
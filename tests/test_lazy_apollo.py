@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+
+from scripts import triple_client
+from scripts.lazy_apollo import LazyApollo, locate_apollo_cache, value_end
+from scripts.triple_client import (
+    LAZY_APOLLO_MIN_CHARS,
+    extract_festa,
+    get_apollo_state,
+    lazy_apollo_state,
+    parse_festa_bytes,
+    parse_festa_html,
+    scan_next_data,
+)
+
+FID = "22222222-2222-2222-2222-222222222222"
+
+
+def _page(extra_props=None):
+    cache = {
+        # Decoy ahead of the real keys: key text and brackets inside a string value
+        "Note:1": {"text": 'say "ROOT_QUERY": {"x": 1} and \\"Festa:%s\\": [' % FID},
+        "ROOT_QUERY": {f'getFesta({{"id":"{FID}"}})': {"__ref": f"Festa:{FID}"}},
+        "Image:h": {"sizes": {"full": {"url": "https://img.example/h.jpg"}}},
+        f"Festa:{FID}": {
+            "__typename": "Festa",
+            "resourceId": FID,
+            "title": "Lazy } ] POP-UP",
+            "category": "POP-UP",
+            "headImage": {"__ref": "Image:h"},
+            "contents": [{"image": [{"url": "//img.example/c.jpg"}]}],
+        },
+    }
+    for i in range(4000):
+        cache[f"Poi:{i}"] = {"names": {"ko": f"장소 {i}"}, "filler": "x" * 64}
+    props = {"__APOLLO_CACHE__": cache, **(extra_props or {})}
+    nd = {"props": {"pageProps": props}}
+    return f'<script id="__NEXT_DATA__">{json.dumps(nd, ensure_ascii=False)}</script>'
+
+
+def test_lazy_extraction_matches_full_decode_and_touches_only_refs():
+    html = _page()
+    assert len(html) > LAZY_APOLLO_MIN_CHARS
+    apollo = lazy_apollo_state(html)
+    assert isinstance(apollo, LazyApollo)
+    full = extract_festa(get_apollo_state(scan_next_data(html)))
+    assert extract_festa(apollo) == full
+    # ROOT_QUERY, the Festa and its head image; none of the 4000 other entities
+    assert apollo.decoded == 3
+    assert parse_festa_html(html, "u")["title"] == "Lazy } ] POP-UP"
+
+
+def test_cache_placement_follows_full_decode_precedence():
+    html = _page(extra_props={"apolloState": {"ROOT_QUERY": {}}})
+    apollo = lazy_apollo_state(html)
+    assert dict(apollo["ROOT_QUERY"]) == {}  # legacy apolloState wins, as in get_apollo_state
+    assert extract_festa(apollo) == extract_festa(get_apollo_state(scan_next_data(html))) is None
+    assert parse_festa_html(html, "u") is None
+    payload = html[html.index(">") + 1 : html.index("</script>")].encode()
+    assert locate_apollo_cache(payload, 0, len(payload)) == payload.index(b'{"ROOT_QUERY": {}}')
+
+
+def test_nested_and_repeated_keys_resolve_like_a_full_decode():
+    def page(good: str) -> str:
+        entities = {f"Poi:{i}": {"filler": "x" * 64} for i in range(4000)}
+        festa = {"__typename": "Festa", "title": "t", "category": "POP-UP"}
+        body = ",".join(
+            [
+                # A nested ROOT_QUERY and a nested cache key ahead of the real ones
+                '"Wrap:1": {"ROOT_QUERY": {"getFesta": {"__ref": "Festa:bad"}}, "__APOLLO_CACHE__": {}}',
+                '"Festa:bad": ' + json.dumps({**festa, "resourceId": "bad"}),
+                '"ROOT_QUERY": {"getFesta": {"__ref": "Festa:stale"}}',
+                '"Festa:good": ' + json.dumps({**festa, "resourceId": good}),
+                json.dumps(entities)[1:-1],
+                # Repeated key: the last one is what a full decode keeps
+                '"ROOT_QUERY": {"getFesta": {"__ref": "Festa:good"}}',
+            ]
+        )
+        return '<script id="__NEXT_DATA__">{"props": {"pageProps": {"__APOLLO_CACHE__": {%s}}}}</script>' % body
+
+    html = page("good")
+    apollo = lazy_apollo_state(html)
+    assert isinstance(apollo, LazyApollo)
+    full = extract_festa(get_apollo_state(scan_next_data(html)))
+    assert full["resourceId"] == "good"
+    assert extract_festa(apollo) == full
+
+
+def test_utf8_bodies_are_parsed_as_bytes_and_others_decoded(monkeypatch):
+    big = _page()
+    small = big[: big.index('"Poi:0"')] + '"Poi:x": {}}}}}</script>'
+    expected = {html: parse_festa_html(html, "u") for html in (big, small)}
+    assert expected[big]["title"] == expected[small]["title"] == "Lazy } ] POP-UP"
+
+    real_decode = triple_client.decode_body
+
+    def no_decode(content, encoding):
+        raise AssertionError("UTF-8 body was decoded to str")
+
+    monkeypatch.setattr(triple_client, "decode_body", no_decode)
+    for html in (big, small):
+        assert parse_festa_bytes(html.encode(), "UTF-8", "u") == expected[html]
+
+    # Another charset, or invalid UTF-8 inside the payload, takes the decoded path
+    monkeypatch.setattr(triple_client, "decode_body", real_decode)
+    assert parse_festa_bytes(small.encode("utf-16"), "utf-16", "u") == expected[small]
+    broken = small.replace("Lazy", "L\udcffazy").encode("utf-8", "surrogatepass")
+    assert parse_festa_bytes(broken, "utf-8", "u")["title"] == "L\ufffd\ufffd\ufffdazy } ] POP-UP"
+
+
+def test_value_end_skips_strings_and_nesting():
+    text = b'{"a": ["}", {"b": "\\"]"}], "c": 1}'
+    assert value_end(text, 0, len(text)) == len(text)
+    assert value_end(text, text.index(b"1"), len(text)) == len(text) - 1
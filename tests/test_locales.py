@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.async_engine import fetch_locales_async
+from scripts.crawl_popups import LocaleStats, fetch_locales
+
+# lang -> (seconds, festa or None, raised)
+PLAN = {
+    "zh-cn": (0.30, None, True),
+    "en": (0.02, {"title": "en"}, False),
+    "ja": (0.02, {"title": "ja"}, False),
+    "ko": (0.02, {"title": "ko"}, False),
+}
+LANGS = list(PLAN)
+
+
+def _fetch_lang(lang):
+    delay, festa, err = PLAN[lang]
+    time.sleep(delay)
+    return festa, err
+
+
+async def _fetch_lang_async(lang):
+    delay, festa, err = PLAN[lang]
+    await asyncio.sleep(delay)
+    return festa, err
+
+
+def test_fast_hedges_but_keeps_priority_order():
+    stats = LocaleStats()
+    with ThreadPoolExecutor(4) as pool:
+        t0 = time.monotonic()
+        fetched, had_error = fetch_locales(pool, _fetch_lang, LANGS, True, 0.05, stats)
+        elapsed = time.monotonic() - t0
+    # zh-cn is slow and fails: en (next in order) wins even though ja/ko answered too
+    assert fetched == [("en", {"title": "en"})] and had_error
+    assert elapsed < 0.45  # one slow round trip, not the serial sum
+    assert stats.report()["hedged"] >= 1
+
+
+def test_all_locales_concurrently_without_fast():
+    with ThreadPoolExecutor(4) as pool:
+        t0 = time.monotonic()
+        fetched, _ = fetch_locales(pool, _fetch_lang, LANGS, False, 0.05)
+        assert time.monotonic() - t0 < 0.45
+    assert [lang for lang, _ in fetched] == ["en", "ja", "ko"]
+
+
+def test_async_twin_cancels_losing_hedges():
+    stats = LocaleStats()
+    fetched, _ = asyncio.run(fetch_locales_async(_fetch_lang_async, ["en", "zh-cn"], True, 0.0, stats))
+    assert fetched == [("en", {"title": "en"})]
+    assert stats.report() == {"launched": 2, "hedged": 1, "discarded": 1}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from scripts.metrics import BUCKETS, Histogram, Metrics
+from scripts.ratelimit import RateLimiter
+from scripts.retry import CircuitBreaker, RetryPolicy
+from scripts.triple_client import fetch
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    h = Histogram()
+    for v in (0.004, 0.02, 0.02, 0.3, 2.0):
+        h.observe(v)
+    assert h.counts[BUCKETS.index(0.005)] == 1 and h.counts[BUCKETS.index(0.025)] == 2
+    # rank 2.5 falls 1.5/2 of the way into the (0.01, 0.025] bucket
+    assert abs(h.quantile(0.5) - 0.02125) < 1e-9
+    # Never above the largest observation
+    assert h.quantile(1.0) == 2.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_labeled_views_share_series_and_report_breakdowns(tmp_path):
+    m = Metrics()
+    en = m.labeled(host="a.example", lang="en")
+    en.observe("ttfb", 0.02, status=200)
+    en.observe("ttfb", 0.5, status="ReadTimeout")
+    m.labeled(host="b.example", lang="ja").observe("ttfb", 0.03, status=200)
+    m.observe("save", 0.001)
+
+    stages = m.report()["stages"]
+    assert list(stages) == ["ttfb", "save"]
+    assert stages["ttfb"]["count"] == 3
+    assert stages["ttfb"]["byStatus"]["200"]["count"] == 2
+    assert set(stages["ttfb"]["byLang"]) == {"en", "ja"}
+    assert "byHost" not in stages["save"]
+
+    path = tmp_path / "prom" / "crawl.prom"
+    m.write_textfile(str(path), {"saved": 3, "failed": 1})
+    text = path.read_text()
+    assert 'popup_crawl_stage_seconds_bucket{stage="ttfb",host="a.example",lang="en",status="200",le="+Inf"} 1' in text
+    assert 'popup_crawl_stage_seconds_count{stage="save"} 1' in text
+    assert 'popup_crawl_ids{outcome="saved"} 3' in text
+
+
+def test_fetch_records_request_stages():
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = b"x" * 2048
+            self.send_response(200 if self.path == "/ok" else 404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    m = Metrics()
+    try:
+        kw = dict(limiter=RateLimiter(100), policy=RetryPolicy(attempts=1), breaker=CircuitBreaker(), metrics=m.labeled(lang="en"))
+        fetch(requests.Session(), f"{base}/ok", **kw)
+        try:
+            fetch(requests.Session(), f"{base}/missing", **kw)
+        except requests.HTTPError:
+            pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stages = m.report()["stages"]
+    assert stages["limiter_wait"]["count"] == 2
+    assert stages["ttfb"]["byStatus"]["200"]["count"] == 1
+    assert stages["ttfb"]["byStatus"]["404"]["count"] == 1
+    assert list(stages["download"]["byHost"]) == [base[len("http://") :]]
+    assert list(stages["download"]["byLang"]) == ["en"]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from benchmarks.corpus import next_data_page
+from scripts.metrics import Metrics
+from scripts.pipeline import Stage, StagedPipeline, process_pool, run_with_metrics
+from scripts.triple_client import parse_festa_bytes
+
+
+def test_stages_run_every_item_with_bounded_queues():
+    in_flight = {"parse": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow_parse(x: int) -> int:
+        with lock:
+            in_flight["parse"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["parse"])
+        time.sleep(0.002)
+        with lock:
+            in_flight["parse"] -= 1
+        return x * 10
+
+    pipe = StagedPipeline(
+        [Stage("fetch", lambda x: x + 1, 4, 2), Stage("parse", slow_parse, 3, 2), Stage("store", str, 1, 2)],
+        out_size=2,
+    )
+    assert sorted(pipe.run(range(50)), key=int) == [str((x + 1) * 10) for x in range(50)]
+    report = pipe.report()
+    assert list(report["stages"]) == ["fetch", "parse", "store"]
+    assert all(s["items"] == 50 for s in report["stages"].values())
+    # The slow stage backs up to its queue bound and blocks the stage before it
+    assert report["stages"]["parse"]["queue"]["maxDepth"] <= 2
+    assert report["stages"]["fetch"]["blockedSeconds"] > 0
+    assert in_flight["max"] <= 3
+
+
+def test_stage_error_stops_the_pipeline():
+    def boom(x: int) -> int:
+        if x == 7:
+            raise ValueError("bad item")
+        return x
+
+    pipe = StagedPipeline([Stage("a", boom, 2, 4), Stage("b", lambda x: x, 1, 4)])
+    with pytest.raises(ValueError, match="bad item"):
+        list(pipe.run(range(1000)))
+    assert pipe.report()["stages"]["a"]["items"] < 1000
+
+
+def test_worker_process_metrics_merge_into_parent():
+    html = next_data_page(3, "en")
+    url = "https://example.com/en/festas/x"
+    pool = process_pool(2)
+    try:
+        festa, series = pool.submit(run_with_metrics, parse_festa_bytes, html.encode(), "utf-8", url, labels={"lang": "en"}).result()
+    finally:
+        pool.shutdown()
+    assert festa == parse_festa_bytes(html.encode(), "utf-8", url)
+    m = Metrics()
+    m.merge_series(series)
+    stages = m.report()["stages"]
+    assert stages["parse"]["count"] == 1 and list(stages["extract"]["byLang"]) == ["en"]
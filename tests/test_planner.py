@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from scripts.planner import FETCH, REVALIDATE, SKIP, PlannerConf, decide, plan, plan_report
+from scripts.triple_client import triple_detail_url
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def _rec(end="2025-12-31", changed="2025-01-01T00:00:00"):
+    return {"id": "x", "duration": {"end": end}, "meta": {"fetchedAt": changed}}
+
+
+def test_decide_lifecycle_and_lastmod():
+    checked = NOW - timedelta(days=3)
+    assert decide(None, None, None, NOW) == (FETCH, "new")
+    assert decide(None, _rec(), None, NOW) == (FETCH, "unchecked")
+    assert decide(NOW - timedelta(days=1), _rec(), checked, NOW) == (REVALIDATE, "lastmod")
+    assert decide(NOW - timedelta(days=9), _rec(), checked, NOW) == (SKIP, "lastmod-unchanged")
+    # Ended long ago: skipped even when never checked, unless lastmod moved after the last change
+    assert decide(None, _rec(end="2025-03-01"), None, NOW) == (SKIP, "ended")
+    assert decide(NOW - timedelta(days=1), _rec(end="2025-03-01"), checked, NOW) == (REVALIDATE, "lastmod")
+    # Within the grace window it is still revisited
+    recent = _rec(end="2025-05-28", changed="2025-05-29T00:00:00")
+    assert decide(None, recent, NOW - timedelta(days=2), NOW) == (REVALIDATE, "due")
+
+
+def test_decide_revisit_interval_grows_with_unchanged_age():
+    conf = PlannerConf(min_interval_days=1, max_interval_days=30)
+    # Changed a day before the last check: due again after a day
+    assert decide(None, _rec(changed="2025-05-27T00:00:00"), NOW - timedelta(days=2), NOW, conf) == (REVALIDATE, "due")
+    # Unchanged for months: interval is capped at 30 days
+    stale = _rec(changed="2025-01-01T00:00:00")
+    assert decide(None, stale, NOW - timedelta(days=10), NOW, conf) == (SKIP, "not-due")
+    assert decide(None, stale, NOW - timedelta(days=31), NOW, conf) == (REVALIDATE, "due")
+
+
+class _Cache:
+    def __init__(self, checked):
+        self.checked = checked
+
+    def checked_at(self, url):
+        return self.checked.get(url)
+
+
+def test_plan_combines_sitemap_records_and_cache(tmp_path):
+    a, b = "00000000-0000-0000-0000-00000000000a", "00000000-0000-0000-0000-00000000000b"
+    (tmp_path / f"{a}.json").write_text(json.dumps(_rec()), encoding="utf-8")
+    checked = (NOW - timedelta(days=2)).replace(tzinfo=None).isoformat()
+    cache = _Cache({triple_detail_url("en", a): checked})
+    entries = [
+        (triple_detail_url("en", a), "2025-05-01"),
+        (triple_detail_url("ja", a), "2025-05-02"),
+        (triple_detail_url("en", b), None),
+    ]
+    decisions = plan([a, b], entries, cache, ["en", "ja"], now=NOW, records_dir=str(tmp_path))
+    assert [(d.action, d.reason) for d in decisions] == [(SKIP, "lastmod-unchanged"), (FETCH, "new")]
+    assert {d.reason for d in plan([a, b], entries, cache, ["en"], full=True)} == {"full"}
+    assert plan_report(decisions, [b])["checkHistory"]
+    # A missing HTTP cache: the stored record is fetched again, and the report says why
+    blind = plan([a, b], entries, _Cache({}), ["en", "ja"], now=NOW, records_dir=str(tmp_path))
+    assert [d.action for d in blind] == [REVALIDATE, FETCH]
+    assert decide(None, _rec(), None, NOW) == (FETCH, "unchecked")
+    assert plan_report(blind, [a, b])["checkHistory"] is False
+
+
+def test_quarantine_holds_repeat_failures_until_probe_and_releases(tmp_path):
+    from types import SimpleNamespace
+
+    from scripts.http_cache import HttpCache
+    from scripts.planner import Quarantine, QuarantineConf
+
+    conf = QuarantineConf(after=2, base_days=3, max_days=60)
+    assert conf.next_probe(1, NOW) is None
+    assert conf.next_probe(2, NOW) == NOW + timedelta(days=3)
+    assert conf.next_probe(4, NOW) == NOW + timedelta(days=12)
+    assert conf.next_probe(20, NOW) == NOW + timedelta(days=60)
+
+    dead, gone = triple_detail_url("ko", "x"), triple_detail_url("ja", "x")
+    cache = HttpCache(str(tmp_path / "c.sqlite"))
+    ok = SimpleNamespace(status_code=200, headers={})
+    cache.update_from_response(gone, ok, {"title": "old"})
+    for _ in range(2):
+        cache.record_failure(dead, "HTTPError('404')")
+        cache.record_failure(gone, "HTTPError('500')")
+    cache.close()
+
+    cache = HttpCache(str(tmp_path / "c.sqlite"))  # history survives the run
+    now = datetime.now(timezone.utc)
+    q = Quarantine(cache, conf, now=now + timedelta(days=1))
+    assert q.held(dead) == (True, None)
+    # A locale that once existed keeps its last good extraction
+    assert q.held(gone) == (True, {"title": "old", "_notModified": True})
+    assert q.held(triple_detail_url("en", "x")) == (False, None)
+
+    later = Quarantine(cache, conf, now=now + timedelta(days=4))
+    assert later.held(dead) == (False, None)  # due: sent as a probe
+    cache.update_from_response(dead, ok, {"title": "back"})
+    assert cache.failure(dead) is None
+    report = later.report()
+    assert report["probed"] == 1 and report["released"] == 1
+    assert q.report()["requestsSaved"] == 2
+    cache.close()
+
+
+def test_open_breaker_and_deadline_do_not_feed_quarantine(tmp_path):
+    import pytest
+    import requests
+
+    from scripts.crawl_popups import dead_letter
+    from scripts.http_cache import HttpCache
+    from scripts.planner import Quarantine, QuarantineConf
+    from scripts.retry import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+
+    breaker = CircuitBreaker(threshold=1, cooldown=3600)
+    breaker.record_failure(triple_detail_url("en", "a"))
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before(triple_detail_url("en", "b"))
+    gone = requests.HTTPError("404", response=type("R", (), {"status_code": 404})())
+    dead = {("b", "en"): rejected.value, ("c", "en"): DeadlineExceeded("deadline"), ("d", "en"): gone}
+
+    for _ in range(2):  # two runs during an outage
+        cache = HttpCache(str(tmp_path / "c.sqlite"))
+        letters = dead_letter(dead, cache)
+        cache.close()
+    assert [d["recorded"] for d in letters] == [False, False, True]
+
+    cache = HttpCache(str(tmp_path / "c.sqlite"))
+    q = Quarantine(cache, QuarantineConf(after=2, base_days=3, max_days=60))
+    assert q.held(triple_detail_url("en", "b")) == (False, None)
+    assert q.held(triple_detail_url("en", "c")) == (False, None)
+    assert q.held(triple_detail_url("en", "d")) == (True, None)
+    cache.close()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from scripts.ratelimit import AdaptiveRateLimiter, RateLimiter, parse_retry_after
+
+
+A = "https://triple.global/sitemap-index.xml"
+B = "https://interparkglobal.com/en/festas/x"
+
+
+def test_parse_retry_after_seconds_and_date():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_fixed_limiter_is_global():
+    lim = RateLimiter(10.0)
+    assert lim.reserve(A) == 0.0
+    assert lim.reserve(B) > 0.05
+
+
+def test_adaptive_increases_then_cuts_per_host():
+    lim = AdaptiveRateLimiter(2.0, min_qps=0.5, max_qps=10.0, cooldown=0.0)
+    for _ in range(20):
+        lim.reserve(B)
+        lim.observe(B, status=200, elapsed=0.05)
+    grown = lim.report()["interparkglobal.com"]["qps"]
+    assert grown > 2.0
+
+    lim.observe(B, status=429)
+    after = lim.report()["interparkglobal.com"]
+    assert after["qps"] < grown
+    assert after["throttled"] == 1 and after["decreases"] == 1
+    # Other hosts keep their own state
+    lim.reserve(A)
+    assert lim.report()["triple.global"]["qps"] == 2.0
+
+
+def test_retry_after_blocks_whole_host():
+    lim = AdaptiveRateLimiter(100.0)
+    lim.observe(B, status=503, retry_after=2.0)
+    assert lim.reserve(B) > 1.5
+    assert lim.reserve(A) == 0.0
+
+
+def test_rising_latency_cuts_rate():
+    lim = AdaptiveRateLimiter(5.0, cooldown=0.0)
+    for _ in range(10):
+        lim.reserve(B)
+        lim.observe(B, status=200, elapsed=0.05)
+    before = lim.report()["interparkglobal.com"]["qps"]
+    for _ in range(10):
+        lim.reserve(B)
+        lim.observe(B, status=200, elapsed=1.0)
+    rep = lim.report()["interparkglobal.com"]
+    assert rep["slow"] >= 1
+    assert rep["qps"] < before
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import orjson
+
+from benchmarks.corpus import localized_festas
+from scripts import crawl_popups
+from scripts.crawl_popups import finalize_record, merge_localized, reclassify
+from scripts.rules import PopupRules
+from scripts.storage import DATA_DIR, DB_PATH, save_record_json
+
+
+def _crawled(i: int) -> dict:
+    merged: dict = {}
+    for lang, festa in localized_festas(i):
+        merge_localized(merged, festa, lang)
+    return finalize_record(merged)
+
+
+def test_reclassify_rewrites_only_changed_records(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = [_crawled(i) for i in range(12)]
+    for rec in records:
+        save_record_json(rec)
+
+    # Same rules: nothing changes, nothing is rewritten
+    summary = reclassify(workers=1, chunk_size=5)
+    assert (summary["records"], summary["changed"], summary["errors"]) == (12, 0, [])
+    assert not os.path.exists(DB_PATH)
+
+    # Without keywords, exactly the records that had keyword hits change
+    narrow = PopupRules(keyword_ko=(), keyword_en=(), keyword_ja=())
+    monkeypatch.setattr(crawl_popups, "load_rules", lambda: narrow)
+    expected = sum(1 for r in records if "keywordHits" in r["meta"].get("detection", {}))
+    summary = reclassify(workers=1, chunk_size=5)
+    assert summary["changed"] == expected > 0
+    assert summary["popups"] == sum(1 for r in records if narrow.classify_record(r)[0])
+
+    for rec in records:
+        with open(os.path.join(DATA_DIR, f"{rec['id']}.json"), "rb") as f:
+            stored = orjson.loads(f.read())
+        assert stored["meta"]["fetchedAt"] == rec["meta"]["fetchedAt"]
+        assert "keywordHits" not in stored["meta"].get("detection", {})
+    with sqlite3.connect(DB_PATH) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM popups").fetchone()[0] == expected
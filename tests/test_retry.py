@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import pytest
+import requests
+
+from scripts.retry import CircuitBreaker, CircuitOpenError, DeadlineExceeded, RetryPolicy
+from scripts.triple_client import fetch
+
+
+URL = "https://interparkglobal.com/en/festas/x"
+
+
+class _FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        resp = requests.Response()
+        resp.status_code = self.statuses.pop(0) if self.statuses else 200
+        resp.url = url
+        resp._content = b""
+        return resp
+
+
+def _policy(**kw):
+    base = dict(attempts=4, initial=0.0, max_wait=0.0, deadline=10.0)
+    base.update(kw)
+    return RetryPolicy(**base)
+
+
+def test_policy_from_conf():
+    p = RetryPolicy.from_conf({"retry": {"attempts": 2}, "timeout": 7, "deadline": 9, "breaker": {"threshold": 3}})
+    assert (p.attempts, p.read_timeout, p.deadline, p.breaker_threshold) == (2, 7.0, 9.0, 3)
+
+
+def test_non_retryable_4xx_fails_on_first_attempt():
+    sess = _FakeSession([404])
+    with pytest.raises(requests.HTTPError):
+        fetch(sess, URL, policy=_policy())
+    assert sess.calls == 1
+
+
+def test_retryable_statuses_are_retried():
+    sess = _FakeSession([500, 429, 200])
+    assert fetch(sess, URL, policy=_policy()).status_code == 200
+    assert sess.calls == 3
+
+
+def test_deadline_covers_all_attempts():
+    sess = _FakeSession([500] * 10)
+    with pytest.raises(DeadlineExceeded):
+        fetch(sess, URL, policy=_policy(attempts=10, initial=0.2, max_wait=0.2, multiplier=1.0, deadline=0.3))
+
+
+def test_breaker_opens_then_half_open_probe_closes(monkeypatch):
+    clock = {"t": 100.0}
+    monkeypatch.setattr("scripts.retry.time.monotonic", lambda: clock["t"])
+    br = CircuitBreaker(threshold=2, cooldown=5.0)
+    sess = _FakeSession([500, 500])
+    with pytest.raises(requests.HTTPError):
+        fetch(sess, URL, policy=_policy(attempts=2), breaker=br)
+    assert br.report()["interparkglobal.com"]["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        fetch(sess, URL, policy=_policy(), breaker=br)
+    assert sess.calls == 2
+
+    clock["t"] += 6.0
+    br.before(URL)  # first caller after cooldown is the probe
+    with pytest.raises(CircuitOpenError):
+        br.before(URL)
+    br.record_success(URL)
+    assert br.report()["interparkglobal.com"]["state"] == "closed"
+
+
+def test_requeue_retries_only_transient_pairs_in_growing_rounds():
+    from scripts.crawl_popups import requeue_failures
+    from scripts.retry import RequeuePolicy
+
+    def http_error(status):
+        resp = requests.Response()
+        resp.status_code = status
+        return requests.HTTPError(f"{status}", response=resp)
+
+    failed = {
+        ("a", "ko"): http_error(404),
+        ("a", "en"): requests.ConnectionError("reset"),
+        ("b", "en"): http_error(503),
+    }
+    calls, waits = [], []
+
+    def fetch_pairs(pairs):
+        calls.append(list(pairs))
+        out = {}
+        for pair in pairs:
+            if pair == ("a", "en") and len(waits) == 2:
+                out[pair] = {"title": "A"}
+            else:
+                out[pair] = http_error(503)
+        return out
+
+    policy = RequeuePolicy(rounds=3, initial=1.0, multiplier=3.0)
+    recovered, dead, rounds = requeue_failures(failed, fetch_pairs, policy, waits.append)
+    # One probe, then the rest; the 404 is never retried
+    assert calls[:2] == [[("a", "en")], [("b", "en")]]
+    assert recovered == {("a", "en"): {"title": "A"}}
+    assert set(dead) == {("a", "ko"), ("b", "en")}
+    assert waits == [1.0, 3.0, 9.0]
+    assert [r["recovered"] for r in rounds] == [0, 1, 0]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import date
+
+from scripts.rules import KeywordMatcher, PopupRules, load_rules
+
+
+def _naive_hits(keywords, titles):
+    # The substring scan the automaton replaces
+    return {kw.lower() for kw in keywords for t in titles if t and kw.lower() in t.lower()}
+
+
+def test_matcher_agrees_with_substring_scan_and_finds_overlaps():
+    rules = PopupRules()
+    keywords = rules.keyword_ko + rules.keyword_en + rules.keyword_ja
+    titles = [
+        "성수 팝업스토어 오픈",
+        "Gentle Monster Pop-Up Store",
+        "ポップアップストア in Seoul",
+        "popup shop / pop up event",
+        "전시회",
+        "",
+    ]
+    for t in titles:
+        assert set(rules.find_keyword_hits([t])) == _naive_hits(keywords, [t])
+    # Overlapping keywords all match, in keyword order, once across titles
+    assert rules.find_keyword_hits(["팝업 스토어", "팝업스토어"]) == ["팝업", "팝업 스토어", "팝업스토어"]
+
+
+def test_matcher_folds_width_and_case():
+    m = KeywordMatcher(["pop-up", "ポップアップ", "팝업"])
+    assert m.hits(["ＰＯＰ-ＵＰ ＳＴＯＲＥ"]) == ["pop-up"]
+    assert m.hits(["ﾎﾟｯﾌﾟｱｯﾌﾟ"]) == ["ポップアップ"]
+    assert m.hits(["no match", "팝 업"]) == []
+
+
+def test_classify_many_matches_classify():
+    rules = load_rules()
+    assert load_rules() is rules  # parsed and compiled once per process
+    records = [
+        {"category": "POP-UP", "translations": {"en": {"title": "Anything"}}, "duration": {}},
+        {
+            "category": "EXHIBITION",
+            "translations": {"ko": {"title": "팝업 전시"}, "en": {"title": "Pop-up"}},
+            "duration": {"start": "2025-01-01", "end": "2025-01-15"},
+        },
+        {
+            "category": "EXHIBITION",
+            "translations": {"en": {"title": "Popup"}},
+            "duration": {"start": "2025-01-01", "end": "2025-12-31"},
+        },
+        {"category": None, "translations": None, "duration": "bad"},
+    ]
+    expected = [
+        rules.classify(category="POP-UP", titles=["Anything"], start=None, end=None),
+        rules.classify(category="EXHIBITION", titles=["팝업 전시", "Pop-up"], start=date(2025, 1, 1), end=date(2025, 1, 15)),
+        rules.classify(category="EXHIBITION", titles=["Popup"], start=date(2025, 1, 1), end=date(2025, 12, 31)),
+        rules.classify(category=None, titles=[], start=None, end=None),
+    ]
+    assert rules.classify_many(records) == expected
+    assert [r[0] for r in expected] == [True, True, False, False]
+    assert [rules.classify_record(r) for r in records] == expected
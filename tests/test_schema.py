@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from jsonschema import Draft7Validator, Draft202012Validator, FormatChecker
+
+from scripts.schema import SchemaValidator, compile_check, load_validator
+from scripts.validate_index import validate_monthly
+from scripts.validators import _SCHEMA_PATH, validate_record
+
+
+INDEX_SCHEMA = Path(__file__).resolve().parent.parent / "config" / "index.schema.json"
+
+
+def _record(**over):
+    rec = {
+        "id": "abc",
+        "category": "POP-UP",
+        "meta": {"fetchedAt": "2025-01-01T00:00:00", "detection": {"rule": "category"}},
+        "duration": {"start": "2025-01-01", "end": "2025-01-02"},
+        "geo": {"lon": 127.0, "lat": 37},
+        "links": [{"href": "https://example.com", "label": None}],
+        "images": [{"url": "https://example.com/x.jpg", "role": "head"}],
+    }
+    rec.update(over)
+    return rec
+
+
+def test_compiled_check_agrees_with_jsonschema():
+    schema = json.loads(_SCHEMA_PATH.read_text(encoding="utf-8"))
+    reference = Draft7Validator(schema, format_checker=FormatChecker())
+    compiled = load_validator(_SCHEMA_PATH, formats=True)
+    assert compiled.compiled and load_validator(_SCHEMA_PATH, formats=True) is compiled
+    cases = [
+        _record(),
+        _record(id=5),
+        _record(meta={}),
+        _record(meta={"fetchedAt": 1, "detection": []}),
+        _record(duration={"start": "2025-1-1", "end": None}),
+        _record(duration=None, geo=None, links=None, images=None),
+        _record(geo={"lat": True, "lon": "x"}),
+        _record(links=[{"label": "x"}, "str"]),
+        _record(images=[{"url": None}]),
+        {"meta": {"fetchedAt": "x"}},
+        [],
+    ]
+    for rec in cases:
+        assert compiled.check(rec) == reference.is_valid(rec)
+        assert [e.message for e in compiled.iter_errors(rec)] == [e.message for e in reference.iter_errors(rec)]
+
+
+def test_unsupported_keywords_fall_back_to_jsonschema():
+    schema = {"type": "object", "properties": {"n": {"type": "integer", "maximum": 3}}}
+    assert compile_check(schema) is None
+    v = SchemaValidator(schema)
+    assert not v.compiled
+    assert [e.message for e in v.iter_errors({"n": 4})] == ["4 is greater than the maximum of 3"]
+    assert v.is_valid({"n": 3.0}) and not v.is_valid({"n": True})
+
+
+def test_validate_record_reports_schema_and_range_errors():
+    assert validate_record(_record(id=0, geo={"lat": 100}))[0] == [
+        "schema:id:0 is not of type 'string'",
+        "geo:lat_out_of_range",
+    ]
+
+
+def test_monthly_shards_report_errors_in_manifest_order(tmp_path):
+    good = [{"id": "a", "lat": 37.5, "isPopup": True}]
+    bad = [{"id": ""}, {"title": 1}]
+    (tmp_path / "index-2025-01.json").write_text(json.dumps(good))
+    (tmp_path / "index-2025-02.json").write_text(json.dumps(bad))
+    (tmp_path / "index-unknown.json").write_text("{}")
+    manifest = {"months": ["2025-02", "2025-01", "2025-03", "unknown"]}
+    expected = [
+        f"[index-2025-02.json] {'/'.join(map(str, e.absolute_path))}: {e.message}"
+        for e in Draft202012Validator(json.loads(INDEX_SCHEMA.read_text())).iter_errors(bad)
+    ] + [f"[manifest] missing shard file: {tmp_path / 'index-2025-03.json'}", "[index-unknown.json] not an array"]
+    for workers in (1, 2):
+        assert validate_monthly(tmp_path, INDEX_SCHEMA, manifest, workers) == (3, expected)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.transport import ConnectionStats, build_session
+
+
+class _KeepAlive(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_shared_session_reuses_connections():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAlive)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    stats = ConnectionStats()
+    session = build_session(4, stats=stats)
+    try:
+        for i in range(5):
+            assert session.get(f"http://127.0.0.1:{srv.server_port}/{i}", timeout=5).text == "ok"
+    finally:
+        session.close()
+        srv.shutdown()
+    rep = stats.report()
+    host = rep["hosts"]["127.0.0.1"]
+    assert host["requests"] == 5
+    assert host["newConnections"] == 1
+    assert host["reusedConnections"] == 4
+    assert rep["total"]["handshakeSeconds"] >= 0
@@ -2,7 +2,16 @@ from __future__ import annotations
 
 import json
 
-from scripts.triple_client import parse_next_data, get_apollo_state, extract_festa
+from scripts.triple_client import (
+    extract_festa,
+    get_apollo_state,
+    iter_sitemap_entries,
+    parse_next_data,
+    parse_next_data_soup,
+    scan_next_data,
+    set_detail_base,
+    triple_detail_url,
+)
 
 
 def _wrap_next_data(obj: dict) -> str:
@@ -52,3 +61,34 @@ def test_parse_apollo_cache():
     res = extract_festa(ap)
     assert res is not None
     assert res["resourceId"] == festa["resourceId"]
+
+
+def test_set_detail_base_redirects_detail_urls(monkeypatch):
+    monkeypatch.setattr("scripts.triple_client.DETAIL_BASE_URL", "https://interparkglobal.com")
+    set_detail_base("http://127.0.0.1:8765/")
+    assert triple_detail_url("zh-CN", "abc") == "http://127.0.0.1:8765/zh-cn/festas/abc"
+
+
+def test_iter_sitemap_entries_reads_loc_and_lastmod():
+    xml = (
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        b"<url><loc> https://x/ko/festas/a </loc><lastmod>2025-01-02</lastmod></url>"
+        b"<url><loc>https://x/ko/festas/b</loc></url>"
+        b"<url><lastmod>2025-01-03</lastmod></url>"
+        b"</urlset>"
+    )
+    assert list(iter_sitemap_entries(xml)) == [
+        ("https://x/ko/festas/a", "2025-01-02"),
+        ("https://x/ko/festas/b", None),
+    ]
+
+
+def test_scan_next_data_matches_soup_and_falls_back():
+    nd = {"props": {"pageProps": {"__APOLLO_CACHE__": {"ROOT_QUERY": {"getFesta": {"title": "팝업 </div>"}}}}}}
+    html = f"<html><script src=a.js></script><SCRIPT type='application/json' id='__NEXT_DATA__'>{json.dumps(nd)}</script></html>"
+    assert scan_next_data(html) == parse_next_data_soup(html) == nd
+    # Not a __NEXT_DATA__ tag: scanner declines, soup fallback still finds apolloState
+    legacy = '<script data-id="__NEXT_DATA__">{"apolloState": {"ROOT_QUERY": {}}}</script>'
+    assert scan_next_data(legacy) is None
+    assert parse_next_data(legacy) == {"apolloState": {"ROOT_QUERY": {}}}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from benchmarks.corpus import record
+from scripts.storage import DATA_DIR
+from scripts.writer import RecordWriter, WriterConf
+
+
+def test_writer_flushes_in_batches_and_journals_after_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "data" / "popups.sqlite")
+    flushed = []
+
+    def on_flush(batch):
+        # Everything handed over is already committed
+        with sqlite3.connect(db) as conn:
+            stored = {r[0] for r in conn.execute("SELECT id FROM popups")}
+        assert {rec["id"] for _, _, rec in batch if rec} <= stored
+        flushed.append([fid for fid, _, _ in batch])
+
+    writer = RecordWriter(WriterConf(batch_size=4, flush_interval=60, max_pending=2), db_path=db, on_flush=on_flush)
+    recs = [record(i) for i in range(10)]
+    for rec in recs:
+        writer.put(rec["id"], "saved", rec)
+    writer.put("missing", "skipped", None)
+    writer.close()
+
+    assert [len(b) for b in flushed] == [4, 4, 3]
+    assert [fid for b in flushed for fid in b] == [r["id"] for r in recs] + ["missing"]
+    assert sorted(os.listdir(DATA_DIR)) == sorted(f"{r['id']}.json" for r in recs)
+    report = writer.report()
+    assert (report["outcomes"], report["records"], report["batches"]) == (11, 10, 3)
+    assert report["maxPending"] <= 2
+
+
+def test_only_changed_records_are_upserted_but_every_id_is_flushed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "data" / "popups.sqlite")
+    recs = [record(i) for i in range(5)]
+    writer = RecordWriter(WriterConf(batch_size=10), db_path=db)
+    for rec in recs:
+        writer.put(rec["id"], "saved", rec)
+    writer.close()
+
+    flushed = []
+    writer = RecordWriter(WriterConf(batch_size=10), db_path=db, on_flush=lambda b: flushed.extend(f for f, _, _ in b))
+    edited = dict(recs[1], category="EXHIBITION")
+    for rec in recs:
+        writer.put(rec["id"], "saved", edited if rec is recs[1] else rec)
+    writer.close()
+
+    assert flushed == [r["id"] for r in recs]
+    assert (writer.report()["outcomes"], writer.report()["records"]) == (5, 1)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT category FROM popups WHERE id = ?", (recs[1]["id"],)).fetchone() == ("EXHIBITION",)
+
+
+def test_writer_flushes_on_interval(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    flushed = threading.Event()
+    writer = RecordWriter(WriterConf(batch_size=100, flush_interval=0.05), on_flush=lambda b: flushed.set())
+    rec = record(1)
+    writer.put(rec["id"], "saved", rec)
+    assert flushed.wait(2.0)
+    writer.close()
+
+
+def test_slow_storage_blocks_producers_and_errors_surface(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def slow(batch):
+        time.sleep(0.05)
+
+    writer = RecordWriter(WriterConf(batch_size=1, max_pending=1), on_flush=slow)
+    t0 = time.perf_counter()
+    for i in range(6):
+        writer.put(str(i), "skipped", None)
+    assert time.perf_counter() - t0 > 0.15  # the producer waited for the writer
+    writer.close()
+    assert writer.report()["blockedSeconds"] > 0
+
+    def boom(batch):
+        raise OSError("disk full")
+
+    writer = RecordWriter(WriterConf(batch_size=1, max_pending=1), on_flush=boom)
+    with pytest.raises(OSError, match="disk full"):
+        for i in range(100):
+            writer.put(str(i), "skipped", None)
+            time.sleep(0.01)
+    with pytest.raises(OSError):
+        writer.close()